@@ -16,6 +16,15 @@ const nextConfig: NextConfig = {
       },
     ],
   },
+  async headers() {
+    // PDF links carry ?v=<sha256 prefix> from src/data/cahier-pdf.json, so a
+    // versioned URL never changes content and can be cached for good.
+    return ["/cahier-des-charges.pdf", "/cahier-des-charges.en.pdf"].map((source) => ({
+      source,
+      has: [{ type: "query" as const, key: "v" }],
+      headers: [{ key: "Cache-Control", value: "public, max-age=31536000, immutable" }],
+    }));
+  },
   async redirects() {
     return [
       {
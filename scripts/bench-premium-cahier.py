@@ -0,0 +1,399 @@
+from __future__ import annotations
+
+import argparse
+import contextlib
+import hashlib
+import importlib.util
+import io
+import json
+import math
+import os
+import platform
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing import get_context
+from pathlib import Path
+from urllib.parse import urlparse
+
+from PIL import Image, ImageDraw
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+BASE_DIR = SCRIPT_DIR.parent
+GENERATOR_PATH = SCRIPT_DIR / "generate-premium-cahier.py"
+BENCH_DIR = BASE_DIR / ".cache" / "cahier" / "bench"
+RESULTS_PATH = BENCH_DIR / "results.json"
+BASELINE_PATH = BENCH_DIR / "baseline.json"
+
+FIXTURE_SIZE = (1600, 1000)
+# Differences below this are timer noise on a busy machine, whatever the ratio says.
+TIME_NOISE_FLOOR = 0.005
+
+
+def load_generator():
+    if "generate_premium_cahier" in sys.modules:
+        return sys.modules["generate_premium_cahier"]
+    sys.path.insert(0, str(SCRIPT_DIR))
+    spec = importlib.util.spec_from_file_location("generate_premium_cahier", GENERATOR_PATH)
+    module = importlib.util.module_from_spec(spec)
+    # Registered before exec so pool workers can unpickle jobs that reference it.
+    sys.modules["generate_premium_cahier"] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def fixture_image(path: str) -> tuple[bytes, str]:
+    seed = int(hashlib.sha256(path.encode("utf-8")).hexdigest()[:8], 16)
+    rng = random.Random(seed)
+    width, height = FIXTURE_SIZE
+    has_alpha = path.lower().endswith(".png")
+    image = Image.new("RGBA" if has_alpha else "RGB", FIXTURE_SIZE, (rng.randrange(256), 40, 60))
+    draw = ImageDraw.Draw(image)
+    for _ in range(80):
+        x, y = rng.randrange(width), rng.randrange(height)
+        radius = rng.randrange(20, 220)
+        fill = (rng.randrange(256), rng.randrange(256), rng.randrange(256)) + ((rng.randrange(80, 256),) if has_alpha else ())
+        draw.ellipse((x - radius, y - radius, x + radius, y + radius), fill=fill)
+    buffer = io.BytesIO()
+    if has_alpha:
+        image.save(buffer, "PNG")
+        return buffer.getvalue(), "image/png"
+    image.save(buffer, "JPEG", quality=90)
+    return buffer.getvalue(), "image/jpeg"
+
+
+class ImageStandIn:
+    def __init__(self, latency: float, failure_rate: float, seed: int = 0) -> None:
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.fixtures: dict[str, tuple[bytes, str, str]] = {}
+        self.lock = threading.Lock()
+        self.requests = self.failures = self.not_modified = 0
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                stand_in.handle(self)
+
+            def log_message(self, format: str, *args) -> None:
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def fixture(self, path: str) -> tuple[bytes, str, str]:
+        with self.lock:
+            if path not in self.fixtures:
+                data, content_type = fixture_image(path)
+                self.fixtures[path] = (data, content_type, '"' + hashlib.sha256(data).hexdigest()[:16] + '"')
+            return self.fixtures[path]
+
+    def handle(self, request: BaseHTTPRequestHandler) -> None:
+        with self.lock:
+            self.requests += 1
+            failed = self.random.random() < self.failure_rate
+            self.failures += failed
+        time.sleep(self.latency)
+        if failed:
+            request.send_error(503, "injected failure")
+            return
+        data, content_type, etag = self.fixture(request.path)
+        if request.headers.get("If-None-Match") == etag:
+            with self.lock:
+                self.not_modified += 1
+            request.send_response(304)
+            request.send_header("ETag", etag)
+            request.end_headers()
+            return
+        request.send_response(200)
+        request.send_header("Content-Type", content_type)
+        request.send_header("Content-Length", str(len(data)))
+        request.send_header("ETag", etag)
+        request.end_headers()
+        request.wfile.write(data)
+
+    def __enter__(self) -> ImageStandIn:
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def configure(gen, base_url: str, work_dir: Path) -> None:
+    for items in (gen.AI_GUIDE_ITEMS_FR, gen.AI_GUIDE_ITEMS_EN):
+        for item in items:
+            parsed = urlparse(item["image"])
+            item["image"] = f"{base_url}/{parsed.netloc}{parsed.path}"
+    public_dir = work_dir / "public"
+    public_dir.mkdir(parents=True, exist_ok=True)
+    gen.PUBLIC_DIR = public_dir
+    gen.OUTPUT_PATH = public_dir / gen.OUTPUT_PATH.name
+    gen.OUTPUT_PATH_EN = public_dir / gen.OUTPUT_PATH_EN.name
+    gen.LOCALE_SOURCES["fr"] = (gen.OUTPUT_PATH, *gen.LOCALE_SOURCES["fr"][1:])
+    gen.LOCALE_SOURCES["en"] = (gen.OUTPUT_PATH_EN, *gen.LOCALE_SOURCES["en"][1:])
+    gen.PDF_SIDECAR_PATH = work_dir / "cahier-pdf.json"
+    gen.FIELD_SCHEMA_PATH = work_dir / "cahier-fields.json"
+    gen.CACHE_DIR = work_dir / "cache"
+    gen.BUILD_MANIFEST_PATH = gen.CACHE_DIR / "build-manifest.json"
+    gen.IMAGE_CACHE_DIR = gen.CACHE_DIR / "images"
+    gen.FONT_CACHE_DIR = gen.CACHE_DIR / "fonts"
+    gen.PAGE_CACHE_DIR = gen.CACHE_DIR / "pages"
+    gen.TEXT_LAYOUT_PATH = gen.CACHE_DIR / "text-layout.json"
+
+
+def run_main_in_fresh_process(base_url: str, work_dir: str, argv: list[str]) -> dict:
+    started = time.perf_counter()
+    gen = load_generator()
+    imported = time.perf_counter()
+    configure(gen, base_url, Path(work_dir))
+    with contextlib.redirect_stdout(io.StringIO()):
+        gen.main([*argv, "--cache-dir", str(gen.IMAGE_CACHE_DIR)])
+    finished = time.perf_counter()
+    return {
+        "import": imported - started,
+        "main": finished - imported,
+        "peak_rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+    }
+
+
+def median_time(function, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def bench_main(metrics: dict, base_url: str, work_dir: Path) -> None:
+    # Each run gets a new interpreter so "cold" really pays for imports, font parsing and downloads.
+    runs = [("cold", ["--force"]), ("warm", ["--force"]), ("noop", [])]
+    for name, argv in runs:
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+            result = pool.submit(run_main_in_fresh_process, base_url, str(work_dir), argv).result()
+        metrics[f"main.{name}.seconds"] = {"value": result["main"], "unit": "s"}
+        if name == "cold":
+            metrics["main.import.seconds"] = {"value": result["import"], "unit": "s"}
+            metrics["main.peak_rss.bytes"] = {"value": result["peak_rss"], "unit": "bytes"}
+    for path in sorted((work_dir / "public").glob("*.pdf")):
+        metrics[f"output.{path.name}.bytes"] = {"value": path.stat().st_size, "unit": "bytes"}
+
+
+def bench_pages(metrics: dict, gen, repeat: int) -> None:
+    builders = {
+        "build_page_one": lambda c, copy, items: gen.build_page_one(c, copy),
+        "build_page_two": lambda c, copy, items: (c.showPage(), gen.build_page_two(c, copy)),
+        "build_page_three": lambda c, copy, items: (c.showPage(), gen.build_page_three(c, copy)),
+        "build_page_four": lambda c, copy, items: gen.build_page_four(c, copy, items),
+    }
+    for locale, (_, copy, items) in gen.LOCALE_SOURCES.items():
+        samples = {name: [] for name in [*builders, "save"]}
+        for _ in range(repeat):
+            c = gen.BriefCanvas(io.BytesIO(), pagesize=gen.PAGE_SIZES["a4"], invariant=1)
+            for name, builder in builders.items():
+                started = time.perf_counter()
+                builder(c, copy, items)
+                samples[name].append(time.perf_counter() - started)
+            started = time.perf_counter()
+            c.save()
+            samples["save"].append(time.perf_counter() - started)
+        for name, values in samples.items():
+            metrics[f"pages.{locale}.{name}.seconds"] = {"value": statistics.median(values), "unit": "s"}
+
+
+def bench_documents(metrics: dict, gen, repeat: int) -> None:
+    lists = [items for _, _, items in gen.LOCALE_SOURCES.values()]
+    for page_size in gen.PAGE_SIZES:
+        for include_ai in (True, False):
+            context = gen.RenderContext(lists, page_size, include_ai)
+            variant = page_size + ("" if include_ai else ".no-ai")
+            for locale, (_, copy, items) in gen.LOCALE_SOURCES.items():
+                data = context.render(copy, items)
+                metrics[f"document.{locale}.{variant}.seconds"] = {
+                    "value": median_time(lambda: context.render(copy, items), repeat),
+                    "unit": "s",
+                }
+                metrics[f"document.{locale}.{variant}.bytes"] = {"value": len(data), "unit": "bytes"}
+    context = gen.RenderContext(lists)
+    _, copy, items = gen.LOCALE_SOURCES["fr"]
+    prefill = {"project_name": "Benchmark", "contact_email": "bench@example.com", "audience_b2b": "oui"}
+    context.stamp(copy, items, prefill)
+    metrics["document.fr.a4.stamp.seconds"] = {
+        "value": median_time(lambda: context.stamp(copy, items, prefill), repeat),
+        "unit": "s",
+    }
+    tracemalloc.start()
+    context.render(copy, items)
+    metrics["document.fr.a4.peak_alloc.bytes"] = {"value": tracemalloc.get_traced_memory()[1], "unit": "bytes"}
+    tracemalloc.stop()
+
+
+def bench_latency(metrics: dict, gen, samples: int, page_workers: int) -> None:
+    lists = [items for _, _, items in gen.LOCALE_SOURCES.values()]
+    _, copy, items = gen.LOCALE_SOURCES["fr"]
+    for label, workers in (("sequential", 0), (f"pages_w{page_workers}", page_workers)):
+        context = gen.RenderContext(lists, page_workers=workers)
+        timings = []
+        for index in range(samples + 1):
+            prefill = {"project_name": f"Latence {index}", "sign_client": "Bench", "audience_b2b": "oui"}
+            started = time.perf_counter()
+            context.render(copy, items, prefill)
+            timings.append(time.perf_counter() - started)
+        context.close()
+        timings = sorted(timings[1:])
+        metrics[f"latency.fr.a4.{label}.p50.seconds"] = {"value": statistics.median(timings), "unit": "s"}
+        metrics[f"latency.fr.a4.{label}.p99.seconds"] = {
+            "value": timings[min(len(timings) - 1, math.ceil(len(timings) * 0.99) - 1)],
+            "unit": "s",
+        }
+
+
+def bench_scaling(metrics: dict, gen, work_dir: Path, batch_sizes: list[int], worker_counts: list[int]) -> None:
+    jobs = gen.build_matrix(list(gen.LOCALE_SOURCES), list(gen.PAGE_SIZES), [True, False])
+    for workers in worker_counts:
+        started = time.perf_counter()
+        results = gen.run_build_jobs(jobs, workers)
+        elapsed = time.perf_counter() - started
+        failed = [result for result in results if result.error]
+        if failed:
+            raise SystemExit(f"matrix build failed: {failed[0].error}")
+        metrics[f"matrix.{len(jobs)}jobs.w{workers}.seconds"] = {"value": elapsed, "unit": "s"}
+    for size in batch_sizes:
+        leads_path = work_dir / f"leads-{size}.jsonl"
+        with leads_path.open("w", encoding="utf-8") as handle:
+            for index in range(size):
+                lead = {
+                    "id": f"B{index:06d}",
+                    "locale": "en" if index % 2 else "fr",
+                    "project_name": f"Projet {index}",
+                    "contact_email": f"lead{index}@example.com",
+                    "audience_b2b": "oui" if index % 3 else "",
+                }
+                handle.write(json.dumps(lead) + "\n")
+        for workers in worker_counts:
+            out_dir = work_dir / f"briefs-{size}-w{workers}"
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                failures = gen.run_lead_batch(leads_path, out_dir, {}, "id", "locale", "fr", workers)
+            elapsed = time.perf_counter() - started
+            if failures:
+                raise SystemExit(f"batch of {size} failed {failures} brief(s)")
+            metrics[f"batch.{size}.w{workers}.seconds"] = {"value": elapsed, "unit": "s"}
+            metrics[f"batch.{size}.w{workers}.per_brief.seconds"] = {"value": elapsed / size, "unit": "s"}
+
+
+def compare(metrics: dict, baseline: dict, time_tolerance: float, size_tolerance: float) -> list[str]:
+    regressions = []
+    for name, entry in sorted(metrics.items()):
+        previous = baseline.get(name)
+        if not previous:
+            print(f"  {name:<52} {format_value(entry):>12}   (new)")
+            continue
+        value, before = entry["value"], previous["value"]
+        change = (value - before) / before if before else 0.0
+        tolerance = time_tolerance if entry["unit"] == "s" else size_tolerance
+        regressed = change > tolerance and (entry["unit"] != "s" or value - before > TIME_NOISE_FLOOR)
+        marker = "  REGRESSION" if regressed else ""
+        print(f"  {name:<52} {format_value(entry):>12} {change:+8.1%}{marker}")
+        if regressed:
+            regressions.append(f"{name}: {format_value(previous)} -> {format_value(entry)} ({change:+.1%})")
+    return regressions
+
+
+def format_value(entry: dict) -> str:
+    if entry["unit"] == "s":
+        return f"{entry['value'] * 1000:.1f} ms"
+    return f"{entry['value'] / 1024:.1f} KiB"
+
+
+def parse_int_list(value: str) -> list[int]:
+    return [int(part) for part in value.split(",") if part.strip()]
+
+
+def parse_args(argv: list[str] | None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the premium cahier generator against a local image stand-in.")
+    parser.add_argument("--output", type=Path, default=RESULTS_PATH, help="where to write the results JSON")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH, help="results JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--repeat", type=int, default=5, help="samples per in-process timing (median is kept)")
+    parser.add_argument("--latency-ms", type=float, default=40.0, help="delay the image stand-in adds to every response")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fraction of image requests answered with 503")
+    parser.add_argument("--batch-sizes", type=parse_int_list, default=[20, 100], help="comma-separated lead counts")
+    parser.add_argument("--workers", type=parse_int_list, default=[1, 2, 4], help="comma-separated worker counts")
+    parser.add_argument("--time-tolerance", type=float, default=0.15, help="allowed slowdown before failing")
+    parser.add_argument("--size-tolerance", type=float, default=0.02, help="allowed growth in bytes before failing")
+    parser.add_argument("--skip-scaling", action="store_true", help="skip the batch and parallel scaling runs")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    gen = load_generator()
+    metrics: dict[str, dict] = {}
+    with ImageStandIn(args.latency_ms / 1000, args.failure_rate) as stand_in, tempfile.TemporaryDirectory(
+        prefix="cahier-bench-"
+    ) as tmp:
+        work_dir = Path(tmp)
+        bench_main(metrics, stand_in.base_url, work_dir / "main")
+        configure(gen, stand_in.base_url, work_dir / "inproc")
+        gen.IMAGE_CACHE = gen.ImageCache(gen.IMAGE_CACHE_DIR)
+        gen.ACTIVE_FONT = gen.register_font()
+        gen.warm_prepared_images([items for _, _, items in gen.LOCALE_SOURCES.values()])
+        bench_pages(metrics, gen, args.repeat)
+        bench_documents(metrics, gen, args.repeat)
+        if not args.skip_scaling:
+            bench_latency(metrics, gen, max(20, args.repeat * 4), max(args.workers))
+            bench_scaling(metrics, gen, work_dir, args.batch_sizes, args.workers)
+        image_requests = {"requests": stand_in.requests, "failures": stand_in.failures, "not_modified": stand_in.not_modified}
+    results = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "reportlab": gen.REPORTLAB_VERSION,
+        },
+        "settings": {
+            "repeat": args.repeat,
+            "latency_ms": args.latency_ms,
+            "failure_rate": args.failure_rate,
+            "batch_sizes": args.batch_sizes,
+            "workers": args.workers,
+        },
+        "image_stand_in": image_requests,
+        "metrics": metrics,
+    }
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(results, indent=2, sort_keys=True) + "\n", "utf-8")
+    try:
+        baseline = json.loads(args.baseline.read_text("utf-8"))["metrics"]
+    except (OSError, ValueError, KeyError):
+        baseline = {}
+    print(f"Results written to {args.output}" + ("" if baseline else " (no baseline to compare against)"))
+    regressions = compare(metrics, baseline, args.time_tolerance, args.size_tolerance)
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(results, indent=2, sort_keys=True) + "\n", "utf-8")
+        print(f"Baseline saved to {args.baseline}")
+    elif regressions:
+        raise SystemExit("Regressions against baseline:\n  " + "\n  ".join(regressions))
+
+
+if __name__ == "__main__":
+    main()
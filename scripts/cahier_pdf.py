@@ -0,0 +1,740 @@
+from __future__ import annotations
+
+import base64
+import bisect
+import hashlib
+import re
+import zlib
+from typing import BinaryIO, NamedTuple
+
+WHITESPACE = b"\x00\t\n\x0c\r "
+DELIMITERS = b"()<>[]{}/%"
+NUMBER_RE = re.compile(rb"[+-]?(?:\d+\.?\d*|\.\d+)")
+REF_RE = re.compile(rb"(\d+)\s+(\d+)\s+R(?![A-Za-z0-9])")
+OBJ_HEADER_RE = re.compile(rb"(\d+)\s+(\d+)\s+obj")
+KEYWORD_RE = re.compile(rb"[A-Za-z']+")
+SPACE_RE = re.compile(rb"(?:[\x00\t\n\x0c\r ]+|%[^\r\n]*)*")
+NAME_RE = re.compile(rb"[^\x00\t\n\x0c\r ()<>\[\]{}/%]*")
+PLAIN_NAME_RE = re.compile(r"[^\x00-\x20\x7f-\uffff()<>\[\]{}/%#]*")
+INHERITED_PAGE_KEYS = ("Resources", "MediaBox", "CropBox", "Rotate")
+INHERITED_FIELD_KEYS = ("FT", "V", "Ff")
+RADIO_FLAG = 1 << 15
+LITERAL_ESCAPES = {ord("n"): b"\n", ord("r"): b"\r", ord("t"): b"\t", ord("b"): b"\b", ord("f"): b"\f"}
+# Where PDFDocEncoding, used by text strings without a byte order mark, differs from Latin-1.
+PDFDOC_CHARS = dict(
+    zip(
+        [*range(0x18, 0x20), *range(0x80, 0x9F), 0xA0],
+        "\u02d8\u02c7\u02c6\u02d9\u02dd\u02db\u02da\u02dc"
+        "\u2022\u2020\u2021\u2026\u2014\u2013\u0192\u2044\u2039\u203a\u2212\u2030\u201e\u201c\u201d\u2018"
+        "\u2019\u201a\u2122\ufb01\ufb02\u0141\u0152\u0160\u0178\u017d\u0131\u0142\u0153\u0161\u017e"
+        "\u20ac",
+    )
+)
+PDFDOC_DECODE = str.maketrans({chr(code): char for code, char in PDFDOC_CHARS.items()})
+PDFDOC_ENCODE = str.maketrans(
+    {
+        **{chr(code): "\ufffd" for code in PDFDOC_CHARS},
+        **{char: chr(code) for code, char in PDFDOC_CHARS.items()},
+    }
+)
+
+
+class PdfError(Exception):
+    pass
+
+
+class PdfName(str):
+    pass
+
+
+class PdfRef(NamedTuple):
+    num: int
+    gen: int = 0
+
+
+class PdfStream:
+    def __init__(self, dictionary: dict, raw: bytes) -> None:
+        self.dictionary = dictionary
+        self.raw = raw
+
+    def __getitem__(self, key: str):
+        return self.dictionary[key]
+
+    def get(self, key: str, default=None):
+        return self.dictionary.get(key, default)
+
+    def decoded(self) -> bytes:
+        filters = self.dictionary.get("Filter")
+        if filters is None:
+            return self.raw
+        if not isinstance(filters, list):
+            filters = [filters]
+        parms = self.dictionary.get("DecodeParms")
+        if not isinstance(parms, list):
+            parms = [parms] * len(filters)
+        data = self.raw
+        for name, parm in zip(filters, parms):
+            if name in ("FlateDecode", "Fl"):
+                data = zlib.decompress(data)
+                if isinstance(parm, dict) and parm.get("Predictor", 1) >= 10:
+                    data = png_unpredict(data, parm.get("Columns", 1) * parm.get("Colors", 1))
+            elif name in ("ASCII85Decode", "A85"):
+                data = base64.a85decode(data.strip().removesuffix(b"~>"), adobe=False, ignorechars=WHITESPACE)
+            elif name in ("ASCIIHexDecode", "AHx"):
+                data = bytes.fromhex(re.sub(rb"[^0-9A-Fa-f]", b"", data.split(b">")[0]).decode("ascii"))
+            else:
+                raise PdfError(f"unsupported stream filter {name}")
+        return data
+
+
+def png_unpredict(data: bytes, columns: int) -> bytes:
+    rows = []
+    previous = bytearray(columns)
+    for start in range(0, len(data), columns + 1):
+        kind = data[start]
+        row = bytearray(data[start + 1 : start + 1 + columns])
+        for i in range(len(row)):
+            left = row[i - 1] if i else 0
+            up = previous[i]
+            if kind == 1:
+                row[i] = (row[i] + left) & 0xFF
+            elif kind == 2:
+                row[i] = (row[i] + up) & 0xFF
+            elif kind == 3:
+                row[i] = (row[i] + (left + up) // 2) & 0xFF
+            elif kind == 4:
+                up_left = previous[i - 1] if i else 0
+                estimate = left + up - up_left
+                distances = (abs(estimate - left), abs(estimate - up), abs(estimate - up_left))
+                row[i] = (row[i] + (left, up, up_left)[distances.index(min(distances))]) & 0xFF
+        rows.append(bytes(row))
+        previous = row
+    return b"".join(rows)
+
+
+class Parser:
+    def __init__(self, data, pos: int = 0, resolve_length=None) -> None:
+        self.data = data
+        self.pos = pos
+        self.resolve_length = resolve_length
+
+    def skip_whitespace(self) -> None:
+        self.pos = SPACE_RE.match(self.data, self.pos).end()
+
+    def parse(self):
+        self.skip_whitespace()
+        data = self.data
+        char = data[self.pos : self.pos + 1]
+        if char == b"/":
+            return self.parse_name()
+        if char == b"(":
+            return self.parse_literal()
+        if char == b"<":
+            if data[self.pos + 1 : self.pos + 2] == b"<":
+                return self.parse_dict_or_stream()
+            return self.parse_hex()
+        if char == b"[":
+            self.pos += 1
+            items = []
+            while True:
+                self.skip_whitespace()
+                if data[self.pos : self.pos + 1] == b"]":
+                    self.pos += 1
+                    return items
+                items.append(self.parse())
+        ref = REF_RE.match(data, self.pos)
+        if ref:
+            self.pos = ref.end()
+            return PdfRef(int(ref.group(1)), int(ref.group(2)))
+        number = NUMBER_RE.match(data, self.pos)
+        if number:
+            self.pos = number.end()
+            text = number.group()
+            return float(text) if b"." in text else int(text)
+        keyword = KEYWORD_RE.match(data, self.pos)
+        if keyword:
+            self.pos = keyword.end()
+            word = keyword.group()
+            if word == b"true":
+                return True
+            if word == b"false":
+                return False
+            if word == b"null":
+                return None
+            raise PdfError(f"unexpected keyword {word!r} at offset {keyword.start()}")
+        raise PdfError(f"unexpected byte {char!r} at offset {self.pos}")
+
+    def parse_name(self) -> PdfName:
+        match = NAME_RE.match(self.data, self.pos + 1)
+        self.pos = match.end()
+        raw = match.group()
+        if b"#" in raw:
+            raw = re.sub(rb"#([0-9A-Fa-f]{2})", lambda match: bytes([int(match.group(1), 16)]), raw)
+        return PdfName(raw.decode("latin-1"))
+
+    def parse_literal(self) -> bytes:
+        data = self.data
+        self.pos += 1
+        depth = 1
+        out = bytearray()
+        while True:
+            char = data[self.pos]
+            self.pos += 1
+            if char == 0x5C:  # backslash
+                escaped = data[self.pos]
+                self.pos += 1
+                if escaped in LITERAL_ESCAPES:
+                    out += LITERAL_ESCAPES[escaped]
+                elif 0x30 <= escaped <= 0x37:
+                    digits = bytes([escaped])
+                    while len(digits) < 3 and 0x30 <= data[self.pos] <= 0x37:
+                        digits += bytes([data[self.pos]])
+                        self.pos += 1
+                    out.append(int(digits, 8) & 0xFF)
+                elif escaped == 0x0D:
+                    if data[self.pos] == 0x0A:
+                        self.pos += 1
+                elif escaped != 0x0A:
+                    out.append(escaped)
+            elif char == 0x28:
+                depth += 1
+                out.append(char)
+            elif char == 0x29:
+                depth -= 1
+                if not depth:
+                    return bytes(out)
+                out.append(char)
+            else:
+                out.append(char)
+
+    def parse_hex(self) -> bytes:
+        # find rather than index: the data may be an mmap, which has no index().
+        end = self.data.find(b">", self.pos)
+        if end < 0:
+            raise PdfError(f"unterminated hex string at offset {self.pos}")
+        digits = re.sub(rb"[^0-9A-Fa-f]", b"", bytes(self.data[self.pos + 1 : end]))
+        self.pos = end + 1
+        if len(digits) % 2:
+            digits += b"0"
+        return bytes.fromhex(digits.decode("ascii"))
+
+    def parse_dict_or_stream(self):
+        data = self.data
+        self.pos += 2
+        dictionary = {}
+        while True:
+            self.skip_whitespace()
+            if data[self.pos : self.pos + 2] == b">>":
+                self.pos += 2
+                break
+            key = self.parse()
+            dictionary[str(key)] = self.parse()
+        after = self.pos
+        self.skip_whitespace()
+        if data[self.pos : self.pos + 6] != b"stream":
+            self.pos = after
+            return dictionary
+        start = self.pos + 6
+        if data[start : start + 2] == b"\r\n":
+            start += 2
+        elif data[start : start + 1] in (b"\n", b"\r"):
+            start += 1
+        length = dictionary.get("Length")
+        if isinstance(length, PdfRef):
+            length = self.resolve_length(length) if self.resolve_length else None
+        end = start + length if isinstance(length, int) else -1
+        if end < 0 or data[end : end + 12].lstrip(b"\r\n")[:9] != b"endstream":
+            end = data.find(b"endstream", start)
+            while end > start and data[end - 1] in b"\r\n":
+                end -= 1
+        self.pos = data.find(b"endstream", end) + 9
+        return PdfStream(dictionary, bytes(data[start:end]))
+
+
+class PdfFile:
+    def __init__(self, data) -> None:
+        self.data = data
+        self.xref: dict[int, tuple] = {}
+        self.trailer: dict = {}
+        self.cache: dict[int, object] = {}
+        self.object_streams: dict[int, tuple[bytes, int, list[int]]] = {}
+        try:
+            self.startxref = self.find_startxref()
+            self.load_xref_chain(self.startxref)
+        except (PdfError, ValueError, IndexError, zlib.error):
+            self.rebuild_xref()
+        if "Root" not in self.trailer:
+            self.rebuild_xref()
+
+    @property
+    def size(self) -> int:
+        return max(self.trailer.get("Size", 0), max(self.xref, default=0) + 1)
+
+    def find_startxref(self) -> int:
+        index = self.data.rfind(b"startxref", max(0, len(self.data) - 2048))
+        if index < 0:
+            raise PdfError("startxref not found")
+        parser = Parser(self.data, index + 9)
+        offset = parser.parse()
+        if not isinstance(offset, int):
+            raise PdfError("malformed startxref")
+        return offset
+
+    def load_xref_chain(self, offset: int) -> None:
+        seen = set()
+        while offset is not None and offset not in seen:
+            seen.add(offset)
+            parser = Parser(self.data, offset)
+            parser.skip_whitespace()
+            if self.data[parser.pos : parser.pos + 4] == b"xref":
+                trailer = self.load_xref_table(parser)
+                if isinstance(trailer.get("XRefStm"), int):
+                    self.load_xref_stream(trailer["XRefStm"])
+            else:
+                trailer = self.load_xref_stream(parser.pos)
+            for key, value in trailer.items():
+                self.trailer.setdefault(key, value)
+            offset = trailer.get("Prev")
+
+    def load_xref_table(self, parser: Parser) -> dict:
+        data = self.data
+        parser.pos += 4
+        while True:
+            parser.skip_whitespace()
+            if data[parser.pos : parser.pos + 7] == b"trailer":
+                parser.pos += 7
+                return parser.parse()
+            start = parser.parse()
+            count = parser.parse()
+            parser.skip_whitespace()
+            for num in range(start, start + count):
+                entry = bytes(data[parser.pos : parser.pos + 20])
+                fields = entry.split()
+                if len(fields) < 3:
+                    raise PdfError(f"malformed xref entry at offset {parser.pos}")
+                if num not in self.xref:
+                    self.xref[num] = ("offset", int(fields[0])) if fields[2] == b"n" else ("free",)
+                parser.pos += 18
+                parser.skip_whitespace()
+
+    def load_xref_stream(self, offset: int) -> dict:
+        stream = self.parse_indirect(offset)
+        if not isinstance(stream, PdfStream) or stream.get("Type") != "XRef":
+            raise PdfError(f"no xref stream at offset {offset}")
+        widths = stream["W"]
+        index = stream.get("Index", [0, stream["Size"]])
+        data = stream.decoded()
+        entry_size = sum(widths)
+        position = 0
+        for first, count in zip(index[0::2], index[1::2]):
+            for num in range(first, first + count):
+                fields = []
+                for width in widths:
+                    fields.append(int.from_bytes(data[position : position + width], "big") if width else None)
+                    position += width
+                kind = 1 if fields[0] is None else fields[0]
+                if num in self.xref:
+                    continue
+                if kind == 1:
+                    self.xref[num] = ("offset", fields[1])
+                elif kind == 2:
+                    self.xref[num] = ("compressed", fields[1], fields[2])
+                else:
+                    self.xref[num] = ("free",)
+        if position > len(data) + entry_size:
+            raise PdfError("truncated xref stream")
+        return stream.dictionary
+
+    def rebuild_xref(self) -> None:
+        self.xref.clear()
+        self.trailer.clear()
+        self.startxref = None
+        for match in OBJ_HEADER_RE.finditer(self.data):
+            self.xref[int(match.group(1))] = ("offset", match.start())
+        for match in re.finditer(rb"trailer\s*<<", self.data):
+            trailer = Parser(self.data, match.end() - 2).parse()
+            self.trailer.update(trailer)
+        if "Root" not in self.trailer:
+            for num in self.xref:
+                value = self.get(num)
+                if isinstance(value, PdfStream) and value.get("Type") == "XRef":
+                    self.trailer.update(value.dictionary)
+                elif isinstance(value, dict) and value.get("Type") == "Catalog":
+                    self.trailer.setdefault("Root", PdfRef(num))
+        if "Root" not in self.trailer:
+            raise PdfError("document catalog not found")
+
+    def parse_indirect(self, offset: int):
+        header = OBJ_HEADER_RE.match(self.data, offset)
+        if not header:
+            raise PdfError(f"no object at offset {offset}")
+        return Parser(self.data, header.end(), self.resolve_length).parse()
+
+    def resolve_length(self, ref: PdfRef):
+        value = self.get(ref.num)
+        return value if isinstance(value, int) else None
+
+    def get(self, num: int):
+        if num in self.cache:
+            return self.cache[num]
+        entry = self.xref.get(num, ("free",))
+        if entry[0] == "offset":
+            value = self.parse_indirect(entry[1])
+        elif entry[0] == "compressed":
+            value = self.get_compressed(entry[1], entry[2], num)
+        else:
+            value = None
+        self.cache[num] = value
+        return value
+
+    def get_compressed(self, stream_num: int, index: int, num: int):
+        if stream_num not in self.object_streams:
+            stream = self.get(stream_num)
+            decoded = stream.decoded()
+            header = Parser(decoded)
+            offsets = [header.parse() for _ in range(2 * stream["N"])]
+            self.object_streams[stream_num] = (decoded, stream["First"], offsets)
+        decoded, first, offsets = self.object_streams[stream_num]
+        if offsets[2 * index] != num:
+            pairs = dict(zip(offsets[0::2], offsets[1::2]))
+            if num not in pairs:
+                raise PdfError(f"object {num} missing from object stream {stream_num}")
+            return Parser(decoded, first + pairs[num]).parse()
+        return Parser(decoded, first + offsets[2 * index + 1]).parse()
+
+    def resolve(self, value):
+        seen = 0
+        while isinstance(value, PdfRef):
+            value = self.get(value.num)
+            seen += 1
+            if seen > 32:
+                raise PdfError("reference loop")
+        return value
+
+    @property
+    def root(self) -> dict:
+        return self.resolve(self.trailer["Root"])
+
+    def pages(self) -> list[tuple[PdfRef, dict]]:
+        pages = []
+        stack = [(self.root["Pages"], {})]
+        while stack:
+            ref, inherited = stack.pop()
+            node = self.resolve(ref)
+            if node.get("Type") == "Pages" or "Kids" in node:
+                inherited = {**inherited, **{key: node[key] for key in INHERITED_PAGE_KEYS if key in node}}
+                stack.extend((kid, inherited) for kid in reversed(node["Kids"]))
+            else:
+                pages.append((ref, {**inherited, **node}))
+        return pages
+
+
+def form_values(pdf: PdfFile) -> dict[str, object]:
+    # Only the AcroForm field tree is resolved; pages, content and images are never parsed.
+    acroform = pdf.resolve(pdf.root.get("AcroForm")) or {}
+    values: dict[str, object] = {}
+    seen: set[int] = set()
+    stack = [(ref, "", {}) for ref in reversed(pdf.resolve(acroform.get("Fields")) or [])]
+    while stack:
+        ref, parent_name, inherited = stack.pop()
+        if isinstance(ref, PdfRef):
+            if ref.num in seen:
+                continue
+            seen.add(ref.num)
+        node = pdf.resolve(ref)
+        if not isinstance(node, dict):
+            continue
+        name = parent_name
+        if "T" in node:
+            partial = decode_text(pdf.resolve(node["T"]))
+            name = f"{parent_name}.{partial}" if parent_name else partial
+        inherited = {**inherited, **{key: node[key] for key in INHERITED_FIELD_KEYS if key in node}}
+        kids = [(kid, pdf.resolve(kid)) for kid in pdf.resolve(node.get("Kids")) or []]
+        # Kids without a /T are widget annotations of this field, not child fields.
+        fields = [kid for kid, value in kids if isinstance(value, dict) and "T" in value]
+        if fields:
+            stack.extend((kid, name, inherited) for kid in reversed(fields))
+            continue
+        value = pdf.resolve(inherited.get("V"))
+        kind = pdf.resolve(inherited.get("FT"))
+        if kind == "Btn":
+            if value is None:
+                states = [node.get("AS"), *(widget.get("AS") for _, widget in kids if isinstance(widget, dict))]
+                value = next((state for state in states if state is not None and state != "Off"), None)
+            if pdf.resolve(inherited.get("Ff", 0)) & RADIO_FLAG:
+                values[name] = None if value in (None, "Off") else str(value)
+            else:
+                values[name] = value not in (None, "Off")
+        elif isinstance(value, list):
+            values[name] = [decode_text(pdf.resolve(item)) for item in value]
+        elif isinstance(value, PdfStream):
+            values[name] = decode_text(value.decoded())
+        else:
+            values[name] = None if value is None else decode_text(value)
+    return values
+
+
+def format_number(value: float) -> bytes:
+    if isinstance(value, bool):
+        return b"true" if value else b"false"
+    if isinstance(value, int) or float(value).is_integer():
+        return b"%d" % int(value)
+    return (b"%.6f" % value).rstrip(b"0").rstrip(b".")
+
+
+def serialize_name(name: str) -> bytes:
+    if PLAIN_NAME_RE.fullmatch(name):
+        return b"/" + name.encode("ascii")
+    out = bytearray(b"/")
+    for char in name.encode("latin-1"):
+        if char < 0x21 or char > 0x7E or char in DELIMITERS or char == 0x23:
+            out += b"#%02X" % char
+        else:
+            out.append(char)
+    return bytes(out)
+
+
+def serialize_string(value: bytes) -> bytes:
+    if all(0x20 <= char < 0x7F for char in value):
+        return b"(" + value.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+    return b"<" + value.hex().encode("ascii") + b">"
+
+
+def serialize(value) -> bytes:
+    if value is None:
+        return b"null"
+    if isinstance(value, PdfName):
+        return serialize_name(value)
+    if isinstance(value, PdfRef):
+        return b"%d %d R" % (value.num, value.gen)
+    if isinstance(value, (bool, int, float)):
+        return format_number(value)
+    if isinstance(value, bytes):
+        return serialize_string(value)
+    if isinstance(value, str):
+        return serialize_string(pdf_text(value))
+    if isinstance(value, list):
+        return b"[" + b" ".join(serialize(item) for item in value) + b"]"
+    if isinstance(value, dict):
+        return b"<<" + b"".join(serialize_name(key) + b" " + serialize(item) for key, item in value.items()) + b">>"
+    if isinstance(value, PdfStream):
+        dictionary = dict(value.dictionary)
+        dictionary["Length"] = len(value.raw)
+        return serialize(dictionary) + b"\nstream\n" + value.raw + b"\nendstream"
+    raise TypeError(f"cannot serialise {type(value).__name__}")
+
+
+def pdf_text(value: str) -> bytes:
+    try:
+        return value.translate(PDFDOC_ENCODE).encode("latin-1")
+    except UnicodeEncodeError:
+        return b"\xfe\xff" + value.encode("utf-16-be")
+
+
+def decode_text(value) -> str:
+    if isinstance(value, str):
+        return str(value)
+    if isinstance(value, bytes):
+        if value.startswith(b"\xfe\xff"):
+            return value[2:].decode("utf-16-be", "replace")
+        if value.startswith(b"\xef\xbb\xbf"):
+            return value[3:].decode("utf-8", "replace")
+        return value.decode("latin-1").translate(PDFDOC_DECODE)
+    return "" if value is None else str(value)
+
+
+def escape_content_string(value: bytes) -> bytes:
+    return value.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)").replace(b"\r", b"\\r")
+
+
+def append_update(pdf: PdfFile, objects: dict[int, object]) -> bytes:
+    out = bytearray(pdf.data)
+    if not out.endswith(b"\n"):
+        out += b"\n"
+    offsets = {}
+    for num in sorted(objects):
+        offsets[num] = len(out)
+        out += b"%d 0 obj\n" % num + serialize(objects[num]) + b"\nendobj\n"
+    xref_offset = len(out)
+    out += b"xref\n"
+    numbers = sorted(offsets)
+    run_start = 0
+    for i in range(1, len(numbers) + 1):
+        if i == len(numbers) or numbers[i] != numbers[i - 1] + 1:
+            run = numbers[run_start:i]
+            out += b"%d %d\n" % (run[0], len(run))
+            for num in run:
+                out += b"%010d 00000 n\r\n" % offsets[num]
+            run_start = i
+    trailer = {key: pdf.trailer[key] for key in ("Root", "Info", "ID") if key in pdf.trailer}
+    trailer["Size"] = max([pdf.size, *(num + 1 for num in numbers)])
+    if pdf.startxref is not None:
+        trailer["Prev"] = pdf.startxref
+    out += b"trailer\n" + serialize(trailer) + b"\nstartxref\n%d\n%%%%EOF\n" % xref_offset
+    return bytes(out)
+
+
+def references(value, skip: tuple[str, ...] = ()) -> list[PdfRef]:
+    found = []
+    stack = [value]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, PdfRef):
+            found.append(item)
+        elif isinstance(item, PdfStream):
+            stack.append(item.dictionary)
+        elif isinstance(item, dict):
+            stack.extend(child for key, child in item.items() if key not in skip)
+        elif isinstance(item, list):
+            stack.extend(item)
+    return found
+
+
+def object_sizes(pdf: PdfFile) -> dict[int, int]:
+    # Each object is charged the bytes up to the next object, so whitespace and
+    # "endobj" count too; xref sections and trailers are left unattributed.
+    placed = sorted((entry[1], num) for num, entry in pdf.xref.items() if entry[0] == "offset")
+    boundaries = sorted({offset for offset, _ in placed} | {match.start() for match in re.finditer(rb"(?m)^xref\b", pdf.data)})
+    sizes = {}
+    for offset, num in placed:
+        index = bisect.bisect_left(boundaries, offset)
+        end = boundaries[index + 1] if index + 1 < len(boundaries) else len(pdf.data)
+        header_end = pdf.data.find(b"endobj", offset, end)
+        sizes[num] = (header_end + 6 if header_end >= 0 else end) - offset
+    return sizes
+
+
+class PdfWriter:
+    def __init__(self, output: BinaryIO) -> None:
+        self.output = output
+        self.position = 0
+        self.offsets: list[int | None] = [None]
+        self.shared: dict[bytes, PdfRef] = {}
+        self.page_refs: list[PdfRef] = []
+        self.fields: list[PdfRef] = []
+        self.field_names: set[str] = set()
+        self.form_defaults: dict = {}
+        self.info: PdfRef | None = None
+        self.digest = hashlib.md5()
+        self.catalog_ref = self.reserve()
+        self.pages_ref = self.reserve()
+        self.write(b"%PDF-1.4\n%\x93\x8c\x8b\x9e\n")
+
+    def write(self, data: bytes) -> None:
+        self.output.write(data)
+        self.position += len(data)
+        self.digest.update(data)
+
+    def reserve(self) -> PdfRef:
+        self.offsets.append(None)
+        return PdfRef(len(self.offsets) - 1)
+
+    def write_object(self, ref: PdfRef, value) -> None:
+        self.offsets[ref.num] = self.position
+        self.write(b"%d 0 obj\n" % ref.num + serialize(value) + b"\nendobj\n")
+
+    def add_object(self, value) -> PdfRef:
+        # Objects are written after their children, so identical fonts, images and
+        # forms coming from different parts collapse onto a single copy.
+        data = serialize(value)
+        key = hashlib.sha256(data).digest()
+        ref = self.shared.get(key)
+        if ref is None:
+            ref = self.shared[key] = self.reserve()
+            self.offsets[ref.num] = self.position
+            self.write(b"%d 0 obj\n" % ref.num + data + b"\nendobj\n")
+        return ref
+
+    def append_document(self, pdf: PdfFile) -> None:
+        acroform = pdf.resolve(pdf.root.get("AcroForm")) or {}
+        fields = pdf.resolve(acroform.get("Fields")) or []
+        names = set()
+        for field in fields:
+            field = pdf.resolve(field)
+            if "Kids" in field or "Parent" in field:
+                raise PdfError("hierarchical form fields are not supported")
+            name = decode_text(pdf.resolve(field.get("T")))
+            if name in self.field_names or name in names:
+                raise PdfError(f"form field {name!r} appears in more than one part")
+            names.add(name)
+        pages = pdf.pages()
+        page_refs = {ref.num: self.reserve() for ref, _ in pages}
+        copied: dict[int, PdfRef] = {}
+        active: dict[int, PdfRef | None] = {}
+
+        def copy(value):
+            if isinstance(value, PdfRef):
+                return copy_ref(value.num)
+            if isinstance(value, dict):
+                return {key: copy(item) for key, item in value.items()}
+            if isinstance(value, list):
+                return [copy(item) for item in value]
+            if isinstance(value, PdfStream):
+                return PdfStream(copy(value.dictionary), value.raw)
+            return value
+
+        def copy_ref(num: int) -> PdfRef | None:
+            if num in page_refs:
+                return page_refs[num]
+            if num in copied:
+                return copied[num]
+            if num in active:
+                # A reference cycle: hand out a number now and write the object under it later.
+                if active[num] is None:
+                    active[num] = self.reserve()
+                return active[num]
+            value = pdf.get(num)
+            if isinstance(value, dict) and value.get("Type") in ("Page", "Pages"):
+                return None
+            active[num] = None
+            value = copy(value)
+            forward = active.pop(num)
+            if forward is not None:
+                self.write_object(forward, value)
+            copied[num] = ref = forward or self.add_object(value)
+            return ref
+
+        for ref, page in pages:
+            page = {key: copy(value) for key, value in page.items() if key != "Parent"}
+            page["Parent"] = self.pages_ref
+            self.write_object(page_refs[ref.num], page)
+            self.page_refs.append(page_refs[ref.num])
+        self.fields.extend(copy(field) for field in fields)
+        self.field_names |= names
+        if fields:
+            for key in ("DA", "NeedAppearances", "Q"):
+                if key in acroform and key not in self.form_defaults:
+                    self.form_defaults[key] = copy(acroform[key])
+            # Each part only lists the resources its own fields need: merge them by name.
+            resources = self.form_defaults.setdefault("DR", {})
+            for category, entries in (pdf.resolve(acroform.get("DR")) or {}).items():
+                entries = pdf.resolve(entries)
+                if isinstance(entries, dict):
+                    merged = resources.setdefault(category, {})
+                    for name, value in entries.items():
+                        if name not in merged:
+                            merged[name] = copy(value)
+                elif category not in resources:
+                    resources[category] = copy(entries)
+        if self.info is None and "Info" in pdf.trailer:
+            self.info = self.add_object(copy(pdf.resolve(pdf.trailer["Info"])))
+
+    def close(self) -> None:
+        self.write_object(
+            self.pages_ref,
+            {"Type": PdfName("Pages"), "Count": len(self.page_refs), "Kids": self.page_refs},
+        )
+        catalog = {"Type": PdfName("Catalog"), "Pages": self.pages_ref}
+        if self.fields:
+            catalog["AcroForm"] = {**self.form_defaults, "Fields": self.fields}
+        self.write_object(self.catalog_ref, catalog)
+        document_id = self.digest.digest()
+        xref_offset = self.position
+        entries = [b"xref\n0 %d\n" % len(self.offsets), b"0000000000 65535 f\r\n"]
+        for offset in self.offsets[1:]:
+            entries.append(b"0000000000 65535 f\r\n" if offset is None else b"%010d 00000 n\r\n" % offset)
+        self.write(b"".join(entries))
+        trailer = {"Size": len(self.offsets), "Root": self.catalog_ref, "ID": [document_id, document_id]}
+        if self.info:
+            trailer["Info"] = self.info
+        self.write(b"trailer\n" + serialize(trailer) + b"\nstartxref\n%d\n%%%%EOF\n" % xref_offset)
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import argparse
+import json
+import mmap
+import sys
+import time
+import zlib
+from pathlib import Path
+
+from cahier_pdf import PdfError, PdfFile, form_values
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+FIELD_SCHEMA_PATH = BASE_DIR / "src" / "data" / "cahier-fields.json"
+# Same limit as src/app/api/brief/route.ts.
+MAX_PDF_BYTES = 4 * 1024 * 1024
+
+
+def load_schema(path: Path = FIELD_SCHEMA_PATH) -> dict[str, dict]:
+    try:
+        return json.loads(path.read_text("utf-8"))["fields"]
+    except (OSError, ValueError, KeyError) as error:
+        raise SystemExit(f"Field schema {path}: {error}; run scripts/generate-premium-cahier.py first") from None
+
+
+def typed_record(values: dict[str, object], schema: dict[str, dict]) -> dict[str, str | bool | None]:
+    record: dict[str, str | bool | None] = {}
+    for name, spec in schema.items():
+        value = values.get(name)
+        if spec["type"] == "checkbox":
+            record[name] = value is True or (isinstance(value, str) and value not in ("", "Off"))
+        elif isinstance(value, list):
+            record[name] = ", ".join(value) or None
+        else:
+            record[name] = value if isinstance(value, str) and value.strip() else None
+    return record
+
+
+def check_size(size: int, max_bytes: int) -> None:
+    if not size:
+        raise PdfError("empty file")
+    if size > max_bytes:
+        raise PdfError(f"{size} bytes, limit is {max_bytes}")
+
+
+def extract_data(data, schema: dict[str, dict]) -> dict:
+    values = form_values(PdfFile(data))
+    unknown = sorted(set(values) - set(schema))
+    return {"fields": typed_record(values, schema), "unknown": unknown}
+
+
+def extract(path: Path, schema: dict[str, dict], max_bytes: int = MAX_PDF_BYTES) -> dict:
+    with path.open("rb") as handle:
+        check_size(handle.seek(0, 2), max_bytes)
+        # Mapped rather than read: only the trailer, xref and form objects are ever paged in.
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return extract_data(data, schema)
+
+
+def parse_args(argv: list[str] | None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Read the form values of filled cahier PDFs as JSON lines.")
+    parser.add_argument("pdfs", nargs="+", type=Path, help="filled cahier PDFs")
+    parser.add_argument("--schema", type=Path, default=FIELD_SCHEMA_PATH, help="field schema written by the generator")
+    parser.add_argument(
+        "--max-mb",
+        type=float,
+        default=MAX_PDF_BYTES / (1024 * 1024),
+        help="refuse larger files, like the brief upload endpoint",
+    )
+    parser.add_argument("--strict", action="store_true", help="fail on fields the schema does not know")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    schema = load_schema(args.schema)
+    max_bytes = int(args.max_mb * 1024 * 1024)
+    failures = 0
+    for path in args.pdfs:
+        started = time.perf_counter()
+        try:
+            result = extract(path, schema, max_bytes)
+        except (OSError, PdfError, ValueError, IndexError, KeyError, TypeError, zlib.error) as error:
+            failures += 1
+            print(f"{path}: {type(error).__name__}: {error}", file=sys.stderr)
+            continue
+        if args.strict and result["unknown"]:
+            failures += 1
+            print(f"{path}: fields missing from the schema: {', '.join(result['unknown'])}", file=sys.stderr)
+            continue
+        result = {"path": str(path), **result, "ms": round((time.perf_counter() - started) * 1000, 2)}
+        print(json.dumps(result, ensure_ascii=False))
+    if failures:
+        raise SystemExit(f"{failures} of {len(args.pdfs)} PDF(s) could not be read")
+
+
+if __name__ == "__main__":
+    main()
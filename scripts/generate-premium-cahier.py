@@ -1,16 +1,63 @@
 from __future__ import annotations
 
+import argparse
+import ast
+import cProfile
+import csv
+import hashlib
+import importlib
+import importlib.util
+import json
+import math
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import traceback
+import unicodedata
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+from dataclasses import dataclass
+from itertools import islice
+from multiprocessing import util as multiprocessing_util
+from typing import BinaryIO, Iterator
 from pathlib import Path
 from io import BytesIO
-from urllib.request import urlopen
+from urllib.error import HTTPError
+from urllib.parse import urlparse
+from urllib.request import Request, urlopen
 
+from reportlab import Version as REPORTLAB_VERSION
 from reportlab.lib import colors
-from reportlab.lib.pagesizes import A4
+from reportlab.lib.pagesizes import A4, LETTER
 from reportlab.lib.units import mm
 from reportlab.lib.utils import ImageReader, simpleSplit
 from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfbase.acroform import AcroForm
+from reportlab.pdfbase.ttfonts import TTFont, TTFontFace
 from reportlab.pdfgen import canvas
+from reportlab.pdfgen.canvas import _digester
+from PIL import Image
+
+from cahier_pdf import (
+    PdfError,
+    PdfFile,
+    PdfName,
+    PdfRef,
+    PdfStream,
+    PdfWriter,
+    append_update,
+    decode_text,
+    escape_content_string,
+    format_number,
+    object_sizes,
+    pdf_text,
+    references,
+)
 
 BASE_DIR = Path(__file__).resolve().parents[1]
 OUTPUT_PATH = BASE_DIR / "public" / "cahier-des-charges.pdf"
@@ -26,9 +73,25 @@ FONT_PATH = (
     / "noto-sans-v27-latin-regular.ttf"
 )
 LOGO_PATH = BASE_DIR / "public" / "apple-touch-icon.png"
+PDF_LIBRARY_PATH = Path(__file__).with_name("cahier_pdf.py")
+PUBLIC_DIR = BASE_DIR / "public"
+PDF_SIDECAR_PATH = BASE_DIR / "src" / "data" / "cahier-pdf.json"
+FIELD_SCHEMA_PATH = BASE_DIR / "src" / "data" / "cahier-fields.json"
+CACHE_DIR = BASE_DIR / ".cache" / "cahier"
+BUILD_MANIFEST_PATH = CACHE_DIR / "build-manifest.json"
+IMAGE_CACHE_DIR = CACHE_DIR / "images"
+IMAGE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+FONT_CACHE_DIR: Path | None = CACHE_DIR / "fonts"
+PAGE_CACHE_DIR: Path | None = CACHE_DIR / "pages"
+PAGE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+TEXT_LAYOUT_PATH = CACHE_DIR / "text-layout.json"
+TEXT_LAYOUT_MAX_ENTRIES = 4096
+
+GENERATOR_VERSION = 1
 
 FONT_NAME = "NotoSans"
 FALLBACK_FONT = "Helvetica"
+TRUTHY_VALUES = {"1", "true", "yes", "y", "x", "on", "oui"}
 
 BG_COLOR = colors.HexColor("#0B0B0B")
 CARD_COLOR = colors.HexColor("#1B1814")
@@ -38,6 +101,13 @@ ACCENT_COLOR = colors.HexColor("#D6B36A")
 LINE_COLOR = colors.HexColor("#3A2F1F")
 FIELD_BG_COLOR = colors.HexColor("#14110D")
 
+IMAGE_TIMEOUT = 6
+IMAGE_DPI = 200
+JPEG_QUALITY = 82
+PREFETCH_WORKERS = 8
+PREFETCH_PER_HOST = 2
+PREFETCH_DEADLINE = 15.0
+
 AI_GUIDE_ITEMS_FR = [
     {
         "title": "Automatisation relation client",
@@ -321,60 +391,464 @@ COPY_EN = {
 }
 
 
-def register_font() -> str:
+TRACE_EVENTS: list[dict] | None = None
+TRACE_PATH: Path | None = None
+PROFILER: cProfile.Profile | None = None
+PROFILE_PATH: Path | None = None
+
+
+@contextmanager
+def span(name: str, /, **args):
+    if TRACE_EVENTS is None:
+        yield
+        return
+    started = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        TRACE_EVENTS.append(
+            {
+                "name": name,
+                "ph": "X",
+                "ts": started / 1000,
+                "dur": (time.perf_counter_ns() - started) / 1000,
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+                "args": args,
+            }
+        )
+
+
+def start_instrumentation(trace_path: Path | None, profile_path: Path | None, role: str) -> None:
+    global PROFILER, PROFILE_PATH, TRACE_EVENTS, TRACE_PATH
+    TRACE_PATH = trace_path
+    PROFILE_PATH = profile_path
+    TRACE_EVENTS = None
+    if trace_path:
+        TRACE_EVENTS = [{"name": "process_name", "ph": "M", "pid": os.getpid(), "args": {"name": f"{role} {os.getpid()}"}}]
+    PROFILER = None
+    if profile_path:
+        PROFILER = cProfile.Profile()
+        PROFILER.enable()
+
+
+def instrumentation_part(path: Path) -> Path:
+    return path.with_name(f"{path.name}.{os.getpid()}.part")
+
+
+def init_worker_instrumentation(instrumentation: tuple[Path | None, Path | None]) -> None:
+    start_instrumentation(*instrumentation, role="worker")
+    if any(instrumentation):
+        # Pool workers leave through multiprocessing's exit hooks, not atexit.
+        multiprocessing_util.Finalize(None, flush_worker_instrumentation, exitpriority=10)
+
+
+def flush_worker_instrumentation() -> None:
+    if TRACE_PATH and TRACE_EVENTS:
+        instrumentation_part(TRACE_PATH).write_text(json.dumps(TRACE_EVENTS), "utf-8")
+    if PROFILE_PATH and PROFILER:
+        PROFILER.disable()
+        PROFILER.dump_stats(instrumentation_part(PROFILE_PATH))
+
+
+def finish_instrumentation() -> None:
+    if TRACE_PATH and TRACE_EVENTS is not None:
+        events = list(TRACE_EVENTS)
+        for part in sorted(TRACE_PATH.parent.glob(f"{TRACE_PATH.name}.*.part")):
+            events.extend(json.loads(part.read_text("utf-8")))
+            part.unlink()
+        TRACE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        TRACE_PATH.write_text(json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}), "utf-8")
+        print(f"Trace written to {TRACE_PATH} ({len(events)} events)")
+    if PROFILE_PATH and PROFILER:
+        PROFILER.disable()
+        stats = pstats.Stats(PROFILER)
+        for part in sorted(PROFILE_PATH.parent.glob(f"{PROFILE_PATH.name}.*.part")):
+            stats.add(str(part))
+            part.unlink()
+        PROFILE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        stats.dump_stats(PROFILE_PATH)
+        print(f"Profile written to {PROFILE_PATH}; hottest generator functions:")
+        stats.sort_stats("cumulative").print_stats(re.escape(Path(__file__).name), 20)
+
+
+def write_atomic(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+
+class CachedFontFace(TTFontFace):
+    @classmethod
+    def from_face(cls, face: TTFontFace, subset_dir: Path | None) -> CachedFontFace:
+        # Takes over the tables reportlab already parsed instead of reading the file again.
+        cached = cls.__new__(cls)
+        cached.__dict__.update(face.__dict__)
+        cached.subset_dir = subset_dir
+        return cached
+
+    def makeSubset(self, subset: list[int]) -> bytes:
+        # Briefs of one locale embed the same glyph subsets, so each is built once per font.
+        subsets = self.__dict__.setdefault("subsets", {})
+        key = tuple(subset)
+        data = subsets.get(key)
+        if data is not None:
+            return data
+        subset_dir = getattr(self, "subset_dir", None)
+        subset_path = subset_dir / f"{hashlib.sha256(repr(key).encode('ascii')).hexdigest()}.ttf" if subset_dir else None
+        if subset_path and subset_path.exists():
+            data = subset_path.read_bytes()
+        else:
+            data = super().makeSubset(subset)
+            if subset_path:
+                write_atomic(subset_path, data)
+        subsets[key] = data
+        return data
+
+
+class CachedTTFont(TTFont):
+    def __init__(self, name: str, filename: str, subset_dir: Path | None = None, **kwargs) -> None:
+        super().__init__(name, filename, **kwargs)
+        self.face = CachedFontFace.from_face(self.face, subset_dir)
+
+
+def font_subset_dir(path: Path) -> Path | None:
+    if FONT_CACHE_DIR is None:
+        return None
+    return FONT_CACHE_DIR / hashlib.sha256(path.read_bytes() + REPORTLAB_VERSION.encode("ascii")).hexdigest()
+
+
+def register_font(reload: bool = False) -> str:
+    if FONT_NAME in pdfmetrics.getRegisteredFontNames() and not reload:
+        return FONT_NAME
+    if reload:
+        # registerFont keeps the first font of a name, and of a face name, so the old file
+        # has to be dropped for the new one to be used.
+        old = pdfmetrics._fonts.pop(FONT_NAME, None)
+        if old is not None and old._dynamicFont:
+            pdfmetrics._dynFaceNames.pop(old.face.name, None)
     if FONT_PATH.exists():
-        pdfmetrics.registerFont(TTFont(FONT_NAME, str(FONT_PATH)))
+        with span("register_font"):
+            pdfmetrics.registerFont(CachedTTFont(FONT_NAME, str(FONT_PATH), font_subset_dir(FONT_PATH)))
         return FONT_NAME
     return FALLBACK_FONT
 
 
-def set_font(c: canvas.Canvas, size: float, color: colors.Color = TEXT_COLOR) -> None:
-    c.setFont(ACTIVE_FONT, size)
+class BriefAcroForm(AcroForm):
+    def txAP(self, key, value, *args, **kwargs):
+        # reportlab escapes appearance text as latin-1, but the form font is PDFDocEncoded.
+        if isinstance(value, str):
+            value = appearance_text(value).decode("latin-1")
+        return super().txAP(key, value, *args, **kwargs)
+
+
+class SharedAcroForm(BriefAcroForm):
+    def __init__(self, canv: canvas.Canvas, **kwargs) -> None:
+        super().__init__(canv, **kwargs)
+        self.font_refs: dict[str | None, tuple[str, str]] = {}
+        self.appearances: dict[tuple, object] = {}
+
+    def makeFont(self, fontName):
+        # reportlab adds a font dictionary per field; with one per font, appearance
+        # streams of same-sized fields become identical and are written once.
+        if fontName not in self.font_refs:
+            self.font_refs[fontName] = super().makeFont(fontName)
+        return self.font_refs[fontName]
+
+    def shared_appearance(self, build, args: tuple, kwargs: dict):
+        try:
+            key = (build.__name__, args, tuple(sorted(kwargs.items())))
+            appearance = self.appearances.get(key)
+        except TypeError:
+            return build(*args, **kwargs)
+        if appearance is None:
+            appearance = self.appearances[key] = build(*args, **kwargs)
+        return appearance
+
+    def txAP(self, *args, **kwargs):
+        return self.shared_appearance(super().txAP, args, kwargs)
+
+    def checkboxAP(self, *args, **kwargs):
+        return self.shared_appearance(super().checkboxAP, args, kwargs)
+
+
+class BriefCanvas(canvas.Canvas):
+    def __init__(self, *args, prefill: dict | None = None, **kwargs) -> None:
+        # What the content stream is known to hold: "fill", "stroke" and "width" when the
+        # canvas attributes match it, and the text font as (font, size, leading, subset).
+        # Pages and forms start unknown; saveState/restoreState follow q/Q.
+        self.synced: set[str] = set()
+        self.text_font: tuple | None = None
+        self.drawing_stack: list[tuple[set[str], tuple | None]] = []
+        self.elide = REPORTLAB_INTERNALS_OK
+        super().__init__(*args, **kwargs)
+        self.prefill = prefill or {}
+        self.form_fields: dict[str, dict] = {}
+        self.card_frames: set[str] = set()
+
+    def reset_drawing_state(self) -> None:
+        self.synced = set()
+        self.text_font = None
+
+    def saveState(self) -> None:
+        super().saveState()
+        self.drawing_stack.append((set(self.synced), self.text_font))
+
+    def restoreState(self) -> None:
+        super().restoreState()
+        self.synced, self.text_font = self.drawing_stack.pop()
+
+    def showPage(self) -> None:
+        super().showPage()
+        self.drawing_stack = []
+        self.reset_drawing_state()
+
+    def beginForm(self, *args, **kwargs) -> None:
+        super().beginForm(*args, **kwargs)
+        self.drawing_stack.append((self.synced, self.text_font))
+        self.reset_drawing_state()
+
+    def endForm(self, **extra_attributes) -> None:
+        super().endForm(**extra_attributes)
+        self.synced, self.text_font = self.drawing_stack.pop()
+
+    def setFillColor(self, aColor, alpha=None) -> None:
+        if (
+            self.elide
+            and alpha is None
+            and "fill" in self.synced
+            and aColor == self._fillColorObj
+            and getattr(aColor, "alpha", None) in (None, self._extgstate._d.get("ca", 1))
+        ):
+            return
+        super().setFillColor(aColor, alpha)
+        self.synced.add("fill")
+
+    def setStrokeColor(self, aColor, alpha=None) -> None:
+        if (
+            self.elide
+            and alpha is None
+            and "stroke" in self.synced
+            and aColor == self._strokeColorObj
+            and getattr(aColor, "alpha", None) in (None, self._extgstate._d.get("CA", 1))
+        ):
+            return
+        super().setStrokeColor(aColor, alpha)
+        self.synced.add("stroke")
+
+    def setLineWidth(self, width: float) -> None:
+        if self.elide and "width" in self.synced and width == self._lineWidth:
+            return
+        super().setLineWidth(width)
+        self.synced.add("width")
+
+    def setFont(self, psfontname: str, size: float, leading: float | None = None) -> None:
+        if leading is None:
+            leading = size * 1.2
+        if self.elide and self.text_font == (psfontname, size, leading, None):
+            self._fontname, self._fontsize, self._leading = psfontname, size, leading
+            return
+        super().setFont(psfontname, size, leading)
+        if self.elide and not pdfmetrics.getFont(psfontname)._dynamicFont:
+            self.text_font = (psfontname, size, leading, None)
+
+    def beginText(self, x: float = 0, y: float = 0, direction=None):
+        text = super().beginText(x, y, direction)
+        # TrueType text selects its subset font inside every text object; skip that when
+        # the stream already has the same subset, size and leading.
+        if self.text_font and self.text_font[3] is not None and self.text_font[:3] == (
+            text._fontname,
+            text._fontsize,
+            text._leading,
+        ):
+            text._curSubset = self.text_font[3]
+        return text
+
+    def drawText(self, aTextObject) -> None:
+        super().drawText(aTextObject)
+        if not self.elide:
+            return
+        font = (aTextObject._fontname, aTextObject._fontsize, aTextObject._leading)
+        if aTextObject._curSubset != -1:
+            self.text_font = (*font, aTextObject._curSubset)
+        elif not (self.text_font and self.text_font[:2] == font[:2] and self.text_font[3] is None):
+            self.text_font = None
+        else:
+            self.text_font = (*font, None)
+
+    @property
+    def acroForm(self) -> BriefAcroForm:
+        form = getattr(self, "AcroForm", None)
+        if form is None:
+            form_class = SharedAcroForm if REPORTLAB_INTERNALS_OK else BriefAcroForm
+            form = self._doc._catalog.AcroForm = self.AcroForm = form_class(self)
+        return form
+
+
+# Private reportlab attributes BriefCanvas and SharedAcroForm read or override. Without
+# any of them both fall back to plain reportlab drawing and per-field appearances.
+REPORTLAB_INTERNALS = {
+    "canvas": (
+        "_fillColorObj",
+        "_strokeColorObj",
+        "_lineWidth",
+        "_extgstate._d",
+        "_fontname",
+        "_fontsize",
+        "_leading",
+        "_doc._catalog",
+    ),
+    "text": ("_curSubset", "_fontname", "_fontsize", "_leading"),
+    "font": ("_dynamicFont",),
+    "acroform": ("makeFont", "txAP", "checkboxAP"),
+}
+
+
+def missing_reportlab_internals() -> list[str]:
+    probe = canvas.Canvas(BytesIO())
+    objects = {
+        "canvas": probe,
+        "text": probe.beginText(),
+        "font": pdfmetrics.getFont(FALLBACK_FONT),
+        "acroform": AcroForm(probe),
+    }
+    absent = object()
+    missing = []
+    for kind, paths in REPORTLAB_INTERNALS.items():
+        for path in paths:
+            value = objects[kind]
+            for name in path.split("."):
+                value = getattr(value, name, absent)
+            if value is absent:
+                missing.append(f"{kind}.{path}")
+    return missing
+
+
+MISSING_REPORTLAB_INTERNALS = missing_reportlab_internals()
+REPORTLAB_INTERNALS_OK = not MISSING_REPORTLAB_INTERNALS
+if MISSING_REPORTLAB_INTERNALS:
+    print(
+        f"reportlab {REPORTLAB_VERSION} lacks {', '.join(MISSING_REPORTLAB_INTERNALS)}; "
+        "drawing-state elision and shared form appearances are off",
+        file=sys.stderr,
+    )
+
+
+def register_form_field(c: canvas.Canvas, name: str, kind: str, label: str) -> None:
+    form_fields = getattr(c, "form_fields", None)
+    if form_fields is not None:
+        form_fields[name] = {"type": kind, "page": c.getPageNumber(), "label": label}
+
+
+def field_value(c: canvas.Canvas, name: str) -> str:
+    value = getattr(c, "prefill", {}).get(name)
+    return "" if value is None else str(value)
+
+
+def appearance_text(value: str) -> bytes:
+    # Field appearances use reportlab's standard form fonts, which are PDFDocEncoded;
+    # characters outside it are drawn as "?" while /V keeps the full value.
+    return unicodedata.normalize("NFC", value).encode("pdfdoc", "replace")
+
+
+def is_checked(value: object) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in TRUTHY_VALUES
+    return bool(value)
+
+
+def checkbox_checked(c: canvas.Canvas, name: str) -> bool:
+    return is_checked(getattr(c, "prefill", {}).get(name))
+
+
+def set_font(c: canvas.Canvas, size: float, color: colors.Color = TEXT_COLOR, leading: float | None = None) -> None:
+    c.setFont(ACTIVE_FONT, size, leading)
     c.setFillColor(color)
 
 
-def draw_header(c: canvas.Canvas, page_num: int, total_pages: int, copy: dict) -> None:
-    c.saveState()
+def draw_lines(c: canvas.Canvas, x: float, y: float, lines: list[str]) -> None:
+    # One text object per block: lines after the first are T* steps of the font leading.
+    if not lines:
+        return
+    text = c.beginText(x, y)
+    for line in lines:
+        text.textLine(line)
+    c.drawText(text)
+
+
+def draw_form(c: canvas.Canvas, name: str, width: float, height: float, draw) -> None:
+    # Shared drawing is emitted once per document as a Form XObject and referenced afterwards.
+    if not c.hasForm(name):
+        c.beginForm(name, -2, -2, width + 2, height + 2)
+        draw()
+        c.endForm()
+    c.doForm(name)
+
+
+def draw_header_chrome(c: canvas.Canvas) -> None:
+    page_w, page_h = c._pagesize
     c.setFillColor(BG_COLOR)
-    c.rect(0, 0, PAGE_W, PAGE_H, stroke=0, fill=1)
+    c.rect(0, 0, page_w, page_h, stroke=0, fill=1)
     c.setFillColor(colors.HexColor("#0E0C0A"))
-    c.rect(0, PAGE_H - 36 * mm, PAGE_W, 36 * mm, stroke=0, fill=1)
+    c.rect(0, page_h - 36 * mm, page_w, 36 * mm, stroke=0, fill=1)
     c.setFillColor(colors.HexColor("#15110D"))
-    c.rect(PAGE_W / 2, PAGE_H - 36 * mm, PAGE_W / 2, 36 * mm, stroke=0, fill=1)
-    if LOGO_PATH.exists():
-        try:
-            logo = ImageReader(str(LOGO_PATH))
-            c.drawImage(logo, 20 * mm, PAGE_H - 30 * mm, 12 * mm, 12 * mm, mask="auto")
-        except Exception:
-            pass
+    c.rect(page_w / 2, page_h - 36 * mm, page_w / 2, 36 * mm, stroke=0, fill=1)
+    logo = load_logo_image(LOGO_SIZE, LOGO_SIZE)
+    if logo:
+        c.drawImage(logo, 20 * mm, page_h - 30 * mm, LOGO_SIZE, LOGO_SIZE, mask="auto")
     set_font(c, 13, TEXT_COLOR)
-    c.drawString(36 * mm, PAGE_H - 16 * mm, "Kah-Digital")
+    c.drawString(36 * mm, page_h - 16 * mm, "Kah-Digital")
+    c.setStrokeColor(ACCENT_COLOR)
+    c.setLineWidth(1.1)
+    c.line(MARGIN, page_h - 36 * mm, page_w - MARGIN, page_h - 36 * mm)
+
+
+def draw_header(c: canvas.Canvas, page_num: int, total_pages: int, copy: dict) -> None:
+    page_w, page_h = c._pagesize
+    c.saveState()
+    draw_form(c, "header", page_w, page_h, lambda: draw_header_chrome(c))
     set_font(c, 9, MUTED_COLOR)
     c.drawRightString(
-        PAGE_W - 20 * mm,
-        PAGE_H - 16 * mm,
+        page_w - 20 * mm,
+        page_h - 16 * mm,
         copy["header_page"].format(page=page_num, total=total_pages),
     )
-    c.setStrokeColor(ACCENT_COLOR)
-    c.setLineWidth(1.1)
-    c.line(MARGIN, PAGE_H - 36 * mm, PAGE_W - MARGIN, PAGE_H - 36 * mm)
     c.restoreState()
 
 
 def draw_title(c: canvas.Canvas, title: str, subtitle: str) -> None:
+    page_h = c._pagesize[1]
     set_font(c, 22, TEXT_COLOR)
-    c.drawString(MARGIN, PAGE_H - 50 * mm, title)
+    c.drawString(MARGIN, page_h - 50 * mm, title)
     set_font(c, 11, MUTED_COLOR)
-    c.drawString(MARGIN, PAGE_H - 57 * mm, subtitle)
+    c.drawString(MARGIN, page_h - 57 * mm, subtitle)
+
+
+def draw_card_frame(c: canvas.Canvas, x: float, y: float, width: float, height: float) -> None:
+    def frame() -> None:
+        c.setFillColor(CARD_COLOR)
+        c.roundRect(0, 0, width, height, 8, stroke=0, fill=1)
+        c.setStrokeColor(LINE_COLOR)
+        c.setLineWidth(0.7)
+        c.roundRect(0, 0, width, height, 8, stroke=1, fill=0)
+
+    name = f"card{round(width * 100)}x{round(height * 100)}"
+    seen = getattr(c, "card_frames", None)
+    c.saveState()
+    c.translate(x, y)
+    # A frame only becomes a shared form once its size repeats; one-off cards stay inline.
+    if seen is None or name in seen:
+        draw_form(c, name, width, height, frame)
+    else:
+        seen.add(name)
+        frame()
+    c.restoreState()
 
 
 def draw_card(c: canvas.Canvas, x: float, y_top: float, width: float, height: float, title: str) -> float:
     c.saveState()
-    c.setFillColor(CARD_COLOR)
-    c.roundRect(x, y_top - height, width, height, 8, stroke=0, fill=1)
-    c.setStrokeColor(LINE_COLOR)
-    c.setLineWidth(0.7)
-    c.roundRect(x, y_top - height, width, height, 8, stroke=1, fill=0)
+    draw_card_frame(c, x, y_top - height, width, height)
     set_font(c, 10, TEXT_COLOR)
     c.drawString(x + 10, y_top - 16, title)
     c.restoreState()
@@ -396,21 +870,24 @@ def draw_field(
         field_y = y - height - 6
         c.setFillColor(FIELD_BG_COLOR)
         c.rect(x, field_y, width, height, stroke=0, fill=1)
-        c.acroForm.textfield(
-            name=name,
-            x=x,
-            y=field_y,
-            width=width,
-            height=height,
-            borderWidth=0.9,
-            borderStyle="solid",
-            borderColor=ACCENT_COLOR,
-            fillColor=FIELD_BG_COLOR,
-            textColor=TEXT_COLOR,
-            fontName=FALLBACK_FONT,
-            fontSize=9,
-            forceBorder=True,
-        )
+        register_form_field(c, name, "text", label)
+        with span("acroform.textfield", name=name):
+            c.acroForm.textfield(
+                name=name,
+                value=field_value(c, name),
+                x=x,
+                y=field_y,
+                width=width,
+                height=height,
+                borderWidth=0.9,
+                borderStyle="solid",
+                borderColor=ACCENT_COLOR,
+                fillColor=FIELD_BG_COLOR,
+                textColor=TEXT_COLOR,
+                fontName=FALLBACK_FONT,
+                fontSize=9,
+                forceBorder=True,
+            )
         return field_y - 12
     c.setStrokeColor(LINE_COLOR)
     c.setLineWidth(0.6)
@@ -418,6 +895,59 @@ def draw_field(
     return y - 18
 
 
+class TextLayoutCache:
+    def __init__(self, max_entries: int = TEXT_LAYOUT_MAX_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self.entries: OrderedDict[tuple, tuple[str, ...]] = OrderedDict()
+        self.lock = threading.Lock()
+
+    def lines(self, text: str, font: str, size: float, width: float) -> tuple[str, ...]:
+        key = (text, font, size, width)
+        with self.lock:
+            lines = self.entries.get(key)
+            if lines is not None:
+                self.entries.move_to_end(key)
+                return lines
+        lines = tuple(simpleSplit(text, font, size, width))
+        with self.lock:
+            self.entries[key] = lines
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return lines
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+
+    def stamp(self) -> str:
+        # Line breaks are only valid for the exact font file and reportlab metrics they came
+        # from; the "lines" prefix retires files that also stored each line's width.
+        return f"lines:{REPORTLAB_VERSION}:{file_digest(FONT_PATH)}"
+
+    def load(self, path: Path) -> None:
+        try:
+            payload = json.loads(path.read_text("utf-8"))
+        except (OSError, ValueError):
+            return
+        if payload.get("stamp") != self.stamp():
+            return
+        with self.lock:
+            for text, font, size, width, lines in payload.get("entries", [])[-self.max_entries :]:
+                self.entries[(text, font, size, width)] = tuple(lines)
+
+    def save(self, path: Path) -> None:
+        with self.lock:
+            entries = [[*key, list(lines)] for key, lines in self.entries.items()]
+        write_atomic(path, json.dumps({"stamp": self.stamp(), "entries": entries}, ensure_ascii=False).encode("utf-8"))
+
+
+TEXT_LAYOUT = TextLayoutCache()
+
+
+def split_lines(text: str, size: float, width: float) -> list[str]:
+    return list(TEXT_LAYOUT.lines(text, ACTIVE_FONT, size, width))
+
+
 def draw_paragraph(
     c: canvas.Canvas,
     text: str,
@@ -428,12 +958,10 @@ def draw_paragraph(
     leading: float = 12,
     color: colors.Color = MUTED_COLOR,
 ) -> float:
-    set_font(c, size, color)
-    lines = simpleSplit(text, ACTIVE_FONT, size, width)
-    for line in lines:
-        c.drawString(x, y, line)
-        y -= leading
-    return y
+    set_font(c, size, color, leading)
+    lines = split_lines(text, size, width)
+    draw_lines(c, x, y, lines)
+    return y - leading * len(lines)
 
 
 def draw_checkbox(
@@ -447,31 +975,31 @@ def draw_checkbox(
     box = 10
     box_y = y - box + 1
     if name:
-        c.acroForm.checkbox(
-            name=name,
-            x=x,
-            y=box_y,
-            size=box,
-            borderColor=ACCENT_COLOR,
-            fillColor=FIELD_BG_COLOR,
-            textColor=ACCENT_COLOR,
-            borderWidth=1,
-            borderStyle="solid",
-            fieldFlags="",
-            forceBorder=True,
-        )
+        register_form_field(c, name, "checkbox", label)
+        with span("acroform.checkbox", name=name):
+            c.acroForm.checkbox(
+                name=name,
+                checked=checkbox_checked(c, name),
+                x=x,
+                y=box_y,
+                size=box,
+                borderColor=ACCENT_COLOR,
+                fillColor=FIELD_BG_COLOR,
+                textColor=ACCENT_COLOR,
+                borderWidth=1,
+                borderStyle="solid",
+                fieldFlags="",
+                forceBorder=True,
+            )
     else:
         c.setStrokeColor(ACCENT_COLOR)
         c.setLineWidth(1.1)
         c.setFillColor(FIELD_BG_COLOR)
         c.rect(x, box_y, box, box, stroke=1, fill=1)
-    set_font(c, 9, TEXT_COLOR)
-    lines = simpleSplit(label, ACTIVE_FONT, 9, width - box - 10)
-    c.drawString(x + box + 6, y, lines[0])
-    for extra in lines[1:]:
-        y -= 12
-        c.drawString(x + box + 6, y, extra)
-    return y - 16
+    set_font(c, 9, TEXT_COLOR, 12)
+    lines = split_lines(label, 9, width - box - 10)
+    draw_lines(c, x + box + 6, y, lines)
+    return y - 12 * (len(lines) - 1) - 16
 
 
 def draw_table_row(
@@ -491,21 +1019,24 @@ def draw_table_row(
         field_y = y - 12
         c.setFillColor(FIELD_BG_COLOR)
         c.rect(field_x, field_y, field_width, 10, stroke=0, fill=1)
-        c.acroForm.textfield(
-            name=field_name,
-            x=field_x,
-            y=field_y,
-            width=field_width,
-            height=10,
-            borderWidth=0.9,
-            borderStyle="solid",
-            borderColor=ACCENT_COLOR,
-            fillColor=FIELD_BG_COLOR,
-            textColor=TEXT_COLOR,
-            fontName=FALLBACK_FONT,
-            fontSize=9,
-            forceBorder=True,
-        )
+        register_form_field(c, field_name, "text", left)
+        with span("acroform.textfield", name=field_name):
+            c.acroForm.textfield(
+                name=field_name,
+                value=field_value(c, field_name),
+                x=field_x,
+                y=field_y,
+                width=field_width,
+                height=10,
+                borderWidth=0.9,
+                borderStyle="solid",
+                borderColor=ACCENT_COLOR,
+                fillColor=FIELD_BG_COLOR,
+                textColor=TEXT_COLOR,
+                fontName=FALLBACK_FONT,
+                fontSize=9,
+                forceBorder=True,
+            )
     elif right:
         set_font(c, 9, MUTED_COLOR)
         c.drawRightString(x + width, y, right)
@@ -516,38 +1047,306 @@ def draw_table_row(
 
 
 def draw_footer(c: canvas.Canvas, copy: dict) -> None:
+    page_w = c._pagesize[0]
+
+    def footer() -> None:
+        c.setStrokeColor(LINE_COLOR)
+        c.setLineWidth(0.7)
+        c.line(MARGIN, 18 * mm, page_w - MARGIN, 18 * mm)
+        set_font(c, 8, MUTED_COLOR)
+        c.drawString(MARGIN, 12 * mm, copy["footer_note"])
+
     c.saveState()
-    c.setStrokeColor(LINE_COLOR)
-    c.setLineWidth(0.7)
-    c.line(MARGIN, 18 * mm, PAGE_W - MARGIN, 18 * mm)
-    set_font(c, 8, MUTED_COLOR)
-    c.drawString(MARGIN, 12 * mm, copy["footer_note"])
+    draw_form(c, "footer", page_w, 20 * mm, footer)
     c.restoreState()
 
 
+def fit_above_footer(y_top: float, height: float) -> float:
+    return min(height, y_top - FOOTER_CLEARANCE)
+
+
 TOTAL_PAGES = 4
+PAGE_SIZES = {"a4": A4, "letter": LETTER}
 
 
-def load_remote_image(url: str):
+class ImageCache:
+    def __init__(self, root: Path, max_bytes: int = IMAGE_CACHE_MAX_BYTES) -> None:
+        self.root = root
+        self.max_bytes = max_bytes
+        self.index_path = root / "index.json"
+        self.lock = threading.Lock()
+        try:
+            self.entries: dict[str, dict] = json.loads(self.index_path.read_text("utf-8"))
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def blob_path(self, digest: str) -> Path:
+        return self.root / "objects" / digest[:2] / digest
+
+    def get(self, url: str) -> bytes | None:
+        with self.lock:
+            entry = self.entries.get(url)
+            if not entry:
+                return None
+            try:
+                data = self.blob_path(entry["sha256"]).read_bytes()
+            except OSError:
+                del self.entries[url]
+                return None
+            entry["accessed"] = time.time()
+            return data
+
+    def digest(self, url: str) -> str | None:
+        with self.lock:
+            entry = self.entries.get(url)
+        return entry["sha256"] if entry else None
+
+    def validators(self, url: str) -> dict[str, str]:
+        with self.lock:
+            entry = self.entries.get(url) or {}
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def put(self, url: str, data: bytes, etag: str | None = None, last_modified: str | None = None) -> None:
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.blob_path(digest)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+        with self.lock:
+            self.entries[url] = {
+                "sha256": digest,
+                "size": len(data),
+                "etag": etag,
+                "last_modified": last_modified,
+                "accessed": time.time(),
+            }
+
+    def evict(self) -> None:
+        with self.lock:
+            sizes = {entry["sha256"]: entry["size"] for entry in self.entries.values()}
+            total = sum(sizes.values())
+            for url, entry in sorted(self.entries.items(), key=lambda item: item[1]["accessed"]):
+                if total <= self.max_bytes:
+                    break
+                del self.entries[url]
+                digest = entry["sha256"]
+                if digest in sizes and not any(e["sha256"] == digest for e in self.entries.values()):
+                    total -= sizes.pop(digest)
+            objects_dir = self.root / "objects"
+            if objects_dir.exists():
+                for path in objects_dir.glob("*/*"):
+                    if path.name not in sizes:
+                        path.unlink(missing_ok=True)
+
+    def save(self) -> None:
+        self.evict()
+        self.root.mkdir(parents=True, exist_ok=True)
+        with self.lock:
+            payload = json.dumps(self.entries, indent=2, sort_keys=True)
+        tmp_path = self.index_path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(payload, "utf-8")
+        os.replace(tmp_path, self.index_path)
+
+
+IMAGE_CACHE: ImageCache | None = None
+OFFLINE = False
+PREFETCHED_IMAGES: dict[str, bytes] = {}
+PREPARED_SOURCES: dict[str, bytes | None] = {}
+IMAGE_DIGESTS: dict[str, str | None] = {}
+
+
+def collect_image_urls(*item_lists: list[dict]) -> list[str]:
+    urls: list[str] = []
+    seen: set[str] = set()
+    for items in item_lists:
+        for item in items:
+            url = item.get("image")
+            if url and url not in seen:
+                seen.add(url)
+                urls.append(url)
+    return urls
+
+
+def cached_image_bytes(url: str) -> bytes | None:
+    return IMAGE_CACHE.get(url) if IMAGE_CACHE else None
+
+
+def is_remote(source: str) -> bool:
+    return urlparse(source).scheme in ("http", "https")
+
+
+def read_local_image(path: str) -> bytes | None:
     try:
-        with urlopen(url, timeout=6) as response:
-            return ImageReader(BytesIO(response.read()))
-    except Exception:
+        return Path(path).read_bytes()
+    except OSError:
         return None
 
 
+def fetch_image_bytes(url: str, timeout: float) -> bytes | None:
+    if not is_remote(url):
+        return read_local_image(url)
+    if OFFLINE:
+        return cached_image_bytes(url)
+    headers = IMAGE_CACHE.validators(url) if IMAGE_CACHE else {}
+    expires_at = time.monotonic() + timeout
+    try:
+        with urlopen(Request(url, headers=headers), timeout=timeout) as response:
+            data = response.read()
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+    except Exception as error:
+        data = cached_image_bytes(url)
+        if data is None and headers and isinstance(error, HTTPError) and error.code == 304:
+            # Not Modified, but the blob behind the validators is gone (get() dropped the
+            # entry): ask again without them, within what is left of the caller's timeout.
+            remaining = expires_at - time.monotonic()
+            return fetch_image_bytes(url, remaining) if remaining > 0 else None
+        # A 304 is a cache hit; any other failure falls back to the last cached copy.
+        return data
+    if IMAGE_CACHE:
+        IMAGE_CACHE.put(url, data, etag, last_modified)
+    return data
+
+
+def prefetch_images(
+    urls: list[str],
+    per_host: int = PREFETCH_PER_HOST,
+    deadline: float = PREFETCH_DEADLINE,
+) -> dict[str, bytes | None]:
+    pending = [url for url in dict.fromkeys(urls) if url not in PREFETCHED_IMAGES]
+    if pending:
+        expires_at = time.monotonic() + deadline
+        slots = threading.BoundedSemaphore(PREFETCH_WORKERS)
+        host_slots = {urlparse(url).netloc: threading.BoundedSemaphore(per_host) for url in pending}
+        fetched: dict[str, bytes | None] = {}
+        lock = threading.Lock()
+
+        def fetch(url: str) -> None:
+            with host_slots[urlparse(url).netloc], slots:
+                remaining = expires_at - time.monotonic()
+                data = fetch_image_bytes(url, min(IMAGE_TIMEOUT, remaining)) if remaining > 0 else None
+            with lock:
+                fetched[url] = data
+
+        # Daemon threads rather than an executor: a CDN that trickles bytes past the
+        # deadline must not keep the interpreter alive at exit.
+        threads = [threading.Thread(target=fetch, args=(url,), daemon=True) for url in pending]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(max(0.0, expires_at - time.monotonic()))
+        with lock:
+            for url in pending:
+                data = fetched.get(url)
+                if data is None:
+                    data = cached_image_bytes(url)
+                # Failures are not memoised, so a later call tries the URL again.
+                if data is not None:
+                    PREFETCHED_IMAGES[url] = data
+    return {url: PREFETCHED_IMAGES.get(url) for url in urls}
+
+
+def encode_prepared_image(data: bytes, width: float, height: float, dpi: int, quality: int) -> bytes:
+    with Image.open(BytesIO(data)) as source:
+        image = source.convert("RGBA") if source.mode in ("P", "LA", "PA") else source.copy()
+    max_w = max(1, math.ceil(width / 72 * dpi))
+    max_h = max(1, math.ceil(height / 72 * dpi))
+    scale = min(max_w / image.width, max_h / image.height)
+    if scale < 1:
+        image = image.resize((max(1, round(image.width * scale)), max(1, round(image.height * scale))), Image.LANCZOS)
+    buffer = BytesIO()
+    if image.mode == "RGBA" and image.getchannel("A").getextrema()[0] < 255:
+        image.save(buffer, "PNG", optimize=True)
+    else:
+        image = image.convert("L" if image.mode in ("1", "L", "I", "I;16") else "RGB")
+        image.save(buffer, "JPEG", quality=quality, optimize=True)
+    return buffer.getvalue()
+
+
+def prepare_image(data: bytes, width: float, height: float) -> bytes | None:
+    digest = hashlib.sha256(data).hexdigest()
+    key = f"prepared:{digest}:{width:.2f}x{height:.2f}@{IMAGE_DPI}dpi/q{JPEG_QUALITY}"
+    prepared = IMAGE_CACHE.get(key) if IMAGE_CACHE else None
+    if prepared is None:
+        try:
+            prepared = encode_prepared_image(data, width, height, IMAGE_DPI, JPEG_QUALITY)
+        except Exception:
+            return None
+        if IMAGE_CACHE:
+            IMAGE_CACHE.put(key, prepared)
+    return prepared
+
+
+def read_source_image(source: str) -> bytes | None:
+    if is_remote(source):
+        if source not in PREFETCHED_IMAGES:
+            prefetch_images([source])
+        return PREFETCHED_IMAGES.get(source)
+    return read_local_image(source)
+
+
+def prepared_key(source: str, width: float, height: float) -> str:
+    return f"{source}@{width:.2f}x{height:.2f}@{IMAGE_DPI}dpi/q{JPEG_QUALITY}"
+
+
+def prepared_source_image(source: str, width: float, height: float) -> bytes | None:
+    key = prepared_key(source, width, height)
+    if key not in PREPARED_SOURCES:
+        data = read_source_image(source)
+        PREPARED_SOURCES[key] = prepare_image(data, width, height) if data else None
+    return PREPARED_SOURCES[key]
+
+
+def load_remote_image(url: str, width: float, height: float):
+    with span("load_remote_image", url=url):
+        prepared = prepared_source_image(url, width, height)
+    return ImageReader(BytesIO(prepared)) if prepared else None
+
+
+def logo_digest() -> str | None:
+    prepared = prepared_source_image(str(LOGO_PATH), LOGO_SIZE, LOGO_SIZE)
+    return hashlib.sha256(prepared).hexdigest() if prepared else None
+
+
+def load_logo_image(width: float, height: float):
+    prepared = prepared_source_image(str(LOGO_PATH), width, height)
+    return ImageReader(BytesIO(prepared)) if prepared else None
+
+
+def warm_prepared_images(guide_item_lists: list[list[dict]], images: dict[str, bytes | None] | None = None) -> None:
+    load_logo_image(LOGO_SIZE, LOGO_SIZE)
+    urls = [
+        url
+        for url in collect_image_urls(*guide_item_lists)
+        if prepared_key(url, AI_IMAGE_SIZE, AI_IMAGE_SIZE) not in PREPARED_SOURCES
+    ]
+    if images is None:
+        images = prefetch_images(urls)
+    # Prepared from the bytes just fetched: an image that failed is drawn as missing in
+    # this build instead of being fetched again, serially, by every page that shows it.
+    for url in urls:
+        data = images.get(url)
+        with span("load_remote_image", url=url):
+            PREPARED_SOURCES[prepared_key(url, AI_IMAGE_SIZE, AI_IMAGE_SIZE)] = (
+                prepare_image(data, AI_IMAGE_SIZE, AI_IMAGE_SIZE) if data else None
+            )
+
+
 def draw_ai_card(c: canvas.Canvas, x: float, y_top: float, width: float, height: float, item: dict) -> float:
     c.saveState()
-    c.setFillColor(CARD_COLOR)
-    c.roundRect(x, y_top - height, width, height, 8, stroke=0, fill=1)
-    c.setStrokeColor(LINE_COLOR)
-    c.setLineWidth(0.7)
-    c.roundRect(x, y_top - height, width, height, 8, stroke=1, fill=0)
+    draw_card_frame(c, x, y_top - height, width, height)
 
     img_size = height - 12
     img_x = x + 8
     img_y = y_top - height + 6
-    image = load_remote_image(item["image"])
+    image = load_remote_image(item["image"], img_size, img_size)
     if image:
         c.drawImage(image, img_x, img_y, img_size, img_size, mask="auto", preserveAspectRatio=True)
     else:
@@ -569,13 +1368,14 @@ def draw_ai_card(c: canvas.Canvas, x: float, y_top: float, width: float, height:
     return y_top - height - 6
 
 
-def build_page_one(c: canvas.Canvas, copy: dict) -> None:
+def build_page_one(c: canvas.Canvas, copy: dict, total_pages: int = TOTAL_PAGES) -> None:
     page = copy["page1"]
-    draw_header(c, 1, TOTAL_PAGES, copy)
+    page_w, page_h = c._pagesize
+    draw_header(c, 1, total_pages, copy)
     draw_title(c, page["title"], page["subtitle"])
 
-    content_top = PAGE_H - 66 * mm
-    col_w = (PAGE_W - 2 * MARGIN - GUTTER) / 2
+    content_top = page_h - 66 * mm
+    col_w = (page_w - 2 * MARGIN - GUTTER) / 2
     left_x = MARGIN
     right_x = MARGIN + col_w + GUTTER
 
@@ -623,8 +1423,10 @@ def build_page_one(c: canvas.Canvas, copy: dict) -> None:
     for label, name in zip(page["audience_labels"], audience_names):
         y_check = draw_checkbox(c, label, right_x + 10, y_check, col_w - 20, name=name)
 
-    full_width = PAGE_W - 2 * MARGIN
-    y_full = draw_card(c, MARGIN, content_top - 150 * mm, full_width, 52 * mm, page["cards"]["features"])
+    full_width = page_w - 2 * MARGIN
+    features_top = content_top - 150 * mm
+    features_height = fit_above_footer(features_top, 52 * mm)
+    y_full = draw_card(c, MARGIN, features_top, full_width, features_height, page["cards"]["features"])
     left_block_x = MARGIN + 10
     right_block_x = MARGIN + full_width / 2 + 10
     y_block = y_full
@@ -639,14 +1441,14 @@ def build_page_one(c: canvas.Canvas, copy: dict) -> None:
     draw_footer(c, copy)
 
 
-def build_page_two(c: canvas.Canvas, copy: dict) -> None:
+def build_page_two(c: canvas.Canvas, copy: dict, total_pages: int = TOTAL_PAGES) -> None:
     page = copy["page2"]
-    c.showPage()
-    draw_header(c, 2, TOTAL_PAGES, copy)
+    page_w, page_h = c._pagesize
+    draw_header(c, 2, total_pages, copy)
     draw_title(c, page["title"], page["subtitle"])
 
-    content_top = PAGE_H - 66 * mm
-    full_width = PAGE_W - 2 * MARGIN
+    content_top = page_h - 66 * mm
+    full_width = page_w - 2 * MARGIN
 
     y_design = draw_card(c, MARGIN, content_top, full_width, 60 * mm, page["cards"]["design"])
     y_design = draw_paragraph(c, page["design_hint"], MARGIN + 10, y_design, full_width - 20)
@@ -672,21 +1474,22 @@ def build_page_two(c: canvas.Canvas, copy: dict) -> None:
     for label, name in zip(page["integrations_right"], integration_right_names):
         y_block = draw_checkbox(c, label, right_block_x, y_block, full_width / 2 - 20, name=name)
 
-    y_pages = draw_card(c, MARGIN, content_top - 140 * mm, full_width, 52 * mm, page["cards"]["pages"])
+    pages_top = content_top - 140 * mm
+    y_pages = draw_card(c, MARGIN, pages_top, full_width, fit_above_footer(pages_top, 52 * mm), page["cards"]["pages"])
     y_pages = draw_field(c, page["fields"]["pages_primary"], MARGIN + 10, y_pages, full_width - 20, name="pages_primary")
     draw_field(c, page["fields"]["pages_secondary"], MARGIN + 10, y_pages, full_width - 20, name="pages_secondary")
 
     draw_footer(c, copy)
 
 
-def build_page_three(c: canvas.Canvas, copy: dict) -> None:
+def build_page_three(c: canvas.Canvas, copy: dict, total_pages: int = TOTAL_PAGES) -> None:
     page = copy["page3"]
-    c.showPage()
-    draw_header(c, 3, TOTAL_PAGES, copy)
+    page_w, page_h = c._pagesize
+    draw_header(c, 3, total_pages, copy)
     draw_title(c, page["title"], page["subtitle"])
 
-    content_top = PAGE_H - 66 * mm
-    full_width = PAGE_W - 2 * MARGIN
+    content_top = page_h - 66 * mm
+    full_width = page_w - 2 * MARGIN
 
     y_plan = draw_card(c, MARGIN, content_top, full_width, 96 * mm, page["cards"]["planning"])
     set_font(c, 8, MUTED_COLOR)
@@ -739,40 +1542,1410 @@ def build_page_three(c: canvas.Canvas, copy: dict) -> None:
     draw_footer(c, copy)
 
 
-def build_page_four(c: canvas.Canvas, copy: dict, guide_items: list[dict]) -> None:
+def ai_content_top(page_h: float) -> float:
+    return page_h - 66 * mm
+
+
+def ai_cards_per_page(page_h: float) -> int:
+    step = AI_CARD_HEIGHT + 6
+    return max(1, int((ai_content_top(page_h) - FOOTER_CLEARANCE + 6) // step))
+
+
+def ai_page_count(item_count: int, page_size: str) -> int:
+    return math.ceil(item_count / ai_cards_per_page(PAGE_SIZES[page_size][1]))
+
+
+def build_ai_page(c: canvas.Canvas, copy: dict, items: list[dict], page_num: int, total_pages: int) -> None:
     page = copy["page4"]
-    c.showPage()
-    draw_header(c, 4, TOTAL_PAGES, copy)
+    page_w, page_h = c._pagesize
+    draw_header(c, page_num, total_pages, copy)
     draw_title(c, page["title"], page["subtitle"])
 
-    content_top = PAGE_H - 66 * mm
-    card_height = 30 * mm
-    y = content_top
-    for item in guide_items:
-        y = draw_ai_card(c, MARGIN, y, PAGE_W - 2 * MARGIN, card_height, item)
+    card_height = AI_CARD_HEIGHT
+    y = ai_content_top(page_h)
+    for item in items:
+        y = draw_ai_card(c, MARGIN, y, page_w - 2 * MARGIN, card_height, item)
 
     draw_footer(c, copy)
 
 
-def build_document(output_path: Path, copy: dict, guide_items: list[dict]) -> None:
-    c = canvas.Canvas(str(output_path), pagesize=A4)
-    build_page_one(c, copy)
-    build_page_two(c, copy)
-    build_page_three(c, copy)
-    build_page_four(c, copy, guide_items)
-    c.save()
+def build_page_four(
+    c: canvas.Canvas,
+    copy: dict,
+    guide_items: list[dict],
+    total_pages: int = TOTAL_PAGES,
+) -> None:
+    per_page = ai_cards_per_page(c._pagesize[1])
+    for offset in range(0, len(guide_items), per_page):
+        c.showPage()
+        build_ai_page(c, copy, guide_items[offset : offset + per_page], 4 + offset // per_page, total_pages)
+
+
+def new_canvas(target: str | BinaryIO, copy: dict, page_size: str, prefill: dict | None = None) -> BriefCanvas:
+    # invariant=1 pins the dates and the document ID (SOURCE_DATE_EPOCH still wins),
+    # so unchanged inputs give byte-identical files and the CDN copy stays valid.
+    c = BriefCanvas(target, pagesize=PAGE_SIZES[page_size], invariant=1, prefill=prefill)
+    c.setTitle(copy["page1"]["title"])
+    c.setAuthor("Kah-Digital")
+    c.setCreator("scripts/generate-premium-cahier.py")
+    return c
+
+
+def build_document(
+    output: Path | BinaryIO,
+    copy: dict,
+    guide_items: list[dict],
+    page_size: str = "a4",
+    include_ai: bool = True,
+    prefill: dict | None = None,
+) -> dict[str, dict]:
+    total_pages = TOTAL_PAGES - 1 + (ai_page_count(len(guide_items), page_size) if include_ai else 0)
+    c = new_canvas(str(output) if isinstance(output, Path) else output, copy, page_size, prefill)
+    with span("build_document", title=copy["page1"]["title"], page_size=page_size, include_ai=include_ai):
+        with span("build_page_one"):
+            build_page_one(c, copy, total_pages)
+        with span("build_page_two"):
+            c.showPage()
+            build_page_two(c, copy, total_pages)
+        with span("build_page_three"):
+            c.showPage()
+            build_page_three(c, copy, total_pages)
+        if include_ai:
+            with span("build_page_four"):
+                build_page_four(c, copy, guide_items, total_pages)
+        with span("canvas.save"):
+            c.save()
+    return c.form_fields
+
+
+CATALOG_FIELDS = ("title", "summary", "pricing", "timeline", "image")
+CATALOG_READ_SIZE = 64 * 1024
+
+
+def iter_json_array(handle) -> Iterator:
+    decoder = json.JSONDecoder()
+    buffer = handle.read(CATALOG_READ_SIZE).lstrip()
+    if not buffer.startswith("["):
+        raise ValueError("expected a JSON array of items")
+    buffer = buffer[1:]
+    while True:
+        buffer = buffer.lstrip(" \t\r\n,")
+        if not buffer:
+            buffer = handle.read(CATALOG_READ_SIZE)
+            if not buffer:
+                raise ValueError("unterminated JSON array")
+            continue
+        if buffer[0] == "]":
+            return
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            more = handle.read(CATALOG_READ_SIZE)
+            if not more:
+                raise
+            buffer += more
+            continue
+        yield item
+        buffer = buffer[end:]
+
+
+def iter_catalog_source(path: Path) -> Iterator:
+    suffix = path.suffix.lower()
+    with path.open(encoding="utf-8-sig") as handle:
+        if suffix in (".yaml", ".yml"):
+            try:
+                import yaml
+            except ImportError:
+                raise RuntimeError("YAML catalogs need PyYAML (pip install pyyaml), or use JSON/JSONL") from None
+            # One document per item streams; a single top-level list is loaded at once.
+            for document in yaml.safe_load_all(handle):
+                yield from document if isinstance(document, list) else [document]
+        elif suffix == ".json":
+            yield from iter_json_array(handle)
+        else:
+            for line in handle:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def iter_catalog(path: Path) -> Iterator[dict]:
+    for index, item in enumerate(iter_catalog_source(path), 1):
+        if not isinstance(item, dict):
+            raise ValueError(f"{path.name} item {index} is not an object")
+        missing = [key for key in CATALOG_FIELDS if not item.get(key)]
+        if missing:
+            raise ValueError(f"{path.name} item {index} is missing {', '.join(missing)}")
+        yield item
+
+
+def iter_chunks(items: Iterator, size: int) -> Iterator[list]:
+    while chunk := list(islice(items, size)):
+        yield chunk
+
+
+def release_images(items: list[dict]) -> None:
+    for url in collect_image_urls(items):
+        PREFETCHED_IMAGES.pop(url, None)
+        PREPARED_SOURCES.pop(prepared_key(url, AI_IMAGE_SIZE, AI_IMAGE_SIZE), None)
+
+
+PAGE_BUILDERS = {1: build_page_one, 2: build_page_two, 3: build_page_three}
+FONT_BASE_CHARSET = "".join(map(chr, range(32, 127)))
+
+
+def text_chars(value) -> set[str]:
+    chars: set[str] = set()
+    stack = [value]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, str):
+            chars.update(value)
+        elif isinstance(value, dict):
+            stack.extend(item for key, item in value.items() if key != "image")
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+    return chars
+
+
+def document_charset(chars: set[str]) -> str:
+    # Printable ASCII is always in the subset (it barely changes its size), so only a new
+    # accented or typographic character invalidates every cached page.
+    return FONT_BASE_CHARSET + "".join(sorted(chars - set(FONT_BASE_CHARSET)))
+
+
+def seed_font_subset(c: canvas.Canvas, charset: str) -> None:
+    # Pages are rendered as separate documents. Assigning every character of the whole
+    # document up front gives each page the same font subset, which the writer then
+    # stores once.
+    font = pdfmetrics.getFont(ACTIVE_FONT)
+    if isinstance(font, TTFont):
+        font.splitString(charset, c._doc)
+
+
+def page_inputs_hash(
+    copy: dict,
+    page_num: int,
+    total_pages: int,
+    page_size: str,
+    charset: str,
+    items: list[dict] | None,
+) -> str:
+    payload = {
+        "version": GENERATOR_VERSION,
+        "script": script_digest(Path(__file__)),
+        "pdf_library": file_digest(PDF_LIBRARY_PATH),
+        "font": file_digest(FONT_PATH),
+        "logo": file_digest(LOGO_PATH),
+        # Every page draws the header logo, prepared at the current DPI and quality.
+        "logo_image": logo_digest(),
+        "image_dpi": IMAGE_DPI,
+        "jpeg_quality": JPEG_QUALITY,
+        "page_size": page_size,
+        "page": page_num,
+        "total_pages": total_pages,
+        "charset": charset,
+        "title": copy["page1"]["title"],
+        "shared": {key: value for key, value in copy.items() if not key.startswith("page")},
+        "copy": copy["page4"] if items is not None else copy[f"page{page_num}"],
+    }
+    if items is not None:
+        payload.update(
+            items=items,
+            images={url: image_digest(url) for url in collect_image_urls(items)},
+        )
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def render_page(
+    copy: dict,
+    page_num: int,
+    total_pages: int,
+    page_size: str,
+    charset: str,
+    items: list[dict] | None = None,
+    prefill: dict | None = None,
+) -> bytes:
+    cache_path = None
+    if PAGE_CACHE_DIR is not None and not prefill:
+        cache_path = PAGE_CACHE_DIR / f"{page_inputs_hash(copy, page_num, total_pages, page_size, charset, items)}.pdf"
+        try:
+            data = cache_path.read_bytes()
+        except OSError:
+            pass
+        else:
+            os.utime(cache_path)
+            return data
+    if items is not None:
+        # Images the parent already prepared need no bytes: a spawned worker has neither
+        # the parent's fetched copies nor its image cache, and would go to the network.
+        urls = collect_image_urls(items)
+        keys = {url: prepared_key(url, AI_IMAGE_SIZE, AI_IMAGE_SIZE) for url in urls}
+        images = prefetch_images([url for url in urls if keys[url] not in PREPARED_SOURCES])
+        missing = [url for url in urls if PREPARED_SOURCES.get(keys[url]) is None and images.get(url) is None]
+        if OFFLINE and missing:
+            raise RuntimeError("offline mode: no cached copy for " + ", ".join(missing))
+        if cache_path is not None:
+            # Fetching may have brought newer bytes than the cached digest the key used;
+            # a page with placeholders is not kept, so the image is tried again later.
+            cache_path = (
+                None
+                if missing
+                else PAGE_CACHE_DIR / f"{page_inputs_hash(copy, page_num, total_pages, page_size, charset, items)}.pdf"
+            )
+    with span("render_page", page=page_num):
+        buffer = BytesIO()
+        c = new_canvas(buffer, copy, page_size, prefill)
+        seed_font_subset(c, charset)
+        if items is None:
+            PAGE_BUILDERS[page_num](c, copy, total_pages)
+        else:
+            build_ai_page(c, copy, items, page_num, total_pages)
+        c.save()
+    data = buffer.getvalue()
+    if cache_path is not None:
+        write_atomic(cache_path, data)
+    return data
+
+
+def write_pages(output_path: Path, pages: Iterator[bytes]) -> None:
+    tmp_path = output_path.with_name(f".{output_path.name}.{os.getpid()}.tmp")
+    try:
+        with tmp_path.open("wb") as handle:
+            writer = PdfWriter(handle)
+            for data in pages:
+                writer.append_document(PdfFile(data))
+            writer.close()
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    os.replace(tmp_path, output_path)
+
+
+def page_plan(
+    copy: dict,
+    guide_items: list[dict],
+    page_size: str,
+    include_ai: bool,
+) -> tuple[list[tuple[int, list[dict] | None]], str]:
+    items = guide_items if include_ai else []
+    per_page = ai_cards_per_page(PAGE_SIZES[page_size][1])
+    plan: list[tuple[int, list[dict] | None]] = [(page_num, None) for page_num in PAGE_BUILDERS]
+    for offset in range(0, len(items), per_page):
+        plan.append((len(plan) + 1, items[offset : offset + per_page]))
+    return plan, document_charset(text_chars([copy, items]))
+
+
+def build_paged_document(
+    output_path: Path,
+    copy: dict,
+    guide_items: list[dict],
+    page_size: str = "a4",
+    include_ai: bool = True,
+) -> None:
+    plan, charset = page_plan(copy, guide_items, page_size, include_ai)
+    pages = (render_page(copy, page_num, len(plan), page_size, charset, items) for page_num, items in plan)
+    with span("build_paged_document", title=copy["page1"]["title"], page_size=page_size, include_ai=include_ai):
+        write_pages(output_path, pages)
+
+
+def build_catalog_document(output_path: Path, copy: dict, catalog: Path, page_size: str = "a4") -> None:
+    item_count = 0
+    chars = text_chars(copy)
+    with span("count_catalog", catalog=catalog.name):
+        for item in iter_catalog(catalog):
+            item_count += 1
+            chars |= text_chars(item)
+    charset = document_charset(chars)
+    per_page = ai_cards_per_page(PAGE_SIZES[page_size][1])
+    total_pages = TOTAL_PAGES - 1 + math.ceil(item_count / per_page)
+
+    # Only one page and its images are held at a time; each is appended to the output
+    # as soon as it is rendered.
+    def pages() -> Iterator[bytes]:
+        for page_num in PAGE_BUILDERS:
+            yield render_page(copy, page_num, total_pages, page_size, charset)
+        for page_num, items in enumerate(iter_chunks(iter_catalog(catalog), per_page), TOTAL_PAGES):
+            yield render_page(copy, page_num, total_pages, page_size, charset, items)
+            release_images(items)
+
+    with span("build_catalog_document", catalog=catalog.name, items=item_count):
+        write_pages(output_path, pages())
+
+
+def prune_page_cache(max_bytes: int = PAGE_CACHE_MAX_BYTES) -> None:
+    if PAGE_CACHE_DIR is None:
+        return
+    entries = []
+    for path in PAGE_CACHE_DIR.glob("*.pdf"):
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+
+
+def collect_form_fields(copy: dict) -> dict[str, dict]:
+    return build_document(BytesIO(), copy, [], include_ai=False)
+
+
+class FormTemplate:
+    def __init__(self, data: bytes) -> None:
+        self.data = data
+        self.pdf = PdfFile(data)
+        self.widgets: dict[str, int] = {}
+        acroform = self.pdf.resolve(self.pdf.root.get("AcroForm")) or {}
+        for ref in self.pdf.resolve(acroform.get("Fields")) or []:
+            widget = self.pdf.resolve(ref)
+            self.widgets[decode_text(widget.get("T"))] = ref.num
+
+    def text_appearance(self, widget: dict, value: str) -> PdfStream:
+        blank = self.pdf.resolve(widget["AP"]["N"])
+        content = blank.decoded()
+        font, size, fill = re.match(rb"\s*/(\S+)\s+(\S+)\s+Tf\s*(.*)", widget["DA"]).groups()
+        font_size = float(size)
+        border = self.pdf.resolve(widget.get("BS", {})).get("W", 1)
+        height = blank["BBox"][3] - blank["BBox"][1]
+        # Same text placement reportlab uses for prefilled fields, so both paths look alike.
+        lines = [escape_content_string(line) for line in appearance_text(value).split(b"\n")]
+        leading = b"\n0 -%s Td\n" % format_number(font_size * 1.2)
+        text = (
+            b"BT\n/%s %s Tf\n%s\n1 0 0 1 %s %s Tm\n"
+            % (font, format_number(font_size), fill.strip(), format_number(4 * border), format_number(height - font_size - 2 * border))
+            + leading.join(b"(" + line + b") Tj" for line in lines)
+            + b"\nET\n"
+        )
+        split = content.rfind(b"Q\nEMC")
+        if split < 0:
+            raise PdfError(f"field {decode_text(widget.get('T'))!r}: no Q/EMC in its blank appearance")
+        dictionary = {key: item for key, item in blank.dictionary.items() if key not in ("Filter", "DecodeParms", "Length")}
+        dictionary["Filter"] = PdfName("FlateDecode")
+        return PdfStream(dictionary, zlib.compress(content[:split] + text + content[split:]))
+
+    def stamp(self, prefill: dict) -> bytes:
+        objects: dict[int, object] = {}
+        next_num = self.pdf.size
+        for name, value in prefill.items():
+            num = self.widgets.get(name)
+            if num is None or value is None:
+                continue
+            widget = dict(self.pdf.get(num))
+            if widget.get("FT") == "Btn":
+                state = PdfName("Yes" if is_checked(value) else "Off")
+                widget["V"] = widget["AS"] = state
+            else:
+                text = str(value)
+                if not text:
+                    continue
+                widget["V"] = pdf_text(text)
+                objects[next_num] = self.text_appearance(widget, text)
+                widget["AP"] = {"N": PdfRef(next_num)}
+                next_num += 1
+            objects[num] = widget
+        return append_update(self.pdf, objects) if objects else self.data
+
+
+class PageRenderPool:
+    def __init__(self, workers: int) -> None:
+        self.pool = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=init_build_worker,
+            initargs=build_worker_args(),
+        )
+        # Start every worker now so the first document does not pay for process start-up
+        # and font loading.
+        wait([self.pool.submit(register_font) for _ in range(workers)])
+
+    def render(
+        self,
+        copy: dict,
+        guide_items: list[dict],
+        page_size: str = "a4",
+        include_ai: bool = True,
+        prefill: dict | None = None,
+    ) -> bytes:
+        plan, charset = page_plan(copy, guide_items, page_size, include_ai)
+        with span("render_pages", pages=len(plan)):
+            futures = [
+                self.pool.submit(render_page, copy, page_num, len(plan), page_size, charset, items, prefill)
+                for page_num, items in plan
+            ]
+            buffer = BytesIO()
+            writer = PdfWriter(buffer)
+            for future in futures:
+                writer.append_document(PdfFile(future.result()))
+            writer.close()
+        return buffer.getvalue()
+
+    def close(self) -> None:
+        self.pool.shutdown()
+
+
+class RenderContext:
+    def __init__(
+        self,
+        guide_item_lists: list[list[dict]] | None = None,
+        page_size: str = "a4",
+        include_ai: bool = True,
+        page_workers: int = 0,
+    ) -> None:
+        global ACTIVE_FONT
+        ACTIVE_FONT = register_font()
+        self.page_size = page_size
+        self.include_ai = include_ai
+        warm_prepared_images((guide_item_lists or []) if include_ai else [])
+        self.templates: dict[str, FormTemplate] = {}
+        self.lock = threading.Lock()
+        # Low-latency mode: a document costs about its slowest page instead of the sum.
+        self.page_pool = PageRenderPool(page_workers) if page_workers > 1 else None
+
+    def render(self, copy: dict, guide_items: list[dict], prefill: dict | None = None) -> bytes:
+        if self.page_pool:
+            return self.page_pool.render(copy, guide_items, self.page_size, self.include_ai, prefill)
+        buffer = BytesIO()
+        build_document(buffer, copy, guide_items, self.page_size, self.include_ai, prefill)
+        return buffer.getvalue()
+
+    def close(self) -> None:
+        if self.page_pool:
+            self.page_pool.close()
+
+    def template(self, copy: dict, guide_items: list[dict]) -> FormTemplate:
+        key = hashlib.sha256(json.dumps([copy, guide_items], sort_keys=True).encode("utf-8")).hexdigest()
+        with self.lock:
+            if key not in self.templates:
+                self.templates[key] = FormTemplate(self.render(copy, guide_items))
+            return self.templates[key]
+
+    def stamp(self, copy: dict, guide_items: list[dict], prefill: dict) -> bytes:
+        template = self.template(copy, guide_items)
+        with span("stamp", fields=len(prefill)):
+            try:
+                return template.stamp(prefill)
+            except PdfError:
+                # Blank appearances laid out differently than expected (another reportlab
+                # version): render the brief with its values instead.
+                return self.render(copy, guide_items, prefill)
+
+
+@dataclass
+class BuildJob:
+    locale: str
+    output_path: Path
+    copy: dict
+    guide_items: list[dict]
+    page_size: str = "a4"
+    include_ai: bool = True
+    catalog: Path | None = None
+    web_optimize: bool = False
+
+
+@dataclass
+class JobResult:
+    job: BuildJob
+    seconds: float
+    error: str | None = None
+
+
+def load_pikepdf():
+    try:
+        import pikepdf
+    except ImportError:
+        raise RuntimeError("web-optimized output needs pikepdf (pip install pikepdf)") from None
+    return pikepdf
+
+
+def optimize_for_web(path: Path) -> None:
+    pikepdf = load_pikepdf()
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    # qpdf strips the ASCII85 layer reportlab puts on images and forms, packs the
+    # dictionaries into object streams and linearizes so page 1 paints before the
+    # rest of the file has arrived.
+    with pikepdf.open(path) as pdf:
+        pdf.save(
+            tmp_path,
+            linearize=True,
+            object_stream_mode=pikepdf.ObjectStreamMode.generate,
+            compress_streams=True,
+            stream_decode_level=pikepdf.StreamDecodeLevel.generalized,
+            recompress_flate=True,
+            deterministic_id=True,
+        )
+    os.replace(tmp_path, path)
+
+
+def variant_output_path(output_path: Path, page_size: str, include_ai: bool) -> Path:
+    suffixes = ([] if page_size == "a4" else [page_size]) + ([] if include_ai else ["no-ai"])
+    if not suffixes:
+        return output_path
+    return output_path.with_name(".".join([output_path.stem, *suffixes]) + output_path.suffix)
+
+
+def build_matrix(locales: list[str], page_sizes: list[str], ai_variants: list[bool]) -> list[BuildJob]:
+    jobs = []
+    for locale in locales:
+        output_path, copy, guide_items = LOCALE_SOURCES[locale]
+        for page_size in page_sizes:
+            for include_ai in ai_variants:
+                jobs.append(
+                    BuildJob(
+                        locale=locale,
+                        output_path=variant_output_path(output_path, page_size, include_ai),
+                        copy=copy,
+                        guide_items=guide_items,
+                        page_size=page_size,
+                        include_ai=include_ai,
+                    )
+                )
+    return jobs
+
+
+def build_worker_args() -> tuple:
+    # Workers may be spawned rather than forked (macOS, Windows), so all they know of the
+    # parent's images and settings comes through here.
+    return (
+        dict(PREPARED_SOURCES),
+        IMAGE_DPI,
+        JPEG_QUALITY,
+        (TRACE_PATH, PROFILE_PATH),
+        PAGE_CACHE_DIR,
+        {url: image_digest(url) for url in PREFETCHED_IMAGES},
+        OFFLINE,
+    )
+
+
+def init_build_worker(
+    prepared_sources: dict[str, bytes | None],
+    image_dpi: int,
+    jpeg_quality: int,
+    instrumentation: tuple[Path | None, Path | None] = (None, None),
+    page_cache_dir: Path | None = None,
+    image_digests: dict[str, str | None] | None = None,
+    offline: bool = False,
+) -> None:
+    global ACTIVE_FONT, IMAGE_CACHE, IMAGE_DPI, JPEG_QUALITY, OFFLINE, PAGE_CACHE_DIR
+    init_worker_instrumentation(instrumentation)
+    IMAGE_CACHE = None
+    OFFLINE = offline
+    PAGE_CACHE_DIR = page_cache_dir
+    IMAGE_DIGESTS.update(image_digests or {})
+    IMAGE_DPI = image_dpi
+    JPEG_QUALITY = jpeg_quality
+    PREPARED_SOURCES.update(prepared_sources)
+    ACTIVE_FONT = register_font()
 
 
-def main() -> None:
+def run_build_job(job: BuildJob) -> JobResult:
+    started = time.perf_counter()
+    try:
+        with span("run_build_job", output=job.output_path.name):
+            if job.catalog:
+                build_catalog_document(job.output_path, job.copy, job.catalog, job.page_size)
+            elif PAGE_CACHE_DIR is not None:
+                build_paged_document(job.output_path, job.copy, job.guide_items, job.page_size, job.include_ai)
+            else:
+                build_document(job.output_path, job.copy, job.guide_items, job.page_size, job.include_ai)
+            if job.web_optimize:
+                with span("optimize_for_web"):
+                    optimize_for_web(job.output_path)
+    except Exception as error:
+        return JobResult(job, time.perf_counter() - started, f"{type(error).__name__}: {error}")
+    return JobResult(job, time.perf_counter() - started)
+
+
+def run_build_jobs(jobs: list[BuildJob], workers: int) -> list[JobResult]:
     global ACTIVE_FONT
-    ACTIVE_FONT = register_font()
-    build_document(OUTPUT_PATH, COPY_FR, AI_GUIDE_ITEMS_FR)
-    build_document(OUTPUT_PATH_EN, COPY_EN, AI_GUIDE_ITEMS_EN)
+    # Catalog builds fetch their images page by page through the on-disk cache, which
+    # only the parent process owns.
+    if workers <= 1 or len(jobs) == 1 or any(job.catalog for job in jobs):
+        ACTIVE_FONT = register_font()
+        return [run_build_job(job) for job in jobs]
+    results = []
+    # Images are fetched and prepared once in the parent; workers only draw.
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(jobs)),
+        initializer=init_build_worker,
+        initargs=build_worker_args(),
+    ) as pool:
+        futures = {pool.submit(run_build_job, job): job for job in jobs}
+        for future in as_completed(futures):
+            try:
+                results.append(future.result())
+            except Exception as error:
+                results.append(JobResult(futures[future], 0.0, f"{type(error).__name__}: {error}"))
+    return results
+
+
+BATCH_CONTEXT: RenderContext | None = None
+BATCH_WINDOW_PER_WORKER = 4
+
+
+def iter_leads(path: Path) -> Iterator[tuple[int, dict]]:
+    with path.open(encoding="utf-8-sig", newline="") as handle:
+        if path.suffix.lower() == ".csv":
+            reader = csv.DictReader(handle)
+            for lead in reader:
+                yield reader.line_num, lead
+            return
+        for line_number, line in enumerate(handle, start=1):
+            if line.strip():
+                yield line_number, json.loads(line)
+
+
+def lead_output_name(lead: dict, id_column: str, index: int) -> str:
+    lead_id = re.sub(r"[^A-Za-z0-9._-]+", "-", str(lead.get(id_column) or "")).strip("-.")
+    return f"{lead_id or f'lead-{index:06d}'}.pdf"
+
+
+def claim_output_name(name: str, claimed: dict[str, int], line_number: int) -> str:
+    # Repeated ids get -2, -3, ... in input order, so reruns map each lead to the same
+    # file. Names are compared case-insensitively for macOS and Windows file systems.
+    candidate, number = name, 1
+    while candidate.lower() in claimed:
+        number += 1
+        candidate = f"{name.removesuffix('.pdf')}-{number}.pdf"
+    if candidate != name:
+        print(
+            f"WARNING line {line_number}: {name} is already used by line {claimed[name.lower()]}, writing {candidate}",
+            file=sys.stderr,
+        )
+    claimed[candidate.lower()] = line_number
+    return candidate
+
+
+def lead_prefill(lead: dict, mapping: dict[str, str], field_names: set[str]) -> dict:
+    prefill = {}
+    for column, value in lead.items():
+        field = mapping.get(column, column)
+        if field in field_names and value not in (None, ""):
+            prefill[field] = value
+    return prefill
+
+
+def init_batch_worker(
+    prepared_sources: dict[str, bytes | None],
+    image_dpi: int,
+    jpeg_quality: int,
+    instrumentation: tuple[Path | None, Path | None] = (None, None),
+    warm_templates: bool = False,
+    offline: bool = False,
+) -> None:
+    global BATCH_CONTEXT
+    init_build_worker(prepared_sources, image_dpi, jpeg_quality, instrumentation, offline=offline)
+    BATCH_CONTEXT = RenderContext([guide_items for _, _, guide_items in LOCALE_SOURCES.values()])
+    if warm_templates:
+        for _, copy, guide_items in LOCALE_SOURCES.values():
+            BATCH_CONTEXT.template(copy, guide_items)
+
+
+def render_brief(locale: str, prefill: dict) -> bytes:
+    _, copy, guide_items = LOCALE_SOURCES[locale]
+    return BATCH_CONTEXT.stamp(copy, guide_items, prefill)
+
+
+def render_lead(locale: str, prefill: dict, output_path: Path) -> str | None:
+    try:
+        with span("render_lead", output=output_path.name, locale=locale):
+            data = render_brief(locale, prefill)
+            tmp_path = output_path.with_suffix(f".{os.getpid()}.tmp")
+            tmp_path.write_bytes(data)
+            # Outputs only appear once complete, so a rerun can treat existing files as done.
+            os.replace(tmp_path, output_path)
+    except Exception as error:
+        return f"{type(error).__name__}: {error}"
+    return None
+
+
+def run_lead_batch(
+    leads_path: Path,
+    out_dir: Path,
+    mapping: dict[str, str],
+    id_column: str,
+    locale_column: str,
+    default_locale: str,
+    workers: int,
+) -> int:
+    field_names = set(collect_form_fields(COPY_FR))
+    unknown = sorted(set(mapping.values()) - field_names)
+    if unknown:
+        raise SystemExit("Unknown form field(s) in --map: " + ", ".join(unknown))
+    out_dir.mkdir(parents=True, exist_ok=True)
+    warm_prepared_images([guide_items for _, _, guide_items in LOCALE_SOURCES.values()])
+    started = time.perf_counter()
+    rendered = skipped = 0
+    failures = 0
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=init_batch_worker,
+        initargs=(dict(PREPARED_SOURCES), IMAGE_DPI, JPEG_QUALITY, (TRACE_PATH, PROFILE_PATH), False, OFFLINE),
+    ) as pool:
+        pending: dict = {}
+
+        def collect(done: set) -> None:
+            nonlocal rendered, failures
+            for future in done:
+                output_path = pending.pop(future)
+                error = future.result()
+                if error:
+                    failures += 1
+                    print(f"FAILED {output_path.name}: {error}", file=sys.stderr)
+                else:
+                    rendered += 1
+                    if rendered % 500 == 0:
+                        print(f"{rendered} briefs rendered ({time.perf_counter() - started:.1f}s)")
+
+        # Leads are read lazily and at most a few jobs per worker are in flight, so
+        # memory only grows by the output names claimed so far.
+        claimed: dict[str, int] = {}
+        for index, (line_number, lead) in enumerate(iter_leads(leads_path), start=1):
+            output_path = out_dir / claim_output_name(lead_output_name(lead, id_column, index), claimed, line_number)
+            if output_path.exists():
+                skipped += 1
+                continue
+            locale = str(lead.get(locale_column) or default_locale).lower()
+            if locale not in LOCALE_SOURCES:
+                failures += 1
+                print(f"FAILED {output_path.name}: unknown locale {locale!r}", file=sys.stderr)
+                continue
+            prefill = lead_prefill(lead, mapping, field_names)
+            pending[pool.submit(render_lead, locale, prefill, output_path)] = output_path
+            if len(pending) >= workers * BATCH_WINDOW_PER_WORKER:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+        collect(set(wait(pending).done))
+    elapsed = time.perf_counter() - started
+    print(f"{rendered} rendered, {skipped} already present, {failures} failed in {elapsed:.1f}s")
+    return failures
+
+
+def file_stamp(path: Path) -> tuple[int, int] | None:
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def file_digest(path: Path) -> str | None:
+    try:
+        return hashlib.sha256(path.read_bytes()).hexdigest()
+    except OSError:
+        return None
+
+
+SCRIPT_DATA_NAMES = {"COPY_FR", "COPY_EN", "AI_GUIDE_ITEMS_FR", "AI_GUIDE_ITEMS_EN"}
+SCRIPT_DIGESTS: dict[tuple[Path, int, int], str | None] = {}
+
+
+def assigned_names(node: ast.stmt) -> set[str]:
+    if isinstance(node, ast.Assign):
+        targets = node.targets
+    elif isinstance(node, ast.AnnAssign):
+        targets = [node.target]
+    else:
+        return set()
+    return {target.id for target in targets if isinstance(target, ast.Name)}
+
+
+def script_digest(path: Path) -> str | None:
+    # Copy and module lists are hashed per job, so they are left out of the code digest:
+    # editing the French copy leaves the English outputs up to date. Comments and
+    # formatting do not reach the AST either.
+    stamp = file_stamp(path)
+    if stamp is None:
+        return None
+    key = (path, *stamp)
+    if key not in SCRIPT_DIGESTS:
+        try:
+            tree = ast.parse(path.read_bytes())
+        except SyntaxError:
+            SCRIPT_DIGESTS[key] = file_digest(path)
+        else:
+            tree.body = [node for node in tree.body if not assigned_names(node) & SCRIPT_DATA_NAMES]
+            SCRIPT_DIGESTS[key] = hashlib.sha256(ast.dump(tree).encode("utf-8")).hexdigest()
+    return SCRIPT_DIGESTS[key]
+
+
+def image_digest(url: str) -> str | None:
+    if not is_remote(url):
+        return file_digest(Path(url))
+    data = PREFETCHED_IMAGES.get(url)
+    if data:
+        return hashlib.sha256(data).hexdigest()
+    if url in IMAGE_DIGESTS:
+        return IMAGE_DIGESTS[url]
+    return IMAGE_CACHE.digest(url) if IMAGE_CACHE else None
+
+
+def build_inputs_hash(job: BuildJob) -> str | None:
+    images = {url: image_digest(url) for url in collect_image_urls(job.guide_items)} if job.include_ai else {}
+    payload = {
+        "version": GENERATOR_VERSION,
+        "script": script_digest(Path(__file__)),
+        "pdf_library": file_digest(PDF_LIBRARY_PATH),
+        "font": file_digest(FONT_PATH),
+        "logo": file_digest(LOGO_PATH),
+        "image_dpi": IMAGE_DPI,
+        "jpeg_quality": JPEG_QUALITY,
+        "page_size": job.page_size,
+        "include_ai": job.include_ai,
+        "web_optimize": job.web_optimize,
+        "copy": job.copy,
+        "guide_items": job.guide_items if job.include_ai else [],
+        "images": images,
+    }
+    # An output drawn with a placeholder for an image that could not be fetched has no
+    # reproducible inputs: it is never up to date, so the next run tries the image again.
+    complete = None not in images.values()
+    if job.catalog:
+        catalog_images = hashlib.sha256()
+        for item in iter_catalog(job.catalog):
+            digest = image_digest(item["image"])
+            complete = complete and digest is not None
+            catalog_images.update(f"{item['image']}={digest}\n".encode("utf-8"))
+        payload.update(guide_items=[], catalog=file_digest(job.catalog), images=catalog_images.hexdigest())
+    if not complete:
+        return None
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def manifest_key(output_path: Path) -> str:
+    try:
+        return output_path.resolve().relative_to(BASE_DIR).as_posix()
+    except ValueError:
+        return str(output_path.resolve())
+
 
+def load_build_manifest() -> dict:
+    try:
+        return json.loads(BUILD_MANIFEST_PATH.read_text("utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def save_build_manifest(manifest: dict) -> None:
+    BUILD_MANIFEST_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = BUILD_MANIFEST_PATH.with_suffix(f".{os.getpid()}.tmp")
+    tmp_path.write_text(json.dumps(manifest, indent=2, sort_keys=True), "utf-8")
+    os.replace(tmp_path, BUILD_MANIFEST_PATH)
+
+
+def write_pdf_sidecar(outputs: dict[str, Path]) -> None:
+    entries = {}
+    for locale, output_path in outputs.items():
+        digest = file_digest(output_path)
+        if digest is None:
+            continue
+        try:
+            href = "/" + output_path.resolve().relative_to(PUBLIC_DIR).as_posix()
+        except ValueError:
+            continue
+        entries[locale] = {
+            "href": f"{href}?v={digest[:12]}",
+            "path": href,
+            "sha256": digest,
+            "bytes": output_path.stat().st_size,
+        }
+    if not entries:
+        return
+    payload = json.dumps(entries, indent=2) + "\n"
+    if not PDF_SIDECAR_PATH.exists() or PDF_SIDECAR_PATH.read_text("utf-8") != payload:
+        PDF_SIDECAR_PATH.write_text(payload, "utf-8")
+
+
+def field_schema_inputs() -> str:
+    payload = {
+        "version": GENERATOR_VERSION,
+        "script": script_digest(Path(__file__)),
+        "font": file_digest(FONT_PATH),
+        "copy": {locale: copy for locale, (_, copy, _) in LOCALE_SOURCES.items()},
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def write_field_schema(manifest: dict) -> bool:
+    # Listing the fields renders one document per locale, so the schema is tracked in the
+    # build manifest like the PDFs and only rebuilt when the copy or the layout changes.
+    key = manifest_key(FIELD_SCHEMA_PATH)
+    inputs = field_schema_inputs()
+    built = manifest.get(key)
+    if built and built["inputs"] == inputs and built["output"] == file_digest(FIELD_SCHEMA_PATH):
+        return False
+    fields: dict[str, dict] = {}
+    for locale, (_, copy, _) in LOCALE_SOURCES.items():
+        for name, spec in collect_form_fields(copy).items():
+            entry = fields.setdefault(name, {"type": spec["type"], "page": spec["page"], "label": {}})
+            entry["label"][locale] = spec["label"]
+    payload = json.dumps({"fields": fields}, indent=2, ensure_ascii=False) + "\n"
+    if not FIELD_SCHEMA_PATH.exists() or FIELD_SCHEMA_PATH.read_text("utf-8") != payload:
+        FIELD_SCHEMA_PATH.write_text(payload, "utf-8")
+    manifest[key] = {"inputs": inputs, "output": file_digest(FIELD_SCHEMA_PATH)}
+    return True
+
+
+def is_up_to_date(manifest: dict, job: BuildJob) -> bool:
+    entry = manifest.get(manifest_key(job.output_path))
+    return (
+        entry is not None
+        and entry["inputs"] == build_inputs_hash(job)
+        and entry["output"] == file_digest(job.output_path)
+    )
+
+
+SIZE_CATEGORIES = ("images", "fonts", "content", "acroform", "forms", "structure")
+# KiB; "image" applies to each embedded image on its own, "total" to the whole file.
+SIZE_BUDGETS = {"total": 300, "images": 200, "image": 60, "fonts": 40, "content": 40, "acroform": 40, "forms": 20}
+
+
+def image_xobject_name(reader: ImageReader) -> str:
+    # Mirrors canvas.drawImage(mask="auto"), which names each image after its pixels and mask.
+    data = reader.getRGBData()
+    mask = reader._dataA
+    return "FormXob." + _digester(data + (mask.getRGBData() if mask else b"auto"))
+
+
+def image_labels(guide_item_lists: list[list[dict]]) -> dict[str, str]:
+    labels = {}
+    logo = load_logo_image(LOGO_SIZE, LOGO_SIZE)
+    if logo:
+        labels[image_xobject_name(logo)] = "logo"
+    for guide_items in guide_item_lists:
+        for item in guide_items:
+            image = load_remote_image(item["image"], AI_IMAGE_SIZE, AI_IMAGE_SIZE)
+            if image:
+                labels[image_xobject_name(image)] = f"AI: {item['title']}"
+    return labels
+
+
+def size_breakdown(path: Path, labels: dict[str, str]) -> dict[str, dict[str, int]]:
+    pdf = PdfFile(path.read_bytes())
+    sizes = object_sizes(pdf)
+    owners: dict[int, tuple[str, str]] = {}
+
+    def claim(value, category: str, label: str) -> None:
+        stack = references(value) if not isinstance(value, PdfRef) else [value]
+        while stack:
+            ref = stack.pop()
+            if ref.num in owners:
+                continue
+            owners[ref.num] = (category, label)
+            stack.extend(references(pdf.get(ref.num), skip=("Parent", "P")))
+
+    pages = []
+    stack = [pdf.root["Pages"]]
+    while stack:
+        node = pdf.resolve(stack.pop())
+        if node.get("Type") == "Pages":
+            stack.extend(reversed(node["Kids"]))
+        else:
+            pages.append(node)
+    forms: list[tuple[str, PdfRef]] = []
+    resource_dicts = [pdf.resolve(page.get("Resources")) or {} for page in pages]
+    seen_forms = set()
+    while resource_dicts:
+        resources = resource_dicts.pop()
+        for name, ref in (pdf.resolve(resources.get("XObject")) or {}).items():
+            xobject = pdf.resolve(ref)
+            if xobject.get("Subtype") == "Image":
+                claim(ref, "images", labels.get(name, name))
+            elif isinstance(ref, PdfRef) and ref.num not in seen_forms:
+                seen_forms.add(ref.num)
+                forms.append((name.removeprefix("FormXob."), ref))
+                resource_dicts.append(pdf.resolve(xobject.get("Resources")) or {})
+        for ref in (pdf.resolve(resources.get("Font")) or {}).values():
+            claim(ref, "fonts", decode_text(pdf.resolve(ref).get("BaseFont")))
+    for number, page in enumerate(pages, start=1):
+        claim(page.get("Annots", []), "acroform", f"page {number} widgets")
+    claim(pdf.root.get("AcroForm", {}), "acroform", "form dictionary")
+    for number, page in enumerate(pages, start=1):
+        claim(page.get("Contents", []), "content", f"page {number}")
+    for name, ref in forms:
+        claim(ref, "forms", name)
+    breakdown: dict[str, dict[str, int]] = {category: {} for category in SIZE_CATEGORIES}
+    for num, size in sizes.items():
+        category, label = owners.get(num, ("structure", "catalog, pages, info"))
+        breakdown[category][label] = breakdown[category].get(label, 0) + size
+    unattributed = len(pdf.data) - sum(sizes.values())
+    breakdown["structure"]["xref and trailer"] = breakdown["structure"].get("xref and trailer", 0) + unattributed
+    return breakdown
+
+
+def report_sizes(paths: list[Path], guide_item_lists: list[list[dict]], budgets: dict[str, float]) -> list[str]:
+    labels = image_labels(guide_item_lists)
+    warnings = []
+    for path in paths:
+        breakdown = size_breakdown(path, labels)
+        total = path.stat().st_size
+        print(f"{manifest_key(path)}: {total / 1024:.1f} KiB")
+        checks = [("total", "total", total)]
+        for category in SIZE_CATEGORIES:
+            entries = breakdown[category]
+            category_total = sum(entries.values())
+            if not category_total:
+                continue
+            print(f"  {category:<10} {category_total / 1024:8.1f} KiB")
+            for label, size in sorted(entries.items(), key=lambda entry: -entry[1]):
+                print(f"    {label[:48]:<48} {size / 1024:8.1f} KiB")
+                if category == "images":
+                    checks.append(("image", label, size))
+            checks.append((category, category, category_total))
+        for budget_name, label, size in checks:
+            budget = budgets.get(budget_name)
+            if budget is not None and size > budget * 1024:
+                warnings.append(f"{manifest_key(path)}: {label} is {size / 1024:.1f} KiB, budget {budget:g} KiB")
+    for warning in warnings:
+        print(f"WARNING over budget: {warning}", file=sys.stderr)
+    return warnings
+
+
+LOCALE_SOURCES = {
+    "fr": (OUTPUT_PATH, COPY_FR, AI_GUIDE_ITEMS_FR),
+    "en": (OUTPUT_PATH_EN, COPY_EN, AI_GUIDE_ITEMS_EN),
+}
+
+
+def parse_mapping(value: str) -> tuple[str, str]:
+    column, separator, field = value.partition("=")
+    if not separator or not column or not field:
+        raise argparse.ArgumentTypeError(f"expected COLUMN=FIELD, got {value!r}")
+    return column, field
+
+
+def parse_budget(value: str) -> tuple[str, float]:
+    name, separator, kib = value.partition("=")
+    if not separator or name not in SIZE_BUDGETS:
+        raise argparse.ArgumentTypeError(f"expected NAME=KIB with NAME in {', '.join(SIZE_BUDGETS)}, got {value!r}")
+    try:
+        return name, float(kib)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"budget must be a number of KiB, got {kib!r}") from None
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Generate the premium cahier des charges PDFs.")
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="only use cached image bytes and fail if an image has never been cached",
+    )
+    parser.add_argument("--cache-dir", type=Path, default=IMAGE_CACHE_DIR, help="remote image cache directory")
+    parser.add_argument(
+        "--cache-max-mb",
+        type=float,
+        default=IMAGE_CACHE_MAX_BYTES / (1024 * 1024),
+        help="size limit of the image cache before least recently used entries are evicted",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="do not read or write the image, font and page caches (pages are then drawn on a single canvas)",
+    )
+    parser.add_argument(
+        "--image-dpi",
+        type=int,
+        default=IMAGE_DPI,
+        help="resolution embedded images are resampled to for their printed box",
+    )
+    parser.add_argument(
+        "--jpeg-quality",
+        type=int,
+        default=JPEG_QUALITY,
+        help="JPEG quality used for opaque images",
+    )
+    parser.add_argument("--force", action="store_true", help="rebuild every output even if its inputs are unchanged")
+    parser.add_argument(
+        "--locale",
+        action="append",
+        choices=sorted(LOCALE_SOURCES),
+        help="locale to build (repeatable, default: all)",
+    )
+    parser.add_argument(
+        "--page-size",
+        action="append",
+        choices=sorted(PAGE_SIZES),
+        help="page size variant to build (repeatable, default: a4)",
+    )
+    parser.add_argument(
+        "--ai-page",
+        choices=["with", "without", "both"],
+        default="with",
+        help="build variants with and/or without the AI modules page",
+    )
+    parser.add_argument(
+        "--web-optimize",
+        action="store_true",
+        help="linearize (fast web view) and repack outputs into compressed object streams (needs pikepdf)",
+    )
+    parser.add_argument(
+        "--catalog",
+        metavar="PATH",
+        help="JSON array, JSONL or YAML file of AI modules paginated in place of the built-in list "
+        "({locale} in the path is replaced by fr/en)",
+    )
+    parser.add_argument("--leads", type=Path, help="CSV or JSONL file of leads to render prefilled briefs for")
+    parser.add_argument(
+        "--out-dir",
+        type=Path,
+        default=BASE_DIR / "out" / "briefs",
+        help="directory for prefilled briefs (batch mode)",
+    )
+    parser.add_argument(
+        "--map",
+        action="append",
+        default=[],
+        type=parse_mapping,
+        metavar="COLUMN=FIELD",
+        help="map a lead column to a form field name (repeatable, columns default to same-named fields)",
+    )
+    parser.add_argument("--id-column", default="id", help="lead column used to name the output file")
+    parser.add_argument("--locale-column", default="locale", help="lead column holding fr/en")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="number of build processes",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="stay running and rebuild the outputs whose inputs change (script, font, logo, catalog)",
+    )
+    parser.add_argument(
+        "--trace",
+        type=Path,
+        nargs="?",
+        const=CACHE_DIR / "trace.json",
+        help="write nested timing spans as a Chrome trace (chrome://tracing, Perfetto)",
+    )
+    parser.add_argument(
+        "--profile",
+        type=Path,
+        nargs="?",
+        const=CACHE_DIR / "profile.prof",
+        help="also capture cProfile stats (pstats file) and print the hottest functions",
+    )
+    parser.add_argument(
+        "--size-report",
+        action="store_true",
+        help="break each output down by images, fonts, page content, AcroForm and shared forms",
+    )
+    parser.add_argument(
+        "--size-budget",
+        type=parse_budget,
+        action="append",
+        default=[],
+        metavar="NAME=KIB",
+        help="override a --size-report budget (" + ", ".join(f"{name}={kib}" for name, kib in SIZE_BUDGETS.items()) + ")",
+    )
+    parser.add_argument(
+        "--fail-over-budget",
+        action="store_true",
+        help="exit non-zero when --size-report finds a budget overrun",
+    )
+    return parser.parse_args(argv)
+
+
+def check_output_sizes(args: argparse.Namespace, jobs: list[BuildJob]) -> None:
+    if not args.size_report:
+        return
+    paths = [job.output_path for job in jobs if job.output_path.exists()]
+    budgets = {**SIZE_BUDGETS, **dict(args.size_budget)}
+    warnings = report_sizes(paths, [job.guide_items for job in jobs if job.include_ai], budgets)
+    if warnings and args.fail_over_budget:
+        raise SystemExit(f"{len(warnings)} size budget(s) exceeded")
+
+
+WATCH_INTERVAL = 0.2
+
+
+def load_generator(path: Path):
+    importlib.reload(sys.modules[PdfFile.__module__])
+    spec = importlib.util.spec_from_file_location("generate_premium_cahier", path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def watched_paths(args: argparse.Namespace) -> list[Path]:
+    paths = [Path(__file__), PDF_LIBRARY_PATH, FONT_PATH, LOGO_PATH]
+    if args.catalog:
+        paths.extend(Path(args.catalog.format(locale=locale)) for locale in args.locale or LOCALE_SOURCES)
+    return list(dict.fromkeys(paths))
+
+
+def rebuild(generator, args: argparse.Namespace) -> None:
+    try:
+        generator.run(args)
+    except SystemExit as error:
+        if error.code not in (None, 0):
+            print(error.code, file=sys.stderr)
+    except Exception:
+        traceback.print_exc()
+
+
+def watch(args: argparse.Namespace) -> None:
+    # One warm process: the font stays registered and fetched images stay in memory
+    # across rebuilds, even when the script itself is reloaded. The build manifest
+    # then skips every output whose inputs did not change.
+    args.workers = 1
+    generator = sys.modules[__name__]
+    paths = watched_paths(args)
+    stamps = {path: file_stamp(path) for path in paths}
+    rebuild(generator, args)
+    print(f"Watching {', '.join(path.name for path in paths)} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(WATCH_INTERVAL)
+            changed = [path for path in paths if file_stamp(path) != stamps[path]]
+            if not changed:
+                continue
+            stamps.update((path, file_stamp(path)) for path in changed)
+            names = ", ".join(path.name for path in changed)
+            started = time.perf_counter()
+            if Path(__file__) in changed or PDF_LIBRARY_PATH in changed:
+                try:
+                    fresh = load_generator(Path(__file__))
+                except Exception as error:
+                    print(f"{names}: reload failed, {type(error).__name__}: {error}", file=sys.stderr)
+                    continue
+                # Failed fetches are left out so the reloaded generator tries them again.
+                fresh.PREFETCHED_IMAGES.update(
+                    (url, data) for url, data in generator.PREFETCHED_IMAGES.items() if data is not None
+                )
+                generator = fresh
+            if FONT_PATH in changed:
+                generator.register_font(reload=True)
+                # Layout keys hold the font name, which a new font file keeps.
+                generator.TEXT_LAYOUT.clear()
+            rebuild(generator, args)
+            print(f"{names} changed, done in {time.perf_counter() - started:.2f}s")
+    except KeyboardInterrupt:
+        print()
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    if args.watch:
+        if args.leads or args.trace or args.profile:
+            raise SystemExit("--watch cannot be combined with --leads, --trace or --profile")
+        watch(args)
+        return
+    trace_path = args.trace or (CACHE_DIR / "trace.json" if args.profile else None)
+    start_instrumentation(trace_path, args.profile, role="main")
+    try:
+        with span("main"):
+            run(args)
+    finally:
+        finish_instrumentation()
+
+
+def run(args: argparse.Namespace) -> None:
+    global FONT_CACHE_DIR, IMAGE_CACHE, IMAGE_DPI, JPEG_QUALITY, OFFLINE, PAGE_CACHE_DIR
+    if args.offline and args.no_cache:
+        raise SystemExit("--offline needs the image cache, drop --no-cache")
+    OFFLINE = args.offline
+    IMAGE_DPI = args.image_dpi
+    JPEG_QUALITY = args.jpeg_quality
+    IMAGE_CACHE = None if args.no_cache else ImageCache(args.cache_dir, int(args.cache_max_mb * 1024 * 1024))
+    FONT_CACHE_DIR = None if args.no_cache else FONT_CACHE_DIR
+    PAGE_CACHE_DIR = None if args.no_cache else PAGE_CACHE_DIR
+    if not args.no_cache:
+        TEXT_LAYOUT.load(TEXT_LAYOUT_PATH)
+    if args.leads:
+        mapping = dict(args.map)
+        default_locale = (args.locale or ["fr"])[0]
+        failures = run_lead_batch(
+            args.leads,
+            args.out_dir,
+            mapping,
+            args.id_column,
+            args.locale_column,
+            default_locale,
+            max(1, args.workers),
+        )
+        if IMAGE_CACHE:
+            IMAGE_CACHE.save()
+            TEXT_LAYOUT.save(TEXT_LAYOUT_PATH)
+        if failures:
+            raise SystemExit(f"{failures} brief(s) failed")
+        return
+    manifest = load_build_manifest()
+    ai_variants = {"with": [True], "without": [False], "both": [True, False]}[args.ai_page]
+    all_jobs = build_matrix(args.locale or list(LOCALE_SOURCES), args.page_size or ["a4"], ai_variants)
+    if args.web_optimize:
+        try:
+            load_pikepdf()
+        except RuntimeError as error:
+            raise SystemExit(str(error)) from None
+        for job in all_jobs:
+            job.web_optimize = True
+    if args.catalog:
+        for job in all_jobs:
+            if job.include_ai:
+                job.catalog = Path(args.catalog.format(locale=job.locale))
+                job.guide_items = []
+        for catalog in {job.catalog for job in all_jobs if job.catalog}:
+            try:
+                item_count = sum(1 for _ in iter_catalog(catalog))
+            except (OSError, ValueError, RuntimeError) as error:
+                raise SystemExit(f"Catalog {catalog}: {error}") from None
+            print(f"catalog {catalog}: {item_count} modules")
+    outputs = {job.locale: job.output_path for job in all_jobs if job.page_size == "a4" and job.include_ai}
+    jobs = all_jobs if args.force else [job for job in all_jobs if not is_up_to_date(manifest, job)]
+    if not jobs:
+        write_pdf_sidecar(outputs)
+        if write_field_schema(manifest):
+            save_build_manifest(manifest)
+        print("Cahier PDFs are up to date.")
+        check_output_sizes(args, all_jobs)
+        return
+    guide_item_lists = [job.guide_items for job in jobs if job.include_ai]
+    with span("prefetch_images"):
+        images = prefetch_images(collect_image_urls(*guide_item_lists))
+    missing = [url for url, data in images.items() if data is None]
+    if OFFLINE and missing:
+        raise SystemExit("Offline mode: no cached copy for\n  " + "\n  ".join(missing))
+    with span("warm_prepared_images"):
+        warm_prepared_images(guide_item_lists, images)
+    with span("run_build_jobs", jobs=len(jobs)):
+        results = run_build_jobs(jobs, args.workers)
+    failures = []
+    for result in results:
+        output_name = manifest_key(result.job.output_path)
+        if result.error:
+            failures.append(result)
+            print(f"FAILED {output_name} after {result.seconds:.2f}s: {result.error}", file=sys.stderr)
+            continue
+        inputs = build_inputs_hash(result.job)
+        if inputs is None:
+            manifest.pop(output_name, None)
+            print(f"built {output_name} in {result.seconds:.2f}s with missing images; it will be rebuilt next run")
+            continue
+        print(f"built {output_name} in {result.seconds:.2f}s")
+        manifest[output_name] = {"inputs": inputs, "output": file_digest(result.job.output_path)}
+    if IMAGE_CACHE:
+        IMAGE_CACHE.save()
+        TEXT_LAYOUT.save(TEXT_LAYOUT_PATH)
+        prune_page_cache()
+    write_field_schema(manifest)
+    save_build_manifest(manifest)
+    write_pdf_sidecar(outputs)
+    if failures:
+        raise SystemExit(f"{len(failures)} of {len(jobs)} builds failed")
+    check_output_sizes(args, all_jobs)
 
-PAGE_W, PAGE_H = A4
 MARGIN = 20 * mm
 GUTTER = 8 * mm
+FOOTER_CLEARANCE = 22 * mm
+AI_CARD_HEIGHT = 30 * mm
+AI_IMAGE_SIZE = AI_CARD_HEIGHT - 12
+LOGO_SIZE = 12 * mm
 ACTIVE_FONT = FALLBACK_FONT
 
 
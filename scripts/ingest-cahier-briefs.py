@@ -0,0 +1,321 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import importlib.util
+import json
+import mmap
+import os
+import re
+import sqlite3
+import sys
+import tarfile
+import time
+import zipfile
+import zlib
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+EXTRACTOR_PATH = SCRIPT_DIR / "extract-cahier-fields.py"
+BASE_DIR = SCRIPT_DIR.parent
+DEFAULT_DB_PATH = BASE_DIR / ".cache" / "cahier" / "briefs.sqlite"
+BATCH_SIZE = 32
+BATCH_WINDOW_PER_WORKER = 2
+COLUMN_RE = re.compile(r"[a-z_][a-z0-9_]*")
+INDEXED_FIELDS = ("project_budget", "project_date")
+# Checkbox groups sales filter on; indexed on checked rows only, which is what queries ask for.
+INDEXED_CHECKBOX_PREFIXES = ("feature_", "integration_")
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+SOURCE_UPSERT = (
+    "INSERT INTO sources (source, sha256, bytes, mtime_ns, error) VALUES (?, ?, ?, ?, ?) "
+    "ON CONFLICT(source) DO UPDATE SET sha256 = excluded.sha256, bytes = excluded.bytes, "
+    "mtime_ns = excluded.mtime_ns, error = excluded.error"
+)
+
+EXTRACTOR = None
+SCHEMA: dict[str, dict] = {}
+MAX_BYTES = 0
+KNOWN_DIGESTS: frozenset[str] = frozenset()
+ARCHIVE: tuple[Path, zipfile.ZipFile | tarfile.TarFile] | None = None
+
+
+def load_extractor():
+    if "extract_cahier_fields" in sys.modules:
+        return sys.modules["extract_cahier_fields"]
+    sys.path.insert(0, str(SCRIPT_DIR))
+    spec = importlib.util.spec_from_file_location("extract_cahier_fields", EXTRACTOR_PATH)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["extract_cahier_fields"] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def init_ingest_worker(schema: dict[str, dict], max_bytes: int, known_digests: frozenset[str]) -> None:
+    global EXTRACTOR, SCHEMA, MAX_BYTES, KNOWN_DIGESTS
+    EXTRACTOR = load_extractor()
+    SCHEMA = schema
+    MAX_BYTES = max_bytes
+    KNOWN_DIGESTS = known_digests
+
+
+def read_member(path: Path, name: str) -> bytes:
+    # Sources come out of an archive in order, so a worker keeps the last one it opened.
+    global ARCHIVE
+    if ARCHIVE is None or ARCHIVE[0] != path:
+        if ARCHIVE is not None:
+            ARCHIVE[1].close()
+        ARCHIVE = (path, zipfile.ZipFile(path) if path.suffix.lower() == ".zip" else tarfile.open(path))
+    archive = ARCHIVE[1]
+    if isinstance(archive, zipfile.ZipFile):
+        return archive.read(name)
+    return archive.extractfile(name).read()
+
+
+@contextmanager
+def open_source(item: Path | tuple[Path, str]) -> Iterator:
+    if isinstance(item, Path):
+        with item.open("rb") as handle:
+            EXTRACTOR.check_size(handle.seek(0, 2), MAX_BYTES)
+            # Hashing pages the whole file in once; extraction then reads the same pages.
+            with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                yield data
+    else:
+        data = read_member(*item)
+        EXTRACTOR.check_size(len(data), MAX_BYTES)
+        yield data
+
+
+def extract_batch(batch: list[tuple[str, Path | tuple[Path, str]]]) -> list[tuple[str, str | None, dict | None, str | None]]:
+    # (source, sha256, record or None when the brief is already stored, error)
+    results = []
+    for source, item in batch:
+        digest = record = None
+        try:
+            with open_source(item) as data:
+                digest = hashlib.sha256(data).hexdigest()
+                if digest not in KNOWN_DIGESTS:
+                    record = EXTRACTOR.extract_data(data, SCHEMA)
+        except Exception as error:
+            results.append((source, digest, None, f"{type(error).__name__}: {error}"))
+        else:
+            results.append((source, digest, record, None))
+    return results
+
+
+def is_archive(path: Path) -> bool:
+    return path.name.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def iter_sources(paths: list[Path]) -> Iterator[tuple[str, int, int, Path | tuple[Path, str]]]:
+    # (source, size, mtime_ns, file path or (archive path, member name))
+    for root in paths:
+        files = sorted(root.rglob("*")) if root.is_dir() else [root]
+        for path in files:
+            if not path.is_file():
+                continue
+            if is_archive(path):
+                yield from iter_archive(path)
+            elif path.suffix.lower() == ".pdf":
+                stat = path.stat()
+                yield str(path), stat.st_size, stat.st_mtime_ns, path
+
+
+def iter_archive(path: Path) -> Iterator[tuple[str, int, int, tuple[Path, str]]]:
+    # Only names are listed here; workers read the members themselves.
+    if path.suffix.lower() == ".zip":
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                if info.is_dir() or not info.filename.lower().endswith(".pdf"):
+                    continue
+                mtime = int(time.mktime((*info.date_time, 0, 0, -1))) * 1_000_000_000
+                yield f"{path}!{info.filename}", info.file_size, mtime, (path, info.filename)
+    else:
+        with tarfile.open(path) as archive:
+            for member in archive:
+                if not member.isfile() or not member.name.lower().endswith(".pdf"):
+                    continue
+                yield f"{path}!{member.name}", member.size, int(member.mtime) * 1_000_000_000, (path, member.name)
+
+
+def column_names(schema: dict[str, dict]) -> list[str]:
+    invalid = [name for name in schema if not COLUMN_RE.fullmatch(name)]
+    if invalid:
+        raise SystemExit(f"Field names unusable as columns: {', '.join(invalid)}")
+    return list(schema)
+
+
+def open_store(db_path: Path, schema: dict[str, dict]) -> sqlite3.Connection:
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    db = sqlite3.connect(db_path)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS briefs ("
+        "sha256 TEXT PRIMARY KEY, bytes INTEGER NOT NULL, ingested_at REAL NOT NULL, unknown_fields TEXT)"
+    )
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS sources ("
+        "source TEXT PRIMARY KEY, sha256 TEXT, bytes INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, error TEXT)"
+    )
+    db.execute("CREATE INDEX IF NOT EXISTS sources_sha256 ON sources(sha256)")
+    # Columns follow the generator's field schema; fields added later become new columns.
+    existing = {row[1] for row in db.execute("PRAGMA table_info(briefs)")}
+    for name in column_names(schema):
+        if name not in existing:
+            kind = "INTEGER" if schema[name]["type"] == "checkbox" else "TEXT"
+            db.execute(f'ALTER TABLE briefs ADD COLUMN "{name}" {kind}')
+        if name in INDEXED_FIELDS:
+            db.execute(f'CREATE INDEX IF NOT EXISTS "briefs_{name}" ON briefs("{name}")')
+        elif schema[name]["type"] == "checkbox" and name.startswith(INDEXED_CHECKBOX_PREFIXES):
+            db.execute(f'CREATE INDEX IF NOT EXISTS "briefs_{name}" ON briefs("{name}") WHERE "{name}" = 1')
+    db.commit()
+    return db
+
+
+def store_results(
+    db: sqlite3.Connection,
+    columns: list[str],
+    results: list,
+    queued: dict[str, tuple[int, int]],
+    known_digests: set[str],
+    stats: dict[str, int],
+    failures: list[tuple[str, str]],
+) -> None:
+    now = time.time()
+    names = ", ".join(f'"{name}"' for name in columns)
+    placeholders = ", ".join("?" for _ in columns)
+    updates = ", ".join(f'"{name}" = excluded."{name}"' for name in columns)
+    rows = []
+    source_rows = []
+    for source, digest, record, error in results:
+        size, mtime_ns = queued.pop(source)
+        source_rows.append((source, digest, size, mtime_ns, error))
+        if error:
+            stats["failed"] += 1
+            failures.append((source, error))
+            continue
+        # Stored before this run, or by an earlier source of this run.
+        if record is None or digest in known_digests:
+            stats["duplicate"] += 1
+            continue
+        known_digests.add(digest)
+        fields = record["fields"]
+        values = [int(fields[name]) if isinstance(fields[name], bool) else fields[name] for name in columns]
+        rows.append((digest, size, now, json.dumps(record["unknown"]) if record["unknown"] else None, *values))
+    # A source is only recorded with its brief, so an interrupted run leaves it to the next one.
+    with db:
+        db.executemany(
+            f"INSERT INTO briefs (sha256, bytes, ingested_at, unknown_fields, {names}) "
+            f"VALUES (?, ?, ?, ?, {placeholders}) "
+            f"ON CONFLICT(sha256) DO UPDATE SET unknown_fields = excluded.unknown_fields, {updates}",
+            rows,
+        )
+        db.executemany(SOURCE_UPSERT, source_rows)
+    stats["ingested"] += len(rows)
+
+
+def ingest(
+    paths: list[Path],
+    db_path: Path,
+    schema: dict[str, dict],
+    workers: int,
+    max_bytes: int,
+    rescan: bool = False,
+) -> tuple[dict[str, int], list[tuple[str, str]]]:
+    db = open_store(db_path, schema)
+    columns = column_names(schema)
+    known_sources = {
+        source: (size, mtime_ns)
+        for source, size, mtime_ns in db.execute("SELECT source, bytes, mtime_ns FROM sources")
+    }
+    known_digests = {digest for (digest,) in db.execute("SELECT sha256 FROM briefs")}
+    stats = {"seen": 0, "unchanged": 0, "duplicate": 0, "ingested": 0, "failed": 0}
+    failures: list[tuple[str, str]] = []
+    batch: list[tuple[str, Path | tuple[Path, str]]] = []
+    queued: dict[str, tuple[int, int]] = {}
+    pending: set = set()
+    pool = ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=init_ingest_worker,
+        initargs=(schema, max_bytes, frozenset(known_digests)),
+    )
+
+    def collect(done: set) -> None:
+        for future in done:
+            pending.discard(future)
+            store_results(db, columns, future.result(), queued, known_digests, stats, failures)
+
+    try:
+        for source, size, mtime_ns, item in iter_sources(paths):
+            stats["seen"] += 1
+            # Same path, size and mtime as last run: nothing to hash or extract.
+            if not rescan and known_sources.get(source) == (size, mtime_ns):
+                stats["unchanged"] += 1
+                continue
+            if size > max_bytes:
+                error = f"PdfError: {size} bytes, limit is {max_bytes}"
+                db.execute(SOURCE_UPSERT, (source, None, size, mtime_ns, error))
+                stats["failed"] += 1
+                failures.append((source, error))
+                continue
+            # Workers hash and extract in one read; the parent only lists sources.
+            queued[source] = (size, mtime_ns)
+            batch.append((source, item))
+            if len(batch) >= BATCH_SIZE:
+                pending.add(pool.submit(extract_batch, batch))
+                batch = []
+                if len(pending) >= workers * BATCH_WINDOW_PER_WORKER:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+        if batch:
+            pending.add(pool.submit(extract_batch, batch))
+        collect(set(wait(pending).done))
+    finally:
+        pool.shutdown(cancel_futures=True)
+        db.commit()
+        db.close()
+    return stats, failures
+
+
+def parse_args(argv: list[str] | None) -> argparse.Namespace:
+    extractor = load_extractor()
+    parser = argparse.ArgumentParser(description="Ingest filled cahier PDFs into a queryable SQLite store.")
+    parser.add_argument("paths", nargs="+", type=Path, help="PDFs, directories or .zip/.tar archives of PDFs")
+    parser.add_argument("--db", type=Path, default=DEFAULT_DB_PATH, help="SQLite store to upsert into")
+    parser.add_argument("--schema", type=Path, default=extractor.FIELD_SCHEMA_PATH, help="field schema written by the generator")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="extraction processes")
+    parser.add_argument(
+        "--max-mb",
+        type=float,
+        default=extractor.MAX_PDF_BYTES / (1024 * 1024),
+        help="skip larger files, like the brief upload endpoint",
+    )
+    parser.add_argument("--rescan", action="store_true", help="hash every file again instead of trusting size and mtime")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    missing = [str(path) for path in args.paths if not path.exists()]
+    if missing:
+        raise SystemExit(f"Not found: {', '.join(missing)}")
+    schema = load_extractor().load_schema(args.schema)
+    started = time.perf_counter()
+    try:
+        stats, failures = ingest(args.paths, args.db, schema, max(1, args.workers), int(args.max_mb * 1024 * 1024), args.rescan)
+    except (sqlite3.Error, zipfile.BadZipFile, tarfile.TarError, zlib.error) as error:
+        raise SystemExit(f"Ingestion failed: {type(error).__name__}: {error}") from None
+    print(
+        f"{stats['seen']} PDF(s) seen: {stats['ingested']} ingested, {stats['duplicate']} duplicate, "
+        f"{stats['unchanged']} unchanged, {stats['failed']} failed "
+        f"in {time.perf_counter() - started:.2f}s -> {args.db}"
+    )
+    for source, error in failures:
+        print(f"  {source}: {error}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import importlib.util
+import json
+import math
+import os
+import statistics
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+GENERATOR_PATH = SCRIPT_DIR / "generate-premium-cahier.py"
+
+DEFAULT_PORT = 8787
+MAX_BODY_BYTES = 64 * 1024
+OUTPUT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+QUEUE_PER_WORKER = 4
+LATENCY_WINDOW = 1024
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def load_generator():
+    if "generate_premium_cahier" in sys.modules:
+        return sys.modules["generate_premium_cahier"]
+    sys.path.insert(0, str(SCRIPT_DIR))
+    spec = importlib.util.spec_from_file_location("generate_premium_cahier", GENERATOR_PATH)
+    module = importlib.util.module_from_spec(spec)
+    # Registered before exec so pool workers can unpickle calls that reference it.
+    sys.modules["generate_premium_cahier"] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+class Busy(Exception):
+    def __init__(self, retry_after: int) -> None:
+        super().__init__(f"render queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class OutputCache:
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.entries: OrderedDict[str, bytes] = OrderedDict()
+        self.size = 0
+
+    def get(self, key: str) -> bytes | None:
+        data = self.entries.get(key)
+        if data is not None:
+            self.entries.move_to_end(key)
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        if key in self.entries:
+            self.size -= len(self.entries.pop(key))
+        self.entries[key] = data
+        self.size += len(data)
+        while self.size > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= len(evicted)
+
+
+class RenderService:
+    def __init__(self, gen, workers: int, max_queue: int, cache_bytes: int) -> None:
+        self.gen = gen
+        self.workers = workers
+        self.max_queue = max_queue
+        self.field_names = set(gen.collect_form_fields(gen.COPY_FR))
+        gen.warm_prepared_images([guide_items for _, _, guide_items in gen.LOCALE_SOURCES.values()])
+        self.pool = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=gen.init_batch_worker,
+            initargs=(dict(gen.PREPARED_SOURCES), gen.IMAGE_DPI, gen.JPEG_QUALITY, (None, None), True),
+        )
+        # Re-entrant: a render that is already done runs its callback in the submitting thread.
+        self.lock = threading.RLock()
+        self.in_flight: dict[str, Future] = {}
+        self.cache = OutputCache(cache_bytes)
+        self.counters: Counter[str] = Counter()
+        self.render_seconds: deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self.request_buckets = [0] * len(LATENCY_BUCKETS)
+        self.request_count = 0
+        self.request_sum = 0.0
+
+    def warm(self) -> None:
+        # One blank brief per worker and locale, submitted together, starts every worker
+        # with its font, images and form templates loaded before the first real request.
+        wait([self.pool.submit(self.gen.render_brief, locale, {}) for locale in self.gen.LOCALE_SOURCES for _ in range(self.workers)])
+
+    def close(self) -> None:
+        self.pool.shutdown(cancel_futures=True)
+
+    def prefill(self, fields: dict) -> dict:
+        return {
+            name: value if isinstance(value, bool) else str(value)
+            for name, value in self.gen.lead_prefill(fields, {}, self.field_names).items()
+        }
+
+    def retry_after(self) -> int:
+        typical = statistics.median(self.render_seconds) if self.render_seconds else 1.0
+        return max(1, math.ceil(len(self.in_flight) / self.workers * typical))
+
+    def render(self, locale: str, prefill: dict) -> tuple[str, bytes]:
+        key = hashlib.sha256(json.dumps([locale, prefill], sort_keys=True).encode("utf-8")).hexdigest()
+        with self.lock:
+            data = self.cache.get(key)
+            if data is not None:
+                self.counters["cache_hit"] += 1
+                return "cache_hit", data
+            future = self.in_flight.get(key)
+            if future is not None:
+                self.counters["coalesced"] += 1
+                source = "coalesced"
+            else:
+                if len(self.in_flight) >= self.max_queue:
+                    self.counters["rejected"] += 1
+                    raise Busy(self.retry_after())
+                started = time.perf_counter()
+                future = self.pool.submit(self.gen.render_brief, locale, prefill)
+                self.in_flight[key] = future
+                future.add_done_callback(lambda done: self.finish(key, done, started))
+                source = "rendered"
+        return source, future.result()
+
+    def finish(self, key: str, future: Future, started: float) -> None:
+        with self.lock:
+            # Stored before the in-flight entry goes away, so a request arriving in
+            # between finds one or the other.
+            if not future.cancelled() and future.exception() is None:
+                self.cache.put(key, future.result())
+                self.render_seconds.append(time.perf_counter() - started)
+            del self.in_flight[key]
+
+    def observe(self, outcome: str, seconds: float) -> None:
+        with self.lock:
+            if outcome in ("rendered", "error", "bad_request"):
+                self.counters[outcome] += 1
+            self.request_count += 1
+            self.request_sum += seconds
+            for index, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    self.request_buckets[index] += 1
+
+    def metrics(self) -> str:
+        with self.lock:
+            lines = [
+                "# TYPE cahier_requests_total counter",
+                *(
+                    f'cahier_requests_total{{outcome="{outcome}"}} {self.counters[outcome]}'
+                    for outcome in ("rendered", "coalesced", "cache_hit", "rejected", "bad_request", "error")
+                ),
+                "# TYPE cahier_queue_depth gauge",
+                f"cahier_queue_depth {len(self.in_flight)}",
+                "# TYPE cahier_queue_limit gauge",
+                f"cahier_queue_limit {self.max_queue}",
+                "# TYPE cahier_workers gauge",
+                f"cahier_workers {self.workers}",
+                "# TYPE cahier_output_cache_bytes gauge",
+                f"cahier_output_cache_bytes {self.cache.size}",
+                "# TYPE cahier_output_cache_entries gauge",
+                f"cahier_output_cache_entries {len(self.cache.entries)}",
+                "# TYPE cahier_request_seconds histogram",
+                *(
+                    f'cahier_request_seconds_bucket{{le="{bound}"}} {count}'
+                    for bound, count in zip(LATENCY_BUCKETS, self.request_buckets)
+                ),
+                f'cahier_request_seconds_bucket{{le="+Inf"}} {self.request_count}',
+                f"cahier_request_seconds_sum {self.request_sum:.6f}",
+                f"cahier_request_seconds_count {self.request_count}",
+                "# TYPE cahier_render_seconds summary",
+            ]
+            if self.render_seconds:
+                ordered = sorted(self.render_seconds)
+                for quantile in (0.5, 0.9, 0.99):
+                    value = ordered[min(len(ordered) - 1, math.ceil(len(ordered) * quantile) - 1)]
+                    lines.append(f'cahier_render_seconds{{quantile="{quantile}"}} {value:.6f}')
+            lines.append(f"cahier_render_seconds_count {len(self.render_seconds)}")
+        return "\n".join(lines) + "\n"
+
+
+class RenderServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Campaign bursts arrive faster than connections are accepted; the default backlog
+    # of 5 resets them before the queue limit can answer 429.
+    request_queue_size = 128
+
+
+def make_handler(service: RenderService):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def send_body(self, status: int, body: bytes, content_type: str, headers: dict[str, str] | None = None) -> None:
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def send_error_json(self, status: int, message: str, headers: dict[str, str] | None = None) -> None:
+            body = json.dumps({"error": message}).encode("utf-8")
+            self.send_body(status, body, "application/json", headers)
+
+        def do_GET(self) -> None:
+            if self.path == "/metrics":
+                self.send_body(200, service.metrics().encode("utf-8"), "text/plain; version=0.0.4")
+            elif self.path == "/healthz":
+                self.send_body(200, b"ok\n", "text/plain")
+            else:
+                self.send_error_json(404, "not found")
+
+        def do_POST(self) -> None:
+            if self.path != "/render":
+                self.send_error_json(404, "not found")
+                return
+            started = time.perf_counter()
+            outcome = "bad_request"
+            try:
+                raw_length = (self.headers.get("Content-Length") or "0").strip()
+                # int() would also take "-1", "+5" or "1_0"; the unread body cannot be skipped.
+                if not (raw_length.isascii() and raw_length.isdigit()):
+                    self.close_connection = True
+                    self.send_error_json(400, "Content-Length must be a non-negative integer")
+                    return
+                length = int(raw_length)
+                if length > MAX_BODY_BYTES:
+                    self.close_connection = True
+                    self.send_error_json(413, f"request body is limited to {MAX_BODY_BYTES} bytes")
+                    return
+                try:
+                    payload = json.loads(self.rfile.read(length) or b"{}")
+                except ValueError:
+                    self.send_error_json(400, "body must be JSON")
+                    return
+                locale = str(payload.get("locale") or "fr").lower() if isinstance(payload, dict) else None
+                fields = payload.get("fields", {}) if isinstance(payload, dict) else None
+                if locale not in service.gen.LOCALE_SOURCES or not isinstance(fields, dict):
+                    self.send_error_json(400, 'expected {"locale": "fr" | "en", "fields": {...}}')
+                    return
+                try:
+                    outcome, data = service.render(locale, service.prefill(fields))
+                except Busy as busy:
+                    outcome = "rejected"
+                    self.send_error_json(429, str(busy), {"Retry-After": str(busy.retry_after)})
+                    return
+                except Exception as error:
+                    outcome = "error"
+                    self.send_error_json(500, f"{type(error).__name__}: {error}")
+                    return
+                self.send_body(
+                    200,
+                    data,
+                    "application/pdf",
+                    {"Content-Disposition": 'inline; filename="cahier-des-charges.pdf"', "X-Render": outcome},
+                )
+            finally:
+                service.observe(outcome, time.perf_counter() - started)
+
+    return Handler
+
+
+def parse_args(argv: list[str] | None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Serve prefilled premium cahier PDFs over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1", help="interface to listen on")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="port to listen on")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="render processes")
+    parser.add_argument(
+        "--max-queue",
+        type=int,
+        help=f"distinct renders queued or running before answering 429 (default: {QUEUE_PER_WORKER} per worker)",
+    )
+    parser.add_argument(
+        "--cache-mb",
+        type=float,
+        default=OUTPUT_CACHE_MAX_BYTES / (1024 * 1024),
+        help="memory kept for recently rendered PDFs",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    gen = load_generator()
+    gen.IMAGE_CACHE = gen.ImageCache(gen.IMAGE_CACHE_DIR)
+    gen.ACTIVE_FONT = gen.register_font()
+    workers = max(1, args.workers)
+    service = RenderService(gen, workers, args.max_queue or workers * QUEUE_PER_WORKER, int(args.cache_mb * 1024 * 1024))
+    started = time.perf_counter()
+    service.warm()
+    server = RenderServer((args.host, args.port), make_handler(service))
+    host, port = server.server_address[:2]
+    print(f"{workers} workers warm in {time.perf_counter() - started:.1f}s, serving on http://{host}:{port}/render")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print()
+    finally:
+        server.server_close()
+        service.close()
+        if gen.IMAGE_CACHE:
+            gen.IMAGE_CACHE.save()
+
+
+if __name__ == "__main__":
+    main()
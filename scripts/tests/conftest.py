@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import importlib.util
+import sys
+from pathlib import Path
+
+import pytest
+import reportlab
+
+SCRIPT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(SCRIPT_DIR))
+
+# Shipped with reportlab, so TrueType paths are covered without node_modules.
+VERA_PATH = Path(reportlab.__file__).parent / "fonts" / "Vera.ttf"
+
+
+def load_script(file_name: str, module_name: str):
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    spec = importlib.util.spec_from_file_location(module_name, SCRIPT_DIR / file_name)
+    module = importlib.util.module_from_spec(spec)
+    # Registered before exec so pool workers can unpickle calls that reference it.
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def gen(tmp_path, monkeypatch):
+    module = load_script("generate-premium-cahier.py", "generate_premium_cahier")
+    monkeypatch.setattr(module, "IMAGE_CACHE", None)
+    monkeypatch.setattr(module, "OFFLINE", False)
+    monkeypatch.setattr(module, "FONT_CACHE_DIR", None)
+    monkeypatch.setattr(module, "PAGE_CACHE_DIR", None)
+    monkeypatch.setattr(module, "PREFETCHED_IMAGES", {})
+    monkeypatch.setattr(module, "PREPARED_SOURCES", {})
+    monkeypatch.setattr(module, "IMAGE_DIGESTS", {})
+    monkeypatch.setattr(module, "TEXT_LAYOUT", module.TextLayoutCache())
+    monkeypatch.setattr(module, "BUILD_MANIFEST_PATH", tmp_path / "cache" / "build-manifest.json")
+    monkeypatch.setattr(module, "TEXT_LAYOUT_PATH", tmp_path / "cache" / "text-layout.json")
+    monkeypatch.setattr(module, "PDF_SIDECAR_PATH", tmp_path / "cahier-pdf.json")
+    monkeypatch.setattr(module, "FIELD_SCHEMA_PATH", tmp_path / "cahier-fields.json")
+    monkeypatch.setattr(module, "PUBLIC_DIR", tmp_path / "public")
+    monkeypatch.setattr(module, "ACTIVE_FONT", module.FALLBACK_FONT)
+    if not module.FONT_PATH.exists():
+        monkeypatch.setattr(module, "FONT_PATH", VERA_PATH)
+    # Images are local files so nothing reaches the network.
+    locale_sources = {}
+    for locale, (output_path, copy, guide_items) in module.LOCALE_SOURCES.items():
+        items = [{**item, "image": str(module.LOGO_PATH)} for item in guide_items]
+        locale_sources[locale] = (tmp_path / "public" / output_path.name, copy, items)
+    monkeypatch.setattr(module, "LOCALE_SOURCES", locale_sources)
+    (tmp_path / "public").mkdir()
+    return module
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import math
+
+import pytest
+
+UNREACHABLE_IMAGE = "http://127.0.0.1:9/unreachable.png"
+
+
+def run_build(gen, tmp_path, *argv: str) -> None:
+    gen.run(gen.parse_args(["--cache-dir", str(tmp_path / "images"), "--workers", "1", *argv]))
+
+
+def test_missing_image_keeps_output_stale(gen, tmp_path, capsys):
+    output_path, copy, items = gen.LOCALE_SOURCES["fr"]
+    items[0]["image"] = UNREACHABLE_IMAGE
+    run_build(gen, tmp_path, "--locale", "fr")
+    assert "with missing images" in capsys.readouterr().out
+    assert output_path.exists()
+    assert gen.manifest_key(output_path) not in gen.load_build_manifest()
+
+    run_build(gen, tmp_path, "--locale", "fr")
+    assert "up to date" not in capsys.readouterr().out
+
+    items[0]["image"] = str(gen.LOGO_PATH)
+    run_build(gen, tmp_path, "--locale", "fr")
+    assert "with missing images" not in capsys.readouterr().out
+    run_build(gen, tmp_path, "--locale", "fr")
+    assert "Cahier PDFs are up to date." in capsys.readouterr().out
+
+
+def page_sizes(path) -> list[tuple[float, float]]:
+    pikepdf = pytest.importorskip("pikepdf")
+    with pikepdf.open(path) as pdf:
+        return [(round(float(page.mediabox[2]), 2), round(float(page.mediabox[3]), 2)) for page in pdf.pages]
+
+
+def test_build_matrix_names_every_variant(gen):
+    jobs = gen.build_matrix(["fr", "en"], ["a4", "letter"], [True, False])
+    names = {(job.locale, job.page_size, job.include_ai): job.output_path.name for job in jobs}
+    assert names == {
+        ("fr", "a4", True): "cahier-des-charges.pdf",
+        ("fr", "a4", False): "cahier-des-charges.no-ai.pdf",
+        ("fr", "letter", True): "cahier-des-charges.letter.pdf",
+        ("fr", "letter", False): "cahier-des-charges.letter.no-ai.pdf",
+        ("en", "a4", True): "cahier-des-charges.en.pdf",
+        ("en", "a4", False): "cahier-des-charges.en.no-ai.pdf",
+        ("en", "letter", True): "cahier-des-charges.en.letter.pdf",
+        ("en", "letter", False): "cahier-des-charges.en.letter.no-ai.pdf",
+    }
+
+
+@pytest.mark.parametrize("paged", [False, True], ids=["single-canvas", "paged"])
+def test_matrix_builds_every_variant_and_isolates_failures(gen, tmp_path, monkeypatch, paged):
+    if paged:
+        monkeypatch.setattr(gen, "PAGE_CACHE_DIR", tmp_path / "pages")
+    jobs = gen.build_matrix(["fr"], ["a4", "letter"], [True, False])
+    gen.warm_prepared_images([jobs[0].guide_items])
+    _, copy, guide_items = gen.LOCALE_SOURCES["fr"]
+    broken = gen.BuildJob("fr", tmp_path / "no-such-dir" / "broken.pdf", copy, guide_items)
+    results = gen.run_build_jobs([*jobs[:2], broken, *jobs[2:]], workers=2)
+
+    errors = {result.job.output_path.name: result.error for result in results}
+    assert len(results) == 5
+    assert errors.pop("broken.pdf")
+    assert errors == dict.fromkeys(job.output_path.name for job in jobs)
+    a4, letter = (595.28, 841.89), (612.0, 792.0)
+    expected = {
+        "cahier-des-charges.pdf": [a4] * (3 + gen.ai_page_count(len(guide_items), "a4")),
+        "cahier-des-charges.no-ai.pdf": [a4] * 3,
+        "cahier-des-charges.letter.pdf": [letter] * (3 + gen.ai_page_count(len(guide_items), "letter")),
+        "cahier-des-charges.letter.no-ai.pdf": [letter] * 3,
+    }
+    assert {job.output_path.name: page_sizes(job.output_path) for job in jobs} == expected
+
+
+@pytest.mark.parametrize("paged", [False, True], ids=["single-canvas", "paged"])
+def test_unchanged_inputs_rebuild_byte_identical(gen, tmp_path, monkeypatch, paged):
+    if paged:
+        monkeypatch.setattr(gen, "PAGE_CACHE_DIR", tmp_path / "pages")
+    [job] = gen.build_matrix(["en"], ["a4"], [True])
+    outputs = []
+    for _ in range(2):
+        [result] = gen.run_build_jobs([job], workers=1)
+        assert result.error is None
+        outputs.append(job.output_path.read_bytes())
+    if paged:
+        # The second build was assembled from the pages cached by the first.
+        assert len(list((tmp_path / "pages").iterdir())) == 3 + gen.ai_page_count(len(job.guide_items), "a4")
+    assert outputs[0] == outputs[1]
+
+
+def test_field_schema_is_only_rebuilt_when_the_copy_changes(gen, tmp_path, monkeypatch):
+    calls = []
+    collect_form_fields = gen.collect_form_fields
+    monkeypatch.setattr(gen, "collect_form_fields", lambda copy: calls.append(copy) or collect_form_fields(copy))
+    run_build(gen, tmp_path, "--locale", "fr")
+    assert len(calls) == len(gen.LOCALE_SOURCES)
+    schema = gen.FIELD_SCHEMA_PATH.read_text("utf-8")
+
+    run_build(gen, tmp_path, "--locale", "fr")
+    assert len(calls) == len(gen.LOCALE_SOURCES)
+
+    gen.FIELD_SCHEMA_PATH.unlink()
+    run_build(gen, tmp_path, "--locale", "fr")
+    assert gen.FIELD_SCHEMA_PATH.read_text("utf-8") == schema
+
+    _, copy, _ = gen.LOCALE_SOURCES["en"]
+    monkeypatch.setitem(copy["page1"], "title", "Project brief (v2)")
+    calls.clear()
+    run_build(gen, tmp_path, "--locale", "fr")
+    assert len(calls) == len(gen.LOCALE_SOURCES)
+
+
+def logo_widths(path) -> list[int]:
+    pikepdf = pytest.importorskip("pikepdf")
+    with pikepdf.open(path) as pdf:
+        return sorted({int(image.Width) for image in pdf.pages[0].get_images().values()})
+
+
+def test_image_dpi_change_rebuilds_cached_pages(gen, tmp_path, monkeypatch):
+    monkeypatch.setattr(gen, "PAGE_CACHE_DIR", tmp_path / "pages")
+    monkeypatch.setattr(gen, "IMAGE_DPI", gen.IMAGE_DPI)
+    monkeypatch.setattr(gen, "JPEG_QUALITY", gen.JPEG_QUALITY)
+    output_path = gen.LOCALE_SOURCES["fr"][0]
+    run_build(gen, tmp_path, "--locale", "fr")
+    [default_width] = logo_widths(output_path)
+
+    run_build(gen, tmp_path, "--locale", "fr", "--image-dpi", "30")
+    [low_width] = logo_widths(output_path)
+    assert low_width == math.ceil(gen.LOGO_SIZE / 72 * 30) < default_width
+
+    run_build(gen, tmp_path, "--locale", "fr", "--no-cache", "--force", "--image-dpi", "30")
+    assert logo_widths(output_path) == [low_width]
+
+
+def test_worker_reuses_prepared_images_without_fetching(gen, tmp_path, monkeypatch):
+    _, copy, guide_items = gen.LOCALE_SOURCES["en"]
+    items = [{**item, "image": f"{UNREACHABLE_IMAGE}?{index}"} for index, item in enumerate(guide_items)]
+    logo = gen.LOGO_PATH.read_bytes()
+    monkeypatch.setattr(gen, "PAGE_CACHE_DIR", tmp_path / "pages")
+    monkeypatch.setattr(gen, "OFFLINE", True)
+    monkeypatch.setattr(gen, "PREFETCHED_IMAGES", {url: logo for url in gen.collect_image_urls(items)})
+    gen.warm_prepared_images([items])
+    args = gen.build_worker_args()
+
+    # What a spawned worker starts with: nothing fetched, no image cache.
+    for name in ("ACTIVE_FONT", "IMAGE_CACHE", "IMAGE_DPI", "JPEG_QUALITY", "OFFLINE"):
+        monkeypatch.setattr(gen, name, getattr(gen, name))
+    monkeypatch.setattr(gen, "PREFETCHED_IMAGES", {})
+    monkeypatch.setattr(gen, "PREPARED_SOURCES", {})
+    monkeypatch.setattr(gen, "IMAGE_DIGESTS", {})
+    monkeypatch.setattr(gen, "OFFLINE", False)
+    gen.init_build_worker(*args)
+    assert gen.OFFLINE is True
+
+    def no_fetch(url, timeout):
+        raise AssertionError(f"fetched {url}")
+
+    monkeypatch.setattr(gen, "fetch_image_bytes", no_fetch)
+    gen.render_page(copy, 4, 4, "a4", "", items)
+    assert len(list((tmp_path / "pages").iterdir())) == 1
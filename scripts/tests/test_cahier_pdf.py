@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+from io import BytesIO
+
+import pytest
+from reportlab.pdfbase import pdfdoc  # noqa: F401  registers the "pdfdoc" codec
+from reportlab.pdfgen import canvas
+
+from cahier_pdf import (
+    Parser,
+    PdfError,
+    PdfFile,
+    PdfName,
+    PdfRef,
+    PdfStream,
+    PdfWriter,
+    append_update,
+    decode_text,
+    form_values,
+    pdf_text,
+    serialize,
+)
+
+
+def test_decode_text_matches_pdfdoc_encoding():
+    for code in range(256):
+        try:
+            expected = bytes([code]).decode("pdfdoc")
+        except UnicodeDecodeError:
+            continue
+        assert decode_text(bytes([code])) == expected
+
+
+@pytest.mark.parametrize("value", ["Café – l’été", "Budget: 5 000 €", "中文", "\x85", ""])
+def test_pdf_text_round_trips(value):
+    assert decode_text(pdf_text(value)) == value
+
+
+def form_pdf(fields: dict[str, str], pages: int = 1) -> bytes:
+    buffer = BytesIO()
+    c = canvas.Canvas(buffer, invariant=1)
+    for page in range(pages):
+        c.drawString(72, 760, f"page {page + 1}")
+        for index, (name, value) in enumerate(fields.items()):
+            if index % pages == page:
+                c.acroForm.textfield(name=name, value=value, x=72, y=700 - 30 * index, width=200, height=20)
+        c.showPage()
+    c.save()
+    return buffer.getvalue()
+
+
+def merged(*parts: bytes) -> bytes:
+    buffer = BytesIO()
+    writer = PdfWriter(buffer)
+    for part in parts:
+        writer.append_document(PdfFile(part))
+    writer.close()
+    return buffer.getvalue()
+
+
+def object_streams(data: bytes) -> bytes:
+    pikepdf = pytest.importorskip("pikepdf")
+    buffer = BytesIO()
+    with pikepdf.open(BytesIO(data)) as pdf:
+        pdf.save(buffer, object_stream_mode=pikepdf.ObjectStreamMode.generate)
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize(
+    "source",
+    [
+        b"<</Type /Page /Kids [1 0 R 2 0 R] /Rect [0 -1.5 .25 +3] /Flag true /Off false /Nil null>>",
+        b"[(a \\(nested (balanced)\\) \\\\ \\n\\t\\101\\0501) <48656C6C6F> <4> ()]",
+        b"<</A#20B /a#2Fb /C [/D#23 /] /R 12 0 R>>",
+        b"<</Length 3 /Filter /FlateDecode>>\nstream\nabc\nendstream",
+    ],
+)
+def test_parse_serialize_round_trip(source):
+    value = Parser(source).parse()
+    again = Parser(serialize(value)).parse()
+    if isinstance(value, PdfStream):
+        assert (again.dictionary, again.raw) == (value.dictionary, value.raw)
+    else:
+        assert again == value
+
+
+def test_parse_values():
+    value = Parser(b"<</N /A#20B /S (x\\051y\\\ny) /H <41 42 4> /R 3 1 R /F -.5 /I [1 2.0]>>").parse()
+    assert value == {"N": "A B", "S": b"x)yy", "H": b"AB@", "R": PdfRef(3, 1), "F": -0.5, "I": [1, 2.0]}
+    assert isinstance(value["N"], PdfName)
+
+
+def test_reads_reportlab_output():
+    pdf = PdfFile(form_pdf({"name": "Ada", "city": "Paris"}, pages=2))
+    assert pdf.startxref is not None
+    assert [page["MediaBox"] for _, page in pdf.pages()] == [[0, 0, 595.2756, 841.8898]] * 2
+    assert form_values(pdf) == {"name": "Ada", "city": "Paris"}
+
+
+def test_reads_object_and_xref_streams():
+    data = object_streams(form_pdf({"name": "Ada", "city": "Paris"}, pages=2))
+    assert b"/ObjStm" in data and b"/XRef" in data
+    pdf = PdfFile(data)
+    assert any(entry[0] == "compressed" for entry in pdf.xref.values())
+    assert len(pdf.pages()) == 2
+    assert form_values(pdf) == {"name": "Ada", "city": "Paris"}
+
+
+@pytest.mark.parametrize(
+    "corrupt",
+    [
+        lambda data: data.replace(b"startxref\n", b"startxref\n9", 1),
+        lambda data: data[: data.rindex(b"xref")],
+        lambda data: data.replace(b"\nxref\n", b"\nxref\n9 ", 1),
+    ],
+    ids=["bad-startxref", "truncated-xref", "mangled-xref-table"],
+)
+def test_corrupted_xref_falls_back_to_scanning(corrupt):
+    data = corrupt(form_pdf({"name": "Ada", "city": "Paris"}))
+    pdf = PdfFile(data)
+    assert pdf.startxref is None
+    assert len(pdf.pages()) == 1
+    assert form_values(pdf) == {"name": "Ada", "city": "Paris"}
+
+
+def test_unreadable_file_raises_pdf_error():
+    with pytest.raises(PdfError):
+        PdfFile(b"%PDF-1.4\nnot a pdf\n")
+
+
+def test_merge_keeps_pages_and_fields():
+    pikepdf = pytest.importorskip("pikepdf")
+    first = form_pdf({"name": "Ada"})
+    second = object_streams(form_pdf({"city": "Paris", "zip": "75001"}, pages=2))
+    data = merged(first, second)
+    assert form_values(PdfFile(data)) == {"name": "Ada", "city": "Paris", "zip": "75001"}
+    with pikepdf.open(BytesIO(data)) as pdf:
+        assert pdf.check_pdf_syntax() == []
+        assert [page.Contents.read_bytes().count(b"page") for page in pdf.pages] == [1, 1, 1]
+        assert sorted(str(field.T) for field in pdf.Root.AcroForm.Fields) == ["city", "name", "zip"]
+        assert "/Helv" in pdf.Root.AcroForm.DR.Font
+
+
+def test_merge_stores_identical_objects_once():
+    pikepdf = pytest.importorskip("pikepdf")
+    data = merged(form_pdf({"name": "Ada"}), form_pdf({"city": "Paris"}), form_pdf({"zip": "75001"}))
+    with pikepdf.open(BytesIO(data)) as pdf:
+        fonts = [obj for obj in pdf.objects if isinstance(obj, pikepdf.Dictionary) and obj.get("/Type") == "/Font"]
+        # Every part brings Helvetica for its text and for its form field; one copy of each is kept.
+        assert sorted(str(font.Name) for font in fonts) == ["/F1", "/Helv"]
+
+
+def test_merge_rejects_repeated_field_names():
+    writer = PdfWriter(BytesIO())
+    writer.append_document(PdfFile(form_pdf({"name": "Ada"})))
+    with pytest.raises(PdfError, match="'name' appears in more than one part"):
+        writer.append_document(PdfFile(form_pdf({"name": "Grace"})))
+
+
+@pytest.mark.parametrize("streams", [False, True], ids=["xref-table", "xref-stream"])
+def test_incremental_update_is_readable(streams):
+    pikepdf = pytest.importorskip("pikepdf")
+    original = form_pdf({"name": "Ada", "city": "Paris"})
+    if streams:
+        original = object_streams(original)
+    pdf = PdfFile(original)
+    acroform = pdf.resolve(pdf.root["AcroForm"])
+    field_ref = next(ref for ref in acroform["Fields"] if decode_text(pdf.resolve(ref)["T"]) == "name")
+    widget = dict(pdf.resolve(field_ref))
+    widget["V"] = pdf_text("Grace – Hopper")
+    data = append_update(pdf, {field_ref.num: widget})
+
+    assert data.startswith(original)
+    updated = PdfFile(data)
+    assert updated.trailer["Prev"] == pdf.startxref
+    assert form_values(updated) == {"name": "Grace – Hopper", "city": "Paris"}
+    with pikepdf.open(BytesIO(data)) as checked:
+        assert checked.check_pdf_syntax() == []
+        values = {str(field.T): str(field.V) for field in checked.Root.AcroForm.Fields}
+        assert values == {"name": "Grace – Hopper", "city": "Paris"}
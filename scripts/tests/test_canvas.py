@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+from io import BytesIO
+
+import pytest
+
+from cahier_pdf import PdfFile, PdfRef, decode_text, form_values
+
+PREFILL = {"project_name": "Acme", "project_budget": "15 k€", "feature_catalog": True}
+
+
+def build(gen, monkeypatch, supported: bool, prefill: dict = PREFILL) -> bytes:
+    monkeypatch.setattr(gen, "REPORTLAB_INTERNALS_OK", supported)
+    _, copy, guide_items = gen.LOCALE_SOURCES["fr"]
+    buffer = BytesIO()
+    gen.build_document(buffer, copy, guide_items, prefill=prefill)
+    return buffer.getvalue()
+
+
+def content_bytes(data: bytes) -> int:
+    pikepdf = pytest.importorskip("pikepdf")
+    with pikepdf.open(BytesIO(data)) as pdf:
+        return sum(len(page.Contents.read_bytes()) for page in pdf.pages)
+
+
+def rasterize(data: bytes) -> list[bytes]:
+    pdfium = pytest.importorskip("pypdfium2")
+    pdf = pdfium.PdfDocument(data)
+    pdf.init_forms()
+    try:
+        return [bytes(page.render(scale=1, may_draw_forms=True).buffer) for page in pdf]
+    finally:
+        pdf.close()
+
+
+@pytest.fixture
+def font(gen, monkeypatch):
+    monkeypatch.setattr(gen, "ACTIVE_FONT", gen.register_font())
+    gen.warm_prepared_images([gen.LOCALE_SOURCES["fr"][2]])
+
+
+def test_missing_internals_turn_elision_off(gen, monkeypatch):
+    assert gen.missing_reportlab_internals() == []
+    monkeypatch.setitem(gen.REPORTLAB_INTERNALS, "canvas", (*gen.REPORTLAB_INTERNALS["canvas"], "_gone._d"))
+    assert gen.missing_reportlab_internals() == ["canvas._gone._d"]
+
+    monkeypatch.setattr(gen, "REPORTLAB_INTERNALS_OK", False)
+    c = gen.BriefCanvas(BytesIO())
+    c.setFillColor(gen.colors.red)
+    c.setFillColor(gen.colors.red)
+    assert c._code.count("1 0 0 rg") == 2
+
+
+def test_elision_draws_the_same_pages(gen, monkeypatch, font):
+    elided = build(gen, monkeypatch, True)
+    plain = build(gen, monkeypatch, False)
+    # Same pixels from a shorter content stream.
+    assert content_bytes(elided) < content_bytes(plain)
+    assert rasterize(elided) == rasterize(plain)
+
+
+def widget_appearances(data: bytes) -> dict[str, tuple]:
+    pdf = PdfFile(data)
+    acroform = pdf.resolve(pdf.root["AcroForm"])
+    appearances = {}
+    for ref in pdf.resolve(acroform["Fields"]):
+        widget = pdf.resolve(ref)
+        normal = pdf.resolve(pdf.resolve(widget["AP"])["N"])
+        if isinstance(normal, dict):
+            appearances[decode_text(widget["T"])] = (widget.get("AS"), pdf.resolve(normal[widget["AS"]]).decoded())
+        else:
+            appearances[decode_text(widget["T"])] = (None, normal.decoded())
+    return appearances
+
+
+def appearance_objects(data: bytes) -> int:
+    pdf = PdfFile(data)
+    acroform = pdf.resolve(pdf.root["AcroForm"])
+    normal = [pdf.resolve(pdf.resolve(ref)["AP"])["N"] for ref in pdf.resolve(acroform["Fields"])]
+    return len({ref for ref in normal if isinstance(ref, PdfRef)})
+
+
+def test_shared_appearances_render_every_value(gen, monkeypatch, font):
+    fields = gen.collect_form_fields(gen.COPY_FR)
+    # Pairs of fields share a value, so their appearance streams are shared too.
+    prefill = {
+        name: True if spec["type"] == "checkbox" else f"Valeur {index // 2}"
+        for index, (name, spec) in enumerate(fields.items())
+    }
+    shared = build(gen, monkeypatch, True, prefill)
+    plain = build(gen, monkeypatch, False, prefill)
+
+    assert appearance_objects(shared) < appearance_objects(plain)
+    assert form_values(PdfFile(shared)) == {name: prefill[name] for name in fields}
+    appearances = widget_appearances(shared)
+    assert appearances == widget_appearances(plain)
+    for name, value in prefill.items():
+        state, content = appearances[name]
+        if value is True:
+            assert state == "Yes"
+        else:
+            assert f"({value}) Tj".encode("ascii") in content
+    assert rasterize(shared) == rasterize(plain)
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+from io import BytesIO
+
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont, TTFontFace
+from reportlab.pdfgen import canvas
+
+from conftest import VERA_PATH
+
+
+def render(font: TTFont, monkeypatch) -> bytes:
+    # registerFont hands back the first font registered for a name or a face, so each font
+    # gets its own name and a clean face registry. Names are the same length and swapped
+    # back, leaving offsets and subset tags comparable.
+    monkeypatch.setattr(pdfmetrics, "_dynFaceNames", {})
+    pdfmetrics.registerFont(font)
+    assert pdfmetrics.getFont(font.fontName) is font
+    buffer = BytesIO()
+    pdf = canvas.Canvas(buffer, invariant=1)
+    pdf.setFont(font.fontName, 12)
+    pdf.drawString(72, 720, "Cahier des charges – été")
+    pdf.save()
+    return buffer.getvalue().replace(font.fontName.encode("ascii"), b"CacheVera")
+
+
+def test_cached_font_matches_a_plain_ttfont(gen, tmp_path, monkeypatch):
+    monkeypatch.setattr(gen, "FONT_CACHE_DIR", tmp_path / "fonts")
+    plain = TTFont("CacheVera", str(VERA_PATH))
+    expected = render(plain, monkeypatch)
+    subset_dir = gen.font_subset_dir(VERA_PATH)
+    font = gen.CachedTTFont("CacheVer1", str(VERA_PATH), subset_dir)
+    assert isinstance(font.face, gen.CachedFontFace)
+    assert font.__dict__.keys() == plain.__dict__.keys()
+    assert (font.shapable, font._asciiReadable) == (plain.shapable, plain._asciiReadable)
+    assert render(font, monkeypatch) == expected
+    assert len(list(subset_dir.glob("*.ttf"))) == 1
+
+    # A later process reads the subset back instead of building it.
+    def no_subset(self, subset):
+        raise AssertionError("subset built again")
+
+    monkeypatch.setattr(TTFontFace, "makeSubset", no_subset)
+    assert render(gen.CachedTTFont("CacheVer2", str(VERA_PATH), subset_dir), monkeypatch) == expected
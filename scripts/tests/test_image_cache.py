@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+IMAGE = b"\x89PNG fake image bytes"
+ETAG = '"v1"'
+
+
+@pytest.fixture
+def image_server():
+    requests: list[tuple[str, str | None]] = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            requests.append((self.path, self.headers.get("If-None-Match")))
+            if self.path == "/missing.png":
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+            elif self.headers.get("If-None-Match") == ETAG:
+                self.send_response(304)
+                self.end_headers()
+            else:
+                self.send_response(200)
+                self.send_header("ETag", ETAG)
+                self.send_header("Content-Length", str(len(IMAGE)))
+                self.end_headers()
+                self.wfile.write(IMAGE)
+
+        def log_message(self, *args) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}", requests
+    server.shutdown()
+    server.server_close()
+
+
+def test_not_modified_is_a_cache_hit(gen, tmp_path, monkeypatch, image_server):
+    base, requests = image_server
+    monkeypatch.setattr(gen, "IMAGE_CACHE", gen.ImageCache(tmp_path / "images"))
+    url = f"{base}/image.png"
+    assert gen.fetch_image_bytes(url, 5) == IMAGE
+    assert gen.fetch_image_bytes(url, 5) == IMAGE
+    assert requests == [("/image.png", None), ("/image.png", ETAG)]
+
+
+def test_not_modified_without_cached_blob_fetches_again(gen, tmp_path, monkeypatch, image_server):
+    base, requests = image_server
+    monkeypatch.setattr(gen, "IMAGE_CACHE", gen.ImageCache(tmp_path / "images"))
+    url = f"{base}/image.png"
+    gen.fetch_image_bytes(url, 5)
+    gen.IMAGE_CACHE.blob_path(gen.IMAGE_CACHE.digest(url)).unlink()
+    assert gen.fetch_image_bytes(url, 5) == IMAGE
+    assert requests[1:] == [("/image.png", ETAG), ("/image.png", None)]
+
+
+def test_failures_fall_back_to_the_cached_copy(gen, tmp_path, monkeypatch, image_server):
+    base, _ = image_server
+    monkeypatch.setattr(gen, "IMAGE_CACHE", gen.ImageCache(tmp_path / "images"))
+    url = f"{base}/missing.png"
+    assert gen.fetch_image_bytes(url, 5) is None
+    gen.IMAGE_CACHE.put(url, IMAGE)
+    assert gen.fetch_image_bytes(url, 5) == IMAGE
+    assert gen.fetch_image_bytes("http://127.0.0.1:9/refused.png", 1) is None
+
+
+def test_failed_prefetch_is_tried_again(gen, image_server):
+    base, requests = image_server
+    url = f"{base}/missing.png"
+    assert gen.prefetch_images([url], deadline=5) == {url: None}
+    assert url not in gen.PREFETCHED_IMAGES
+    assert gen.prefetch_images([url], deadline=5) == {url: None}
+    assert requests == [("/missing.png", None)] * 2
+
+
+def test_refetch_after_not_modified_keeps_the_callers_timeout(gen, tmp_path, monkeypatch, image_server):
+    base, requests = image_server
+    monkeypatch.setattr(gen, "IMAGE_CACHE", gen.ImageCache(tmp_path / "images"))
+    url = f"{base}/image.png"
+    gen.fetch_image_bytes(url, 5)
+    gen.IMAGE_CACHE.blob_path(gen.IMAGE_CACHE.digest(url)).unlink()
+    timeouts = []
+    urlopen = gen.urlopen
+
+    def timed_urlopen(request, timeout):
+        timeouts.append(timeout)
+        return urlopen(request, timeout=timeout)
+
+    monkeypatch.setattr(gen, "urlopen", timed_urlopen)
+    assert gen.fetch_image_bytes(url, 2) == IMAGE
+    assert len(requests) == 3
+    assert timeouts[0] == 2 and 0 < timeouts[1] < 2
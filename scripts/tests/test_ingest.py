@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import sqlite3
+import tarfile
+import zipfile
+
+import pytest
+
+from conftest import load_script
+
+
+@pytest.fixture
+def ingest(monkeypatch):
+    module = load_script("ingest-cahier-briefs.py", "ingest_cahier_briefs")
+    # One source per batch, so the in-flight window fills up and gets drained.
+    monkeypatch.setattr(module, "BATCH_SIZE", 1)
+    return module
+
+
+def test_ingest_files_and_archives(gen, ingest, tmp_path):
+    schema = {
+        name: {"type": spec["type"], "page": spec["page"], "label": {"fr": spec["label"]}}
+        for name, spec in gen.collect_form_fields(gen.COPY_FR).items()
+    }
+    context = gen.RenderContext(include_ai=False)
+    briefs = {name: context.render(gen.COPY_FR, [], {"project_name": name}) for name in ("Alpha", "Beta", "Gamma", "Delta")}
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    (inbox / "alpha.pdf").write_bytes(briefs["Alpha"])
+    (inbox / "alpha-copy.pdf").write_bytes(briefs["Alpha"])
+    (inbox / "empty.pdf").write_bytes(b"")
+    with zipfile.ZipFile(inbox / "week.zip", "w") as archive:
+        archive.writestr("beta.pdf", briefs["Beta"])
+        archive.writestr("alpha-again.pdf", briefs["Alpha"])
+    for name in ("gamma", "delta"):
+        (tmp_path / f"{name}.pdf").write_bytes(briefs[name.title()])
+    with tarfile.open(inbox / "week.tar.gz", "w:gz") as archive:
+        archive.add(tmp_path / "gamma.pdf", "gamma.pdf")
+        archive.add(tmp_path / "delta.pdf", "delta.pdf")
+
+    db_path = tmp_path / "briefs.sqlite"
+    stats, failures = ingest.ingest([inbox], db_path, schema, workers=2, max_bytes=1024 * 1024)
+    assert stats == {"seen": 7, "unchanged": 0, "duplicate": 2, "ingested": 4, "failed": 1}
+    assert [(source.rsplit("/", 1)[-1], error) for source, error in failures] == [("empty.pdf", "PdfError: empty file")]
+    with sqlite3.connect(db_path) as db:
+        names = sorted(name for (name,) in db.execute("SELECT project_name FROM briefs"))
+        sources = db.execute("SELECT COUNT(*) FROM sources WHERE sha256 IS NOT NULL").fetchone()[0]
+    assert names == ["Alpha", "Beta", "Delta", "Gamma"]
+    assert sources == 6
+
+    stats, _ = ingest.ingest([inbox], db_path, schema, workers=2, max_bytes=1024 * 1024)
+    assert stats == {"seen": 7, "unchanged": 7, "duplicate": 0, "ingested": 0, "failed": 0}
+
+    stats, _ = ingest.ingest([inbox], db_path, schema, workers=2, max_bytes=1024 * 1024, rescan=True)
+    assert stats == {"seen": 7, "unchanged": 0, "duplicate": 6, "ingested": 0, "failed": 1}
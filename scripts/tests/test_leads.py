@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import json
+
+from cahier_pdf import PdfFile, form_values
+
+
+def write_leads(path, leads: list[dict]) -> None:
+    path.write_text("".join(json.dumps(lead) + "\n" for lead in leads), "utf-8")
+
+
+def test_duplicate_lead_ids_get_deterministic_suffixes(gen, tmp_path, capsys):
+    leads_path = tmp_path / "leads.jsonl"
+    out_dir = tmp_path / "briefs"
+    write_leads(
+        leads_path,
+        [
+            {"id": "acme", "project_name": "First"},
+            {"id": "beta", "project_name": "Beta"},
+            {"id": "ACME", "project_name": "Second"},
+            {"id": "acme", "project_name": "Third"},
+            {"id": "acme-2", "project_name": "Fourth"},
+        ],
+    )
+    assert gen.run_lead_batch(leads_path, out_dir, {}, "id", "locale", "fr", workers=2) == 0
+    output = capsys.readouterr()
+    assert "WARNING line 3: ACME.pdf is already used by line 1, writing ACME-2.pdf" in output.err
+    assert "WARNING line 4: acme.pdf is already used by line 1, writing acme-3.pdf" in output.err
+    assert "5 rendered, 0 already present" in output.out
+    assert sorted(path.name for path in out_dir.iterdir()) == [
+        "ACME-2.pdf",
+        "acme-2-2.pdf",
+        "acme-3.pdf",
+        "acme.pdf",
+        "beta.pdf",
+    ]
+
+    names = {path.name: form_values(PdfFile(path.read_bytes()))["project_name"] for path in out_dir.iterdir()}
+    assert names == {
+        "acme.pdf": "First",
+        "beta.pdf": "Beta",
+        "ACME-2.pdf": "Second",
+        "acme-3.pdf": "Third",
+        "acme-2-2.pdf": "Fourth",
+    }
+
+    assert gen.run_lead_batch(leads_path, out_dir, {}, "id", "locale", "fr", workers=2) == 0
+    assert "0 rendered, 5 already present" in capsys.readouterr().out
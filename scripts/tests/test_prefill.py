@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import pytest
+
+from cahier_pdf import PdfError, PdfFile, PdfStream, decode_text, form_values
+
+PREFILL = {"project_name": "Café – l’été", "plan_dev": "Q3 — 中文", "feature_catalog": "oui"}
+
+
+def text_appearance(pdf: PdfFile, name: str) -> bytes:
+    acroform = pdf.resolve(pdf.root["AcroForm"])
+    for ref in pdf.resolve(acroform["Fields"]):
+        widget = pdf.resolve(ref)
+        if decode_text(widget.get("T")) == name:
+            return pdf.resolve(pdf.resolve(widget["AP"])["N"]).decoded()
+    raise KeyError(name)
+
+
+def assert_prefilled(data: bytes) -> None:
+    pdf = PdfFile(data)
+    values = form_values(pdf)
+    assert values["project_name"] == PREFILL["project_name"]
+    assert values["plan_dev"] == PREFILL["plan_dev"]
+    assert values["feature_catalog"] is True
+    # The form font is PDFDocEncoded: 0o205 is the en dash and 0o220 the right single
+    # quote; characters it cannot show are drawn as "?".
+    assert b"(Caf\\351 \\205 l\\220\\351t\\351) Tj" in text_appearance(pdf, "project_name")
+    assert b"(Q3 \\204 ??) Tj" in text_appearance(pdf, "plan_dev")
+
+
+def test_render_accepts_non_latin1_prefill(gen):
+    context = gen.RenderContext(include_ai=False)
+    assert_prefilled(context.render(gen.COPY_FR, [], PREFILL))
+
+
+def test_page_pool_render_accepts_non_latin1_prefill(gen):
+    context = gen.RenderContext(include_ai=False, page_workers=2)
+    try:
+        assert_prefilled(context.render(gen.COPY_EN, [], PREFILL))
+    finally:
+        context.close()
+
+
+def test_stamp_encodes_like_rendered_fields(gen):
+    context = gen.RenderContext(include_ai=False)
+    data = context.stamp(gen.COPY_FR, [], PREFILL)
+    values = form_values(PdfFile(data))
+    assert values["project_name"] == PREFILL["project_name"]
+    assert values["feature_catalog"] is True
+    assert b"(Caf\xe9 \x85 l\x90\xe9t\xe9) Tj" in text_appearance(PdfFile(data), "project_name")
+
+
+def test_stamp_falls_back_to_rendering_unknown_appearances(gen, monkeypatch):
+    context = gen.RenderContext(include_ai=False)
+    template = context.template(gen.COPY_FR, [])
+    decoded = PdfStream.decoded
+    with monkeypatch.context() as patch:
+        # As if reportlab laid out blank appearances some other way.
+        patch.setattr(PdfStream, "decoded", lambda self: decoded(self).replace(b"Q\nEMC", b"EMC"))
+        with pytest.raises(PdfError, match="project_name"):
+            template.stamp({"project_name": "Acme"})
+        data = context.stamp(gen.COPY_FR, [], PREFILL)
+    assert_prefilled(data)
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import http.client
+import json
+import threading
+
+import pytest
+
+from conftest import load_script
+
+
+@pytest.fixture
+def server(gen):
+    serve = load_script("serve-premium-cahier.py", "serve_premium_cahier")
+    service = serve.RenderService(gen, 1, 4, 1024 * 1024)
+    server = serve.RenderServer(("127.0.0.1", 0), serve.make_handler(service))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server.server_address[1], service
+    server.shutdown()
+    server.server_close()
+    service.close()
+
+
+def post(port: int, body: bytes, content_length: str | None) -> tuple[int, bytes]:
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    try:
+        connection.putrequest("POST", "/render")
+        if content_length is not None:
+            connection.putheader("Content-Length", content_length)
+        connection.putheader("Content-Type", "application/json")
+        connection.endheaders(body)
+        response = connection.getresponse()
+        return response.status, response.read()
+    finally:
+        connection.close()
+
+
+@pytest.mark.parametrize("content_length", ["abc", "-1", "+5", "1_0", "1.5"])
+def test_invalid_content_length_is_a_bad_request(server, content_length):
+    port, service = server
+    status, body = post(port, b"{}", content_length)
+    assert status == 400
+    assert "Content-Length" in json.loads(body)["error"]
+    assert service.counters["rendered"] == 0
+
+
+def test_valid_request_renders(server):
+    port, _ = server
+    body = json.dumps({"locale": "en", "fields": {"project_name": "Acme"}}).encode("utf-8")
+    status, data = post(port, body, str(len(body)))
+    assert status == 200
+    assert data.startswith(b"%PDF")
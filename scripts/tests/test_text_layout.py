@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+import json
+
+
+def test_layout_round_trips_through_the_cache_file(gen, tmp_path):
+    path = tmp_path / "text-layout.json"
+    text = "Une phrase assez longue pour tenir sur plusieurs lignes du cahier."
+    lines = gen.TEXT_LAYOUT.lines(text, gen.FALLBACK_FONT, 9, 120)
+    assert len(lines) > 1 and all(isinstance(line, str) for line in lines)
+    gen.TEXT_LAYOUT.save(path)
+
+    cache = gen.TextLayoutCache()
+    cache.load(path)
+    assert cache.entries == {(text, gen.FALLBACK_FONT, 9, 120): lines}
+
+
+def test_files_with_line_widths_are_ignored(gen, tmp_path):
+    path = tmp_path / "text-layout.json"
+    stamp = gen.TextLayoutCache().stamp().removeprefix("lines:")
+    path.write_text(json.dumps({"stamp": stamp, "entries": [["a b", "Helvetica", 9, 120, [["a b", 12.5]]]]}), "utf-8")
+    cache = gen.TextLayoutCache()
+    cache.load(path)
+    assert not cache.entries
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from pathlib import Path
+from types import SimpleNamespace
+
+from reportlab.pdfbase import pdfmetrics
+
+from conftest import VERA_PATH
+
+
+def run_watch(gen, monkeypatch, changed: list[Path]) -> None:
+    stamps: dict[Path, int] = {}
+    sleeps = iter([lambda: stamps.update(dict.fromkeys(changed, 1))])
+
+    def sleep(seconds: float) -> None:
+        try:
+            next(sleeps)()
+        except StopIteration:
+            raise KeyboardInterrupt from None
+
+    monkeypatch.setattr(gen, "file_stamp", stamps.get)
+    monkeypatch.setattr(gen.time, "sleep", sleep)
+    gen.watch(gen.parse_args(["--watch"]))
+
+
+def test_font_change_clears_the_text_layout(gen, monkeypatch):
+    layout_sizes = []
+    monkeypatch.setattr(gen, "register_font", lambda reload=False: gen.FALLBACK_FONT)
+    monkeypatch.setattr(gen, "run", lambda args: layout_sizes.append(len(gen.TEXT_LAYOUT.entries)))
+    gen.TEXT_LAYOUT.lines("Une ligne mesurée avec l'ancienne police", gen.FALLBACK_FONT, 9, 100)
+    run_watch(gen, monkeypatch, [gen.FONT_PATH])
+    assert layout_sizes == [1, 0]
+
+
+def test_reload_leaves_failed_fetches_behind(gen, monkeypatch):
+    fresh = SimpleNamespace(PREFETCHED_IMAGES={}, run=lambda args: None)
+    monkeypatch.setattr(gen, "run", lambda args: None)
+    monkeypatch.setattr(gen, "load_generator", lambda path: fresh)
+    monkeypatch.setattr(gen, "PREFETCHED_IMAGES", {"https://cdn.test/ok.png": b"png", "https://cdn.test/down.png": None})
+    run_watch(gen, monkeypatch, [Path(gen.__file__)])
+    assert fresh.PREFETCHED_IMAGES == {"https://cdn.test/ok.png": b"png"}
+
+
+def test_reload_registers_the_new_font_file(gen, monkeypatch):
+    monkeypatch.setattr(pdfmetrics, "_fonts", dict(pdfmetrics._fonts))
+    monkeypatch.setattr(pdfmetrics, "_dynFaceNames", dict(pdfmetrics._dynFaceNames))
+    gen.register_font()
+    monkeypatch.setattr(gen, "FONT_PATH", VERA_PATH.with_name("VeraBd.ttf"))
+    gen.register_font(reload=True)
+    assert pdfmetrics.getFont(gen.FONT_NAME).face.filename == str(gen.FONT_PATH)
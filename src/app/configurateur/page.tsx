@@ -7,6 +7,7 @@ import { Reveal } from "@/components/reveal";
 import { StickyTimelineIndicator } from "@/components/sticky-timeline-indicator";
 import { ConfiguratorPreview } from "@/components/configurator-preview";
 import { TurnstileWidget } from "@/components/turnstile-widget";
+import { getCahierPdfHref } from "@/lib/cahier-pdf";
 import { useLocale } from "@/lib/locale";
 import type { QuoteRequest } from "@/lib/quote";
 import { countryDialCodesSorted } from "@/data/country-dial-codes";
@@ -912,7 +913,7 @@ type ToggleSetter = Dispatch<SetStateAction<string[]>>;
 
 export default function ConfigurateurPage() {
   const { isEnglish, prefix } = useLocale();
-  const pdfHref = isEnglish ? "/cahier-des-charges.en.pdf" : "/cahier-des-charges.pdf";
+  const pdfHref = getCahierPdfHref(isEnglish);
   const siteTypes = isEnglish ? siteTypesEn : siteTypesFr;
   const strategyMap = isEnglish ? strategyMapEn : strategyMapFr;
   const moodOptions = isEnglish ? moodOptionsEn : moodOptionsFr;
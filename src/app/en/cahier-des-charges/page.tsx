@@ -1,6 +1,7 @@
 import type { Metadata } from "next";
 import Link from "next/link";
 import { InteractiveBrief } from "@/components/interactive-brief";
+import { getCahierPdfHref } from "@/lib/cahier-pdf";
 
 export const metadata: Metadata = {
   title: "Project brief",
@@ -33,7 +34,7 @@ export default function CahierDesChargesPageEn() {
         </p>
         <div className="mt-6 flex flex-wrap gap-4">
           <a
-            href="/cahier-des-charges.en.pdf"
+            href={getCahierPdfHref(true)}
             target="_blank"
             rel="noreferrer"
             download
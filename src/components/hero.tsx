@@ -4,6 +4,7 @@ import { motion, useScroll, useTransform } from "framer-motion";
 import Link from "next/link";
 import { useRef } from "react";
 import { FiArrowRight, FiCheckCircle, FiClock, FiPlayCircle } from "react-icons/fi";
+import { getCahierPdfHref } from "@/lib/cahier-pdf";
 import { useLocale } from "@/lib/locale";
 
 type HeroProps = {
@@ -54,7 +55,7 @@ export function HeroSection({ stats }: HeroProps) {
   const parallaxY = useTransform(scrollYProgress, [0, 1], ["0%", "25%"]);
   const orbitItems = isEnglish ? orbitItemsEn : orbitItemsFr;
   const quickWins = isEnglish ? quickWinsEn : quickWinsFr;
-  const pdfHref = isEnglish ? "/cahier-des-charges.en.pdf" : "/cahier-des-charges.pdf";
+  const pdfHref = getCahierPdfHref(isEnglish);
   const withPrefix = (path: string) => {
     if (!path.startsWith("/")) return path;
     if (path.endsWith(".pdf")) return path;
@@ -4,6 +4,7 @@ import Link from "next/link";
 import { useEffect, useMemo, useState } from "react";
 import { AmbientAudioToggleButton } from "./global-audio-provider";
 import { AdminSignOutButton } from "@/components/admin-signout-button";
+import { getCahierPdfHref } from "@/lib/cahier-pdf";
 import { getAlternateLocalePath, useLocale } from "@/lib/locale";
 
 export function SiteHeader() {
@@ -11,7 +12,7 @@ export function SiteHeader() {
   const alternateLocale = getAlternateLocalePath(pathname ?? "/");
   const [isMenuOpen, setIsMenuOpen] = useState(false);
   const [isAdmin, setIsAdmin] = useState(false);
-  const pdfHref = isEnglish ? "/cahier-des-charges.en.pdf" : "/cahier-des-charges.pdf";
+  const pdfHref = getCahierPdfHref(isEnglish);
 
   const toggleMenu = () => setIsMenuOpen((prev) => !prev);
 
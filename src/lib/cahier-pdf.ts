@@ -0,0 +1,5 @@
+import cahierPdf from "@/data/cahier-pdf.json";
+
+export function getCahierPdfHref(isEnglish: boolean) {
+  return isEnglish ? cahierPdf.en.href : cahierPdf.fr.href;
+}